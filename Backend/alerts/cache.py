@@ -0,0 +1,96 @@
+# alerts/cache.py
+
+"""Read-side cache for the alert endpoints.
+
+Every saved or deleted Alert bumps a version kept in Django's cache. Cached listings
+are keyed by that version, so a write makes them unreachable at once, and the version
+doubles as the ETag (with the write time as Last-Modified) for conditional GETs.
+The default local-memory cache is per process: with several server processes point
+CACHES at a shared backend (Redis, Memcached), or stale reads are only bounded by
+ALERTS_CACHE_SECONDS.
+"""
+import time
+import uuid
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.cache import patch_cache_control
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from rest_framework.response import Response
+
+from .models import Alert
+
+VERSION_KEY = 'alerts:version'
+
+
+def bump_version():
+    state = {'version': uuid.uuid4().hex, 'modified': time.time()}
+    cache.set(VERSION_KEY, state, timeout=None)
+    return state
+
+
+def current_version():
+    state = cache.get(VERSION_KEY)
+    if state is None:
+        # First read, or the cache was cleared: start a fresh version so nothing stale is served
+        cache.add(VERSION_KEY, {'version': uuid.uuid4().hex, 'modified': time.time()}, timeout=None)
+        state = cache.get(VERSION_KEY)
+    return state
+
+
+@receiver([post_save, post_delete], sender=Alert)
+def invalidate_alert_reads(**kwargs):
+    # After the commit: a read between a bump and the commit would cache pre-commit rows under the new version
+    transaction.on_commit(bump_version)
+
+
+def cached_alert_read_when(cacheable=None):
+    """Class decorator for alert read views: If-None-Match / If-Modified-Since get 304 before
+    the view runs, everything else is served from the cache when possible.
+
+    cacheable(request) can exclude requests whose answer changes without an alert write,
+    e.g. a time window that ends at "now".
+    """
+    def enabled(request):
+        return settings.ALERTS_CACHE_ENABLED and (cacheable is None or cacheable(request))
+
+    def etag(request, *args, **kwargs):
+        if enabled(request):
+            return f'"{current_version()["version"]}"'
+
+    def last_modified(request, *args, **kwargs):
+        if enabled(request):
+            return datetime.fromtimestamp(current_version()['modified'], tz=timezone.utc)
+
+    def cache_response_data(view):
+        """Serve a GET view's response data from the cache, keyed by alert version and full path."""
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not enabled(request):
+                return view(request, *args, **kwargs)
+
+            key = f"alerts:{current_version()['version']}:{request.get_full_path()}"
+            data = cache.get(key)
+            if data is not None:
+                response = Response(data)
+            else:
+                response = view(request, *args, **kwargs)
+                if response.status_code == 200:
+                    cache.set(key, response.data, settings.ALERTS_CACHE_SECONDS)
+            # Let browsers keep the body but revalidate it on every poll
+            patch_cache_control(response, no_cache=True)
+            return response
+        return wrapper
+
+    return method_decorator(
+        [condition(etag_func=etag, last_modified_func=last_modified), cache_response_data], name='get'
+    )
+
+
+cached_alert_read = cached_alert_read_when()
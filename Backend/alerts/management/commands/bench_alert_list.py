@@ -0,0 +1,128 @@
+"""Seed synthetic alerts and time the alert listing endpoints against them.
+
+    python manage.py bench_alert_list --rows 1000000
+    python manage.py bench_alert_list --rows 0 --repeat 20      # re-run on the rows already seeded
+    python manage.py bench_alert_list --clear                   # remove the seeded rows
+
+Seeded rows belong to cameras named SEED-CAM-<n>, spread one every few seconds back
+from now. Each query goes through the view (filters, pagination, serialization) but
+not through the HTTP server.
+"""
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from urllib.parse import parse_qs, urlparse
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import RequestFactory
+from django.utils import timezone
+
+from alerts.models import Alert
+from alerts.views import AlertListView, AlertSummariesView
+
+SEED_PREFIX = 'SEED-CAM-'
+
+
+@contextmanager
+def explicit_timestamps():
+    """Let bulk_create keep the timestamps we set instead of auto_now_add's."""
+    field = Alert._meta.get_field('timestamp')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = "Seed synthetic alerts and time the alert list endpoints at that size"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help="Rows to add before timing")
+        parser.add_argument('--cameras', type=int, default=50)
+        parser.add_argument('--batch', type=int, default=10_000)
+        parser.add_argument('--repeat', type=int, default=10)
+        parser.add_argument('--clear', action='store_true', help="Delete the seeded rows and exit")
+
+    def handle(self, *args, **options):
+        seeded = Alert.objects.filter(camera_id__startswith=SEED_PREFIX)
+        if options['clear']:
+            deleted, _ = seeded.delete()
+            self.stdout.write(f"🧹 Deleted {deleted} seeded alerts")
+            return
+
+        if options['rows']:
+            self.seed(options['rows'], options['cameras'], options['batch'])
+        total = Alert.objects.count()
+        self.stdout.write(f"📊 {total} alerts in the table ({connection.vendor})")
+
+        newest = Alert.objects.filter(camera_id__startswith=SEED_PREFIX).order_by('-timestamp').first()
+        window_end = newest.timestamp if newest else timezone.now()
+        queries = [
+            ("summaries (last 10)", AlertSummariesView, {}),
+            ("list, first page", AlertListView, {}),
+            ("list, one camera", AlertListView, {'camera_id': f"{SEED_PREFIX}7"}),
+            ("list, one type", AlertListView, {'violation_type': 'NO_VEST'}),
+            ("list, camera + 1h window", AlertListView, {
+                'camera_id': f"{SEED_PREFIX}7",
+                'since': (window_end - timedelta(hours=1)).isoformat(),
+                'until': window_end.isoformat()
+            }),
+        ]
+        self.stdout.write(f"{'query':<28} {'rows':>5} {'avg ms':>9} {'max ms':>9}")
+        for name, view, params in queries:
+            self.time_query(name, view.as_view(), params, options['repeat'])
+        self.time_deep_page(options['repeat'])
+
+    def seed(self, rows, cameras, batch):
+        types = [choice for choice, _ in Alert.VIOLATION_CHOICES]
+        rng = random.Random(0)
+        now = timezone.now()
+        start = time.perf_counter()
+        with explicit_timestamps():
+            for offset in range(0, rows, batch):
+                Alert.objects.bulk_create([
+                    Alert(
+                        timestamp=now - timedelta(seconds=3 * (offset + i)),
+                        violation_type=rng.choice(types),
+                        camera_id=f"{SEED_PREFIX}{rng.randrange(cameras)}",
+                        summary=f"Seeded alert {offset + i}",
+                        detections=[]
+                    )
+                    for i in range(min(batch, rows - offset))
+                ], batch_size=batch)
+                self.stdout.write(f"\r🌱 Seeded {min(offset + batch, rows)}/{rows}", ending='')
+                self.stdout.flush()
+        self.stdout.write(f"\n🌱 Seeded {rows} alerts in {time.perf_counter() - start:.1f}s")
+
+    def request(self, view, params):
+        response = view(RequestFactory().get('/api/alerts/', params))
+        response.render()
+        return response
+
+    def time_query(self, name, view, params, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            response = self.request(view, params)
+            timings.append((time.perf_counter() - start) * 1000)
+        data = response.data
+        count = len(data['results']) if isinstance(data, dict) else len(data)
+        self.stdout.write(f"{name:<28} {count:5d} {sum(timings) / len(timings):9.2f} {max(timings):9.2f}")
+
+    def time_deep_page(self, repeat, pages=20):
+        """Follow the next cursor; with keyset pagination page N should cost about what page 1 does."""
+        view = AlertListView.as_view()
+        params, timings = {}, []
+        for _ in range(pages):
+            start = time.perf_counter()
+            response = self.request(view, params)
+            timings.append((time.perf_counter() - start) * 1000)
+            next_url = response.data['next']
+            if not next_url:
+                break
+            params = {'cursor': parse_qs(urlparse(next_url).query)['cursor'][0]}
+        self.stdout.write(f"{f'list, page 1 -> {len(timings)}':<28} {'':5} "
+                          f"{timings[0]:9.2f} {timings[-1]:9.2f}  (first / last page ms)")
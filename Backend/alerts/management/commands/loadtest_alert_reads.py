@@ -0,0 +1,84 @@
+"""Many dashboards polling the alert read endpoints at once, with and without the read cache.
+
+    python manage.py loadtest_alert_reads
+    python manage.py loadtest_alert_reads --dashboards 50 --seconds 10 --write-every 2
+
+Every dashboard is a thread that polls /api/alerts/summaries/ and /api/alerts/ through
+the full Django stack (middleware, URL routing, views) as fast as it can. Modes:
+'uncached' turns ALERTS_CACHE_ENABLED off, 'cached' serves 200s from the cache, and
+'conditional' sends back the last ETag so unchanged polls get 304. --write-every adds
+an alert every N seconds so invalidation is part of the run.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+
+from alerts.models import Alert
+
+PATHS = ['/api/alerts/summaries/', '/api/alerts/?page_size=50']
+
+
+class Command(BaseCommand):
+    help = "Load-test the alert read endpoints with many concurrent polling dashboards"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dashboards', type=int, default=20)
+        parser.add_argument('--seconds', type=float, default=5.0)
+        parser.add_argument('--write-every', type=float, default=0, help="Create an alert every N seconds (0: never)")
+        parser.add_argument('--modes', nargs='+', default=['uncached', 'cached', 'conditional'])
+
+    def handle(self, *args, **options):
+        host = next((h.lstrip('.') for h in settings.ALLOWED_HOSTS if h != '*'), 'localhost')
+        self.stdout.write(f"📊 {Alert.objects.count()} alerts, {options['dashboards']} dashboards, "
+                          f"{options['seconds']}s per mode")
+        self.stdout.write(f"{'mode':<12} {'requests':>9} {'req/s':>9} {'304s':>7} {'avg ms':>8}")
+        for mode in options['modes']:
+            with override_settings(ALERTS_CACHE_ENABLED=mode != 'uncached'):
+                self.run_mode(mode, host, options)
+
+    def run_mode(self, mode, host, options):
+        stop = threading.Event()
+        results = []  # (status, ms) per request, appended from every dashboard thread
+
+        def dashboard():
+            client = Client(HTTP_HOST=host)
+            etags = {}
+            try:
+                while not stop.is_set():
+                    for path in PATHS:
+                        headers = {'HTTP_IF_NONE_MATCH': etags[path]} if mode == 'conditional' and path in etags else {}
+                        start = time.perf_counter()
+                        response = client.get(path, **headers)
+                        results.append((response.status_code, (time.perf_counter() - start) * 1000))
+                        if response.has_header('ETag'):
+                            etags[path] = response['ETag']
+            finally:
+                connection.close()
+
+        def writer():
+            try:
+                while not stop.wait(options['write_every']):
+                    Alert.objects.create(violation_type='WEAPON_DETECTED', camera_id='LOADTEST', summary="Load test alert")
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=dashboard) for _ in range(options['dashboards'])]
+        if options['write_every']:
+            threads.append(threading.Thread(target=writer))
+        for thread in threads:
+            thread.start()
+        time.sleep(options['seconds'])
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        errors = sum(1 for code, _ in results if code not in (200, 304))
+        not_modified = sum(1 for code, _ in results if code == 304)
+        avg_ms = sum(ms for _, ms in results) / max(1, len(results))
+        self.stdout.write(f"{mode:<12} {len(results):9d} {len(results) / options['seconds']:9.1f} "
+                          f"{not_modified:7d} {avg_ms:8.2f}" + (f"  ({errors} errors)" if errors else ""))
+        Alert.objects.filter(camera_id='LOADTEST').delete()
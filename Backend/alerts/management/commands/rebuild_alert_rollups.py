@@ -0,0 +1,22 @@
+"""Recompute the per-minute and per-hour alert rollups from the alert table.
+
+    python manage.py rebuild_alert_rollups
+
+Needed after loading alerts with bulk_create (e.g. bench_alert_list) or after
+editing alerts with queryset.update(), which bypass the signals that keep the
+rollups current.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from alerts.rollups import rebuild
+
+
+class Command(BaseCommand):
+    help = "Rebuild the alert statistics rollups from raw alerts"
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        written = rebuild()
+        self.stdout.write(f"📈 Rebuilt {written} rollup rows in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,34 @@
+"""Run background media jobs (thumbnails, clip transcodes, hashes) in this process.
+
+    python manage.py run_media_worker                 # serve forever with 2 threads
+    python manage.py run_media_worker --workers 4
+    python manage.py run_media_worker --once          # drain the due jobs and exit
+
+Useful with MEDIA_WORKERS = 0, to keep transcodes out of the web server process, or
+to pick up jobs left pending while the server was down.
+"""
+import threading
+
+from django.core.management.base import BaseCommand
+
+from alerts.media import MediaWorkerPool
+from alerts.models import MediaJob
+
+
+class Command(BaseCommand):
+    help = "Process queued alert media jobs"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--once', action='store_true', help="Exit when no job is due")
+
+    def handle(self, *args, **options):
+        pending = MediaJob.objects.filter(status__in=['pending', 'running']).count()
+        self.stdout.write(f"🛠️ Media worker with {options['workers']} threads, {pending} jobs queued")
+        pool = MediaWorkerPool()
+        threads = [threading.Thread(target=pool.work, kwargs={'until_idle': options['once']}, daemon=True)
+                   for _ in range(options['workers'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
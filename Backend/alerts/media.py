@@ -0,0 +1,195 @@
+# alerts/media.py
+
+"""Background media processing for ingested alerts.
+
+Ingest only stores the row and the uploaded files and queues MediaJob rows; workers
+then build the snapshot thumbnail, transcode the clip to H.264 MP4 with the index at
+the front (so browsers can start playback before the download finishes) and record
+SHA-256 hashes. The queue is the database table itself, so there is no broker and
+pending jobs survive restarts. Workers are threads in the server process
+(MEDIA_WORKERS), started on the first ingest, and/or `manage.py run_media_worker`.
+A claimed job holds a lease; if its worker dies the job is picked up again once the
+lease runs out.
+"""
+import hashlib
+import io
+import os
+import subprocess
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from PIL import Image
+
+from .models import MediaJob
+
+
+class PermanentMediaError(Exception):
+    """Retrying cannot help (missing file or ffmpeg); the job fails straight away."""
+
+
+def file_sha256(field_file):
+    digest = hashlib.sha256()
+    with field_file.open('rb') as f:
+        for chunk in f.chunks():
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def process_snapshot(alert):
+    if not alert.snapshot:
+        return
+    if not default_storage.exists(alert.snapshot.name):
+        raise PermanentMediaError(f"Snapshot {alert.snapshot.name} is missing")
+
+    with alert.snapshot.open('rb') as f:
+        image = Image.open(f)
+        image.thumbnail((settings.MEDIA_THUMBNAIL_SIZE, settings.MEDIA_THUMBNAIL_SIZE))
+        buffer = io.BytesIO()
+        image.convert('RGB').save(buffer, 'JPEG', quality=80, optimize=True)
+    stem = os.path.splitext(os.path.basename(alert.snapshot.name))[0]
+    alert.thumbnail.save(f"{stem}_thumb.jpg", ContentFile(buffer.getvalue()), save=False)
+    alert.snapshot_sha256 = file_sha256(alert.snapshot)
+    alert.save(update_fields=['thumbnail', 'snapshot_sha256'])
+
+
+def transcode(source_path, target_path):
+    command = [
+        settings.FFMPEG_BINARY, '-nostdin', '-y', '-loglevel', 'error',
+        '-i', source_path,
+        '-c:v', 'libx264', '-preset', settings.MEDIA_TRANSCODE_PRESET, '-crf', str(settings.MEDIA_TRANSCODE_CRF),
+        '-pix_fmt', 'yuv420p', '-movflags', '+faststart', '-an',
+        '-f', 'mp4', target_path,
+    ]
+    try:
+        result = subprocess.run(command, capture_output=True, timeout=settings.MEDIA_TRANSCODE_TIMEOUT_SECONDS)
+    except FileNotFoundError:
+        raise PermanentMediaError(f"{settings.FFMPEG_BINARY} not found; install ffmpeg or set FFMPEG_BINARY")
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg exited with {result.returncode}: {result.stderr.decode(errors='replace')[-300:]}")
+
+
+def process_clip(alert):
+    if not alert.clip:
+        return
+    if not default_storage.exists(alert.clip.name):
+        raise PermanentMediaError(f"Clip {alert.clip.name} is missing")
+
+    original = alert.clip.name
+    if not original.endswith('.web.mp4'):  # Already transcoded by an earlier attempt otherwise
+        stem = os.path.splitext(os.path.basename(original))[0]
+        target = default_storage.get_available_name(f"clips/{stem}.web.mp4")
+        partial = default_storage.path(target) + '.part'
+        try:
+            transcode(default_storage.path(original), partial)
+            os.replace(partial, default_storage.path(target))
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+        before, after = default_storage.size(original), default_storage.size(target)
+        print(f"🎞️ Alert #{alert.pk} clip transcoded: {before} -> {after} bytes ({before / max(1, after):.1f}x smaller)")
+        alert.clip.name = target
+
+    alert.clip_sha256 = file_sha256(alert.clip)
+    alert.save(update_fields=['clip', 'clip_sha256'])
+    if original != alert.clip.name and not settings.MEDIA_KEEP_ORIGINAL_CLIPS:
+        default_storage.delete(original)
+
+
+TASKS = {
+    'snapshot': process_snapshot,
+    'clip': process_clip,
+}
+
+
+def claim_next():
+    """Take the oldest due job (pending, or running with an expired lease), or return None."""
+    now = timezone.now()
+    due = Q(status='pending', run_after__lte=now) | Q(status='running', run_after__lt=now)
+    for job_id in MediaJob.objects.filter(due).order_by('id').values_list('id', flat=True)[:10]:
+        # Compare-and-set, so two workers never both take the same job
+        claimed = MediaJob.objects.filter(due, id=job_id).update(
+            status='running', attempts=F('attempts') + 1,
+            run_after=now + timedelta(seconds=settings.MEDIA_JOB_LEASE_SECONDS)
+        )
+        if claimed:
+            return MediaJob.objects.select_related('alert').get(id=job_id)
+    return None
+
+
+def run_job(job):
+    try:
+        TASKS[job.kind](job.alert)
+        job.status, job.last_error = 'done', ''
+    except Exception as e:
+        job.last_error = f"{type(e).__name__}: {e}"
+        if isinstance(e, PermanentMediaError) or job.attempts >= settings.MEDIA_JOB_MAX_ATTEMPTS:
+            job.status = 'failed'
+            print(f"❌ Media {job.kind} job for alert #{job.alert_id} failed: {job.last_error}")
+        else:
+            job.status = 'pending'
+            job.run_after = timezone.now() + timedelta(seconds=settings.MEDIA_JOB_RETRY_SECONDS * job.attempts)
+            print(f"⚠️ Media {job.kind} job for alert #{job.alert_id} failed, retry #{job.attempts}: {job.last_error}")
+    if job.status != 'pending':
+        job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'last_error', 'run_after', 'finished_at'])
+
+
+class MediaWorkerPool:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.threads = []
+
+    def start(self, workers):
+        with self.lock:
+            self.threads = [thread for thread in self.threads if thread.is_alive()]
+            while len(self.threads) < workers:
+                thread = threading.Thread(target=self.work, name=f"media-{len(self.threads)}", daemon=True)
+                thread.start()
+                self.threads.append(thread)
+
+    def wake(self):
+        self.start(settings.MEDIA_WORKERS)
+        self.wakeup.set()
+
+    def work(self, until_idle=False):
+        try:
+            while True:
+                try:
+                    close_old_connections()  # Drop a connection the database closed since the last job
+                    job = claim_next()
+                    if job is not None:
+                        run_job(job)
+                        continue
+                except Exception as e:
+                    # The job (if any) keeps its lease and is retried once it expires
+                    print(f"❌ Media worker {threading.current_thread().name} error: {type(e).__name__}: {e}")
+                    connection.close()
+                if until_idle:
+                    return
+                self.wakeup.wait(settings.MEDIA_JOB_POLL_SECONDS)
+                self.wakeup.clear()
+        finally:
+            connection.close()
+
+
+pool = MediaWorkerPool()
+
+
+def enqueue(alert, *kinds):
+    """Queue media jobs for an alert; workers are woken once the surrounding transaction commits."""
+    for kind in kinds:
+        MediaJob.objects.create(alert=alert, kind=kind)
+    if kinds:
+        transaction.on_commit(pool.wake)
+
+
+def enqueue_for_upload(alert, files):
+    """Jobs for whichever of snapshot / clip arrived in this request."""
+    enqueue(alert, *[kind for kind in ('snapshot', 'clip') if kind in files])
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.5 on 2026-10-17 06:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alerts', '0004_clipupload'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='alert',
+            index=models.Index(fields=['timestamp', 'id'], name='alert_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='alert',
+            index=models.Index(fields=['camera_id', 'timestamp', 'id'], name='alert_camera_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='alert',
+            index=models.Index(fields=['violation_type', 'timestamp', 'id'], name='alert_type_ts_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.5 on 2026-10-17 06:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alerts', '0005_alert_list_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AlertRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('minute', 'Minute'), ('hour', 'Hour')], max_length=10)),
+                ('bucket', models.DateTimeField()),
+                ('camera_id', models.CharField(blank=True, default='', max_length=100)),
+                ('violation_type', models.CharField(max_length=50)),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('granularity', 'bucket', 'camera_id', 'violation_type'), name='alert_rollup_unique_bucket')],
+            },
+        ),
+    ]
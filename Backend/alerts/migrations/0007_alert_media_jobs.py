@@ -0,0 +1,47 @@
+# Generated by Django 5.2.5 on 2026-10-17 06:32
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alerts', '0006_alertrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alert',
+            name='clip_sha256',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='alert',
+            name='snapshot_sha256',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='alert',
+            name='thumbnail',
+            field=models.ImageField(blank=True, null=True, upload_to='thumbnails/'),
+        ),
+        migrations.CreateModel(
+            name='MediaJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('snapshot', 'Snapshot thumbnail and hash'), ('clip', 'Clip transcode and hash')], max_length=20)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('alert', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='media_jobs', to='alerts.alert')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'run_after'], name='media_job_due_idx')],
+            },
+        ),
+    ]
@@ -2,7 +2,10 @@
 # Create your models here.
 # alerts/models.py
 
+import uuid
+
 from django.db import models
+from django.utils import timezone
 
 class Alert(models.Model):
     VIOLATION_CHOICES = [
@@ -17,6 +20,101 @@ class Alert(models.Model):
     snapshot = models.ImageField(upload_to='snapshots/', blank=True, null=True)
     clip = models.FileField(upload_to='clips/', blank=True, null=True)
     summary = models.TextField(blank=True, null=True)
+    detections = models.JSONField(blank=True, null=True)  # Boxes at detection time, sent with the first alert
+    idempotency_key = models.CharField(max_length=64, unique=True, blank=True, null=True)  # Idempotency-Key of the create request
+    # Filled in by the background media jobs (alerts/media.py)
+    thumbnail = models.ImageField(upload_to='thumbnails/', blank=True, null=True)
+    snapshot_sha256 = models.CharField(max_length=64, blank=True)
+    clip_sha256 = models.CharField(max_length=64, blank=True)
+
+    class Meta:
+        # Listings are newest first, optionally narrowed to one camera or type; id breaks timestamp ties
+        indexes = [
+            models.Index(fields=['timestamp', 'id'], name='alert_ts_idx'),
+            models.Index(fields=['camera_id', 'timestamp', 'id'], name='alert_camera_ts_idx'),
+            models.Index(fields=['violation_type', 'timestamp', 'id'], name='alert_type_ts_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_violation_type_display()} at {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
+
+
+class ClipUpload(models.Model):
+    """A clip arriving in fixed-size chunks; appended to a .part file in MEDIA_ROOT/clips until finalized."""
+    STATUS_CHOICES = [
+        ('uploading', 'Uploading'),
+        ('complete', 'Complete'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    idempotency_key = models.CharField(max_length=100, unique=True, blank=True, null=True)
+    alert = models.ForeignKey(Alert, on_delete=models.CASCADE, related_name='clip_uploads')
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    chunk_size = models.IntegerField()
+    received = models.BigIntegerField(default=0)  # Bytes appended so far; chunks arrive strictly in order
+    sha256 = models.CharField(max_length=64, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='uploading')
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(blank=True, null=True)
+
+    @property
+    def part_name(self):
+        return f"clips/{self.id}.part"
+
+    def __str__(self):
+        return f"Clip upload {self.id} for alert #{self.alert_id} ({self.received}/{self.size} bytes)"
+
+
+class AlertRollup(models.Model):
+    """Alert counts per time bucket, camera and violation type, kept up to date on every insert (alerts/rollups.py)."""
+    GRANULARITY_CHOICES = [
+        ('minute', 'Minute'),
+        ('hour', 'Hour'),
+    ]
+
+    granularity = models.CharField(max_length=10, choices=GRANULARITY_CHOICES)
+    bucket = models.DateTimeField()  # Start of the minute or hour, UTC
+    camera_id = models.CharField(max_length=100, blank=True, default='')  # '' for alerts without a camera
+    violation_type = models.CharField(max_length=50)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['granularity', 'bucket', 'camera_id', 'violation_type'],
+                                    name='alert_rollup_unique_bucket'),
+        ]
+
+    def __str__(self):
+        return f"{self.count} x {self.violation_type} on {self.camera_id or '-'} ({self.granularity} of {self.bucket})"
+
+
+class MediaJob(models.Model):
+    """Background processing of an alert's snapshot or clip, claimed by media workers from this table."""
+    KIND_CHOICES = [
+        ('snapshot', 'Snapshot thumbnail and hash'),
+        ('clip', 'Clip transcode and hash'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    alert = models.ForeignKey(Alert, on_delete=models.CASCADE, related_name='media_jobs')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)  # Pending: not before; running: lease expiry
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='media_job_due_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.get_violation_type_display()} at {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
\ No newline at end of file
+        return f"{self.kind} job for alert #{self.alert_id} ({self.status})"
@@ -0,0 +1,101 @@
+# alerts/rollups.py
+
+"""Incremental per-minute and per-hour alert counts.
+
+Every created or deleted Alert adds or removes one from its two AlertRollup rows, and
+an edit of its timestamp, camera or type moves it between buckets, so
+statistics read a few rollup rows per bucket instead of grouping the alert table.
+bulk_create and queryset.update() skip signals; run `manage.py rebuild_alert_rollups`
+after bulk loads.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Value
+from django.db.models.functions import Coalesce
+from django.db.models.functions import TruncHour, TruncMinute
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import Alert, AlertRollup
+
+TRUNCATE = {
+    'minute': lambda moment: moment.replace(second=0, microsecond=0),
+    'hour': lambda moment: moment.replace(minute=0, second=0, microsecond=0),
+}
+
+
+ROLLUP_FIELDS = ('timestamp', 'camera_id', 'violation_type')
+
+
+def rollup_key(alert):
+    return alert.timestamp, alert.camera_id or '', alert.violation_type
+
+
+def record(key, delta):
+    timestamp, camera_id, violation_type = key
+    for granularity, truncate in TRUNCATE.items():
+        bucket = dict(granularity=granularity, bucket=truncate(timestamp),
+                      camera_id=camera_id, violation_type=violation_type)
+        if delta < 0:
+            # Never below zero, even if rollups drifted through signal-less bulk edits
+            AlertRollup.objects.filter(count__gte=-delta, **bucket).update(count=F('count') + delta)
+            continue
+        if AlertRollup.objects.filter(**bucket).update(count=F('count') + delta):
+            continue
+        try:
+            with transaction.atomic():
+                AlertRollup.objects.create(count=delta, **bucket)
+        except IntegrityError:
+            # Another insert created the bucket first
+            AlertRollup.objects.filter(**bucket).update(count=F('count') + delta)
+
+
+@receiver(pre_save, sender=Alert)
+def remember_rollup_key(sender, instance, update_fields=None, **kwargs):
+    """Before an edit that can move the alert to another bucket, note the bucket it is counted in."""
+    instance._rollup_previous = None
+    if instance.pk is None or (update_fields is not None and not set(update_fields) & set(ROLLUP_FIELDS)):
+        return
+    previous = Alert.objects.filter(pk=instance.pk).values_list(*ROLLUP_FIELDS).first()
+    if previous is not None:
+        instance._rollup_previous = (previous[0], previous[1] or '', previous[2])
+
+
+@receiver(post_save, sender=Alert)
+def count_saved_alert(sender, instance, created, **kwargs):
+    if created:
+        record(rollup_key(instance), 1)
+        return
+    previous = getattr(instance, '_rollup_previous', None)
+    if previous is not None and previous != rollup_key(instance):
+        record(previous, -1)
+        record(rollup_key(instance), 1)
+
+
+@receiver(post_delete, sender=Alert)
+def uncount_deleted_alert(sender, instance, **kwargs):
+    record(rollup_key(instance), -1)
+
+
+def rebuild(batch_size=5000):
+    """Recompute every rollup from the alert table; returns the number of rollup rows written."""
+    written = 0
+    with transaction.atomic():
+        AlertRollup.objects.all().delete()
+        for granularity, trunc in (('minute', TruncMinute), ('hour', TruncHour)):
+            groups = (
+                # NULL and '' cameras share one rollup row, so they must be one group
+                Alert.objects.annotate(bucket=trunc('timestamp'), cam=Coalesce('camera_id', Value('')))
+                .values('bucket', 'cam', 'violation_type')
+                .annotate(count=Count('id'))
+                .order_by()
+            )
+            batch = []
+            for group in groups.iterator():
+                batch.append(AlertRollup(granularity=granularity, bucket=group['bucket'],
+                                         camera_id=group['cam'],
+                                         violation_type=group['violation_type'], count=group['count']))
+                if len(batch) >= batch_size:
+                    written += len(AlertRollup.objects.bulk_create(batch))
+                    batch = []
+            written += len(AlertRollup.objects.bulk_create(batch))
+    return written
@@ -1,9 +1,26 @@
 # alerts/serializers.py
 
 from rest_framework import serializers
-from .models import Alert
+from .models import Alert, ClipUpload
 
 class AlertSerializer(serializers.ModelSerializer):
     class Meta:
         model = Alert
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+        read_only_fields = ['idempotency_key', 'thumbnail', 'snapshot_sha256', 'clip_sha256']
+
+
+class ClipUploadSerializer(serializers.ModelSerializer):
+    upload_id = serializers.UUIDField(source='id', read_only=True)
+    offset = serializers.IntegerField(source='received', read_only=True)
+
+    class Meta:
+        model = ClipUpload
+        fields = ['upload_id', 'alert', 'filename', 'size', 'chunk_size', 'offset', 'status']
+
+
+class AlertListSerializer(serializers.ModelSerializer):
+    """Slim listing row; AlertListView loads only these columns."""
+    class Meta:
+        model = Alert
+        fields = ['id', 'timestamp', 'violation_type', 'camera_id', 'summary', 'snapshot', 'thumbnail', 'clip']
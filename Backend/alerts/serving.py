@@ -0,0 +1,127 @@
+# alerts/serving.py
+
+"""Media serving (snapshots, thumbnails, clips) with byte ranges and conditional requests.
+
+Browsers fetch a clip in byte ranges while the operator scrubs, so only the viewed
+parts are transferred. With a front proxy, MEDIA_SENDFILE_BACKEND hands the file to
+it (nginx X-Accel-Redirect, Apache/lighttpd X-Sendfile), which then handles ranges
+itself; without one the requested range is streamed from disk in chunks.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+PARTIAL_SUFFIX = '.part'  # Chunked uploads and transcodes in progress (see models.ClipUpload, media.py)
+
+
+def parse_range(header, size):
+    """(start, end) inclusive for a single byte range, None to serve the whole file, or 'unsatisfiable'."""
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if not match or not any(match.groups()):
+        return None  # Multiple or malformed ranges: a full response is always allowed
+    first, last = match.groups()
+    if first and last and int(last) < int(first):
+        return None  # Invalid range-spec (RFC 9110 14.1.1): ignore the header
+    if size == 0:
+        return 'unsatisfiable'  # No byte range of an empty file exists
+    if not first:
+        suffix = int(last)
+        if suffix == 0:
+            return 'unsatisfiable'
+        return max(0, size - suffix), size - 1
+    start = int(first)
+    if start >= size:
+        return 'unsatisfiable'
+    return start, min(int(last), size - 1) if last else size - 1
+
+
+def if_range_matches(request, etag, mtime):
+    """A Range is only honoured if If-Range (when sent) still names this version of the file."""
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == mtime
+
+
+def read_range(path, start, end, chunk_size):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+@require_safe
+def serve_media(request, path):
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404("Not found")
+    if path.endswith(PARTIAL_SUFFIX) or not os.path.isfile(full_path):
+        raise Http404("Not found")
+
+    stat = os.stat(full_path)
+    size, mtime = stat.st_size, int(stat.st_mtime)
+    etag = f'"{stat.st_mtime_ns:x}-{size:x}"'
+    content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+
+    def finish(response):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(mtime)
+        response['Accept-Ranges'] = 'bytes'
+        patch_cache_control(response, max_age=settings.MEDIA_CACHE_SECONDS)
+        return response
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=mtime)
+    if not_modified is not None:
+        return finish(not_modified)
+
+    backend = settings.MEDIA_SENDFILE_BACKEND
+    if backend == 'x-accel-redirect':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT_PREFIX + quote(path)
+        return finish(response)
+    if backend == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = full_path
+        return finish(response)
+
+    byte_range = None
+    if request.headers.get('Range') and if_range_matches(request, etag, mtime):
+        byte_range = parse_range(request.headers['Range'], size)
+    if byte_range == 'unsatisfiable':
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f"bytes */{size}"
+        return finish(response)
+
+    if request.method == 'HEAD':
+        response = HttpResponse(content_type=content_type)
+        response['Content-Length'] = size
+        return finish(response)
+    if byte_range is None:
+        response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+        response.block_size = settings.MEDIA_STREAM_CHUNK_BYTES
+        return finish(response)
+
+    start, end = byte_range
+    response = StreamingHttpResponse(read_range(full_path, start, end, settings.MEDIA_STREAM_CHUNK_BYTES),
+                                     status=206, content_type=content_type)
+    response['Content-Range'] = f"bytes {start}-{end}/{size}"
+    response['Content-Length'] = end - start + 1
+    return finish(response)
@@ -0,0 +1,163 @@
+# alerts/stream.py
+
+"""Push feed of new alerts as server-sent events.
+
+Each newly created Alert is serialized once, after its transaction commits, and
+handed to every subscriber's bounded buffer. A client that falls behind far enough
+to overflow its buffer, or that reconnects with Last-Event-ID, is backfilled from
+the database; otherwise the stream never queries it. The broker is per process:
+subscribers only see alerts created by the same server process.
+"""
+import asyncio
+import threading
+from collections import deque
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from rest_framework.renderers import JSONRenderer
+
+from .models import Alert
+from .serializers import AlertListSerializer
+
+
+def render_alert(alert):
+    return JSONRenderer().render(AlertListSerializer(alert).data).decode()
+
+
+class Subscriber:
+    """One connected client: a bounded buffer of (alert id, json) plus a wake-up event."""
+    def __init__(self, maxlen, loop=None):
+        self.events = deque(maxlen=maxlen)
+        self.overflowed = False
+        self.lock = threading.Lock()
+        self.loop = loop  # Set for async streams; pushes arrive from other threads
+        self.ready = asyncio.Event() if loop else threading.Event()
+
+    def push(self, event):
+        """Buffer an event and wake the stream; False if the stream's event loop is gone."""
+        with self.lock:
+            if len(self.events) == self.events.maxlen:
+                self.overflowed = True  # The oldest event is dropped; the stream backfills it
+            self.events.append(event)
+        if self.loop:
+            try:
+                self.loop.call_soon_threadsafe(self.ready.set)
+            except RuntimeError:
+                return False  # Loop closed (ASGI shutdown, or a disconnect that skipped the stream's cleanup)
+        else:
+            self.ready.set()
+        return True
+
+    def drain(self):
+        with self.lock:
+            events, overflowed = list(self.events), self.overflowed
+            self.events.clear()
+            self.overflowed = False
+            self.ready.clear()
+        return events, overflowed
+
+
+class AlertBroker:
+    def __init__(self):
+        self.subscribers = set()
+        self.lock = threading.Lock()
+
+    def subscribe(self, loop=None):
+        subscriber = Subscriber(settings.ALERT_STREAM_BUFFER, loop)
+        with self.lock:
+            self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            self.subscribers.discard(subscriber)
+
+    def publish(self, alert_id, data):
+        """Hand an alert to every subscriber. Runs in the writer's on_commit hook, so one dead
+        subscriber must never fail the request that created the alert."""
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            try:
+                delivered = subscriber.push((alert_id, data))
+            except Exception as e:
+                print(f"⚠️ Alert stream subscriber failed: {type(e).__name__}: {e}")
+                delivered = False
+            if not delivered:
+                self.unsubscribe(subscriber)
+
+
+broker = AlertBroker()
+
+
+@receiver(post_save, sender=Alert)
+def publish_new_alert(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: broker.publish(instance.pk, render_alert(instance)))
+
+
+def backlog(after_id):
+    """Alerts after after_id, oldest first, capped at ALERT_STREAM_BACKLOG."""
+    alerts = (
+        Alert.objects.filter(id__gt=after_id)
+        .only(*AlertListSerializer.Meta.fields)
+        .order_by('id')[:settings.ALERT_STREAM_BACKLOG]
+    )
+    return [(alert.id, render_alert(alert)) for alert in alerts]
+
+
+class AlertEventStream:
+    """SSE body for one client, resuming after last_id when given.
+
+    sync_events() serves WSGI servers and async_events() ASGI servers; under ASGI a
+    waiting client costs no thread.
+    """
+    def __init__(self, last_id=None):
+        self.last_id = last_id
+        self.sent = deque(maxlen=2 * settings.ALERT_STREAM_BUFFER)  # Recent ids, so a backfill never repeats one
+
+    def format(self, events):
+        chunks = []
+        for alert_id, data in events:
+            if alert_id in self.sent:
+                continue
+            self.sent.append(alert_id)
+            self.last_id = alert_id if self.last_id is None else max(self.last_id, alert_id)
+            chunks.append(f"id: {alert_id}\nevent: alert\ndata: {data}\n\n")
+        return chunks
+
+    def sync_events(self):
+        subscriber = broker.subscribe()  # Before the backlog query, so nothing falls in between
+        try:
+            yield f"retry: {settings.ALERT_STREAM_RETRY_MS}\n\n"
+            events = backlog(self.last_id) if self.last_id is not None else []
+            while True:
+                yield from self.format(events)
+                if not subscriber.ready.wait(timeout=settings.ALERT_STREAM_HEARTBEAT_SECONDS):
+                    yield ": keep-alive\n\n"
+                events, overflowed = subscriber.drain()
+                if overflowed and self.last_id is not None:
+                    events = backlog(self.last_id) + events
+        finally:
+            broker.unsubscribe(subscriber)
+
+    async def async_events(self):
+        subscriber = broker.subscribe(asyncio.get_running_loop())
+        try:
+            yield f"retry: {settings.ALERT_STREAM_RETRY_MS}\n\n"
+            events = await sync_to_async(backlog)(self.last_id) if self.last_id is not None else []
+            while True:
+                for chunk in self.format(events):
+                    yield chunk
+                try:
+                    await asyncio.wait_for(subscriber.ready.wait(), settings.ALERT_STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                events, overflowed = subscriber.drain()
+                if overflowed and self.last_id is not None:
+                    events = await sync_to_async(backlog)(self.last_id) + events
+        finally:
+            broker.unsubscribe(subscriber)
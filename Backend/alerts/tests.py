@@ -1,3 +1,270 @@
-from django.test import TestCase
+# alerts/tests.py
 
-# Create your tests here.
+import hashlib
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+
+from .models import Alert, AlertRollup, ClipUpload
+from .rollups import rebuild
+from .serving import parse_range
+
+
+class MediaRootMixin:
+    """Each test writes its files to a fresh MEDIA_ROOT."""
+    def use_temp_media_root(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=media_root, MEDIA_WORKERS=0, MEDIA_SENDFILE_BACKEND=None)
+        override.enable()
+        self.addCleanup(override.disable)
+        return media_root
+
+
+class ChunkedClipUploadTests(MediaRootMixin, TestCase):
+    CLIP = bytes(range(256)) * 40  # 10240 bytes
+    CHUNK = 4096
+
+    def setUp(self):
+        self.use_temp_media_root()
+        self.alert = Alert.objects.create(violation_type='WEAPON_DETECTED', camera_id='CAM-1',
+                                          idempotency_key='alert-1')
+
+    def start(self, key='upload-1'):
+        return self.client.post('/api/alerts/uploads/',
+                                {'alert_key': 'alert-1', 'filename': 'clip.mp4',
+                                 'size': len(self.CLIP), 'chunk_size': self.CHUNK},
+                                content_type='application/json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def put_chunk(self, upload_id, index, data=None):
+        if data is None:
+            data = self.CLIP[index * self.CHUNK:(index + 1) * self.CHUNK]
+        return self.client.put(f'/api/alerts/uploads/{upload_id}/chunks/{index}/', data,
+                                content_type='application/octet-stream')
+
+    def finalize(self, upload_id, sha256=None):
+        return self.client.post(f'/api/alerts/uploads/{upload_id}/finalize/',
+                                {'sha256': sha256 or hashlib.sha256(self.CLIP).hexdigest()},
+                                content_type='application/json')
+
+    def upload_all(self, upload_id):
+        for index in range(3):
+            self.assertEqual(self.put_chunk(upload_id, index).status_code, 200)
+
+    def test_start_is_idempotent(self):
+        first = self.start()
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(first.json()['offset'], 0)
+        again = self.start()
+        self.assertEqual(again.status_code, 200)
+        self.assertEqual(again.json()['upload_id'], first.json()['upload_id'])
+        self.assertEqual(ClipUpload.objects.count(), 1)
+
+    def test_duplicate_chunk_is_acknowledged_without_rewriting(self):
+        upload_id = self.start().json()['upload_id']
+        self.assertEqual(self.put_chunk(upload_id, 0).json()['offset'], self.CHUNK)
+        duplicate = self.put_chunk(upload_id, 0)
+        self.assertEqual(duplicate.status_code, 200)
+        self.assertEqual(duplicate.json()['offset'], self.CHUNK)
+        self.assertEqual(ClipUpload.objects.get().received, self.CHUNK)
+
+    def test_out_of_order_chunk_returns_resume_offset(self):
+        upload_id = self.start().json()['upload_id']
+        self.put_chunk(upload_id, 0)
+        response = self.put_chunk(upload_id, 2)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['offset'], self.CHUNK)
+        status = self.client.get(f'/api/alerts/uploads/{upload_id}/')
+        self.assertEqual(status.json()['offset'], self.CHUNK)
+
+    def test_wrong_chunk_length_is_rejected(self):
+        upload_id = self.start().json()['upload_id']
+        response = self.put_chunk(upload_id, 0, b'short')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(ClipUpload.objects.get().received, 0)
+
+    def test_finalize_before_all_bytes_arrived(self):
+        upload_id = self.start().json()['upload_id']
+        self.put_chunk(upload_id, 0)
+        response = self.finalize(upload_id)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['offset'], self.CHUNK)
+
+    def test_checksum_mismatch_restarts_upload(self):
+        upload_id = self.start().json()['upload_id']
+        self.upload_all(upload_id)
+        response = self.finalize(upload_id, sha256='0' * 64)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['offset'], 0)
+        upload = ClipUpload.objects.get()
+        self.assertEqual(upload.status, 'uploading')
+        self.assertEqual(os.path.getsize(default_storage.path(upload.part_name)), 0)
+
+        self.upload_all(upload_id)
+        self.assertEqual(self.finalize(upload_id).status_code, 200)
+
+    def test_finalize_attaches_clip_and_is_idempotent(self):
+        upload_id = self.start().json()['upload_id']
+        self.upload_all(upload_id)
+        response = self.finalize(upload_id)
+        self.assertEqual(response.status_code, 200)
+
+        self.alert.refresh_from_db()
+        upload = ClipUpload.objects.get()
+        self.assertEqual(upload.status, 'complete')
+        self.assertEqual(upload.sha256, hashlib.sha256(self.CLIP).hexdigest())
+        with self.alert.clip.open('rb') as f:
+            self.assertEqual(f.read(), self.CLIP)
+        self.assertFalse(os.path.exists(default_storage.path(upload.part_name)))
+
+        again = self.finalize(upload_id)
+        self.assertEqual(again.status_code, 200)
+        self.assertEqual(again.json()['clip'], response.json()['clip'])
+        self.assertEqual(self.put_chunk(upload_id, 0).status_code, 200)
+
+
+class ParseRangeTests(TestCase):
+    def test_ranges(self):
+        self.assertEqual(parse_range('bytes=0-99', 1000), (0, 99))
+        self.assertEqual(parse_range('bytes=900-', 1000), (900, 999))
+        self.assertEqual(parse_range('bytes=-100', 1000), (900, 999))
+        self.assertEqual(parse_range('bytes=990-2000', 1000), (990, 999))
+        self.assertEqual(parse_range('bytes=-5000', 1000), (0, 999))
+
+    def test_unsatisfiable(self):
+        self.assertEqual(parse_range('bytes=1000-', 1000), 'unsatisfiable')
+        self.assertEqual(parse_range('bytes=-0', 1000), 'unsatisfiable')
+        self.assertEqual(parse_range('bytes=-5', 0), 'unsatisfiable')
+        self.assertEqual(parse_range('bytes=0-', 0), 'unsatisfiable')
+
+    def test_ignored(self):
+        self.assertIsNone(parse_range('bytes=5-2', 1000))
+        self.assertIsNone(parse_range('bytes=0-1,5-6', 1000))
+        self.assertIsNone(parse_range('items=0-1', 1000))
+        self.assertIsNone(parse_range('bytes=-', 1000))
+
+
+class MediaServingTests(MediaRootMixin, TestCase):
+    DATA = b'0123456789'
+
+    def setUp(self):
+        media_root = self.use_temp_media_root()
+        os.makedirs(os.path.join(media_root, 'clips'))
+        for name, data in (('clips/a.mp4', self.DATA), ('clips/empty.mp4', b''), ('clips/up.part', self.DATA)):
+            with open(os.path.join(media_root, name), 'wb') as f:
+                f.write(data)
+
+    def test_full_and_partial_content(self):
+        full = self.client.get('/media/clips/a.mp4')
+        self.assertEqual(full.status_code, 200)
+        self.assertEqual(b''.join(full.streaming_content), self.DATA)
+        self.assertEqual(full['Accept-Ranges'], 'bytes')
+
+        partial = self.client.get('/media/clips/a.mp4', HTTP_RANGE='bytes=2-4')
+        self.assertEqual(partial.status_code, 206)
+        self.assertEqual(partial['Content-Range'], 'bytes 2-4/10')
+        self.assertEqual(b''.join(partial.streaming_content), b'234')
+
+    def test_unsatisfiable_and_invalid_ranges(self):
+        response = self.client.get('/media/clips/a.mp4', HTTP_RANGE='bytes=20-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */10')
+        response = self.client.get('/media/clips/empty.mp4', HTTP_RANGE='bytes=-5')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */0')
+        self.assertEqual(self.client.get('/media/clips/a.mp4', HTTP_RANGE='bytes=5-2').status_code, 200)
+
+    def test_revalidation_and_if_range(self):
+        etag = self.client.get('/media/clips/a.mp4')['ETag']
+        self.assertEqual(self.client.get('/media/clips/a.mp4', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get('/media/clips/a.mp4', HTTP_RANGE='bytes=0-1', HTTP_IF_RANGE=etag).status_code, 206)
+        self.assertEqual(self.client.get('/media/clips/a.mp4', HTTP_RANGE='bytes=0-1', HTTP_IF_RANGE='"stale"').status_code, 200)
+
+    def test_partial_files_and_traversal_are_hidden(self):
+        self.assertEqual(self.client.get('/media/clips/up.part').status_code, 404)
+        self.assertEqual(self.client.get('/media/../settings.py').status_code, 404)
+        self.assertEqual(self.client.get('/media/clips/missing.mp4').status_code, 404)
+
+
+def make_alert(moment, camera_id='CAM-1', violation_type='WEAPON_DETECTED'):
+    alert = Alert.objects.create(violation_type=violation_type, camera_id=camera_id)
+    alert.timestamp = moment  # auto_now_add only applies on insert
+    alert.save()
+    return alert
+
+
+@override_settings(ALERTS_CACHE_ENABLED=False)
+class AlertCursorPaginationTests(TestCase):
+    def setUp(self):
+        base = datetime(2025, 1, 1, 12, 0, tzinfo=dt_timezone.utc)
+        self.alerts = [make_alert(base + timedelta(minutes=i % 3), camera_id=f'CAM-{i % 2}') for i in range(7)]
+
+    def collect(self, url):
+        ids = []
+        while url:
+            page = self.client.get(url).json()
+            ids += [row['id'] for row in page['results']]
+            url = page['next']
+        return ids
+
+    def test_pages_cover_every_alert_once_newest_first(self):
+        expected = [alert.id for alert in sorted(self.alerts, key=lambda a: (a.timestamp, a.id), reverse=True)]
+        self.assertEqual(self.collect('/api/alerts/?page_size=2'), expected)
+
+    def test_filters_apply_to_every_page(self):
+        expected = [alert.id for alert in sorted(self.alerts, key=lambda a: (a.timestamp, a.id), reverse=True)
+                    if alert.camera_id == 'CAM-1']
+        self.assertEqual(self.collect('/api/alerts/?page_size=2&camera_id=CAM-1'), expected)
+
+    def test_invalid_moment_is_rejected(self):
+        self.assertEqual(self.client.get('/api/alerts/?since=yesterday').status_code, 400)
+
+
+@override_settings(ALERTS_CACHE_ENABLED=False)
+class AlertRollupTests(TestCase):
+    MOMENT = datetime(2025, 1, 1, 12, 34, 56, tzinfo=dt_timezone.utc)
+
+    def counts(self, granularity='minute'):
+        return {(r.bucket, r.camera_id, r.violation_type): r.count
+                for r in AlertRollup.objects.filter(granularity=granularity, count__gt=0)}
+
+    def test_insert_and_delete_update_both_granularities(self):
+        first = make_alert(self.MOMENT)
+        make_alert(self.MOMENT + timedelta(seconds=2))
+        minute = self.MOMENT.replace(second=0)
+        hour = self.MOMENT.replace(minute=0, second=0)
+        self.assertEqual(self.counts('minute'), {(minute, 'CAM-1', 'WEAPON_DETECTED'): 2})
+        self.assertEqual(self.counts('hour'), {(hour, 'CAM-1', 'WEAPON_DETECTED'): 2})
+        first.delete()
+        self.assertEqual(self.counts('hour'), {(hour, 'CAM-1', 'WEAPON_DETECTED'): 1})
+
+    def test_edit_moves_the_count_between_buckets(self):
+        alert = make_alert(self.MOMENT)
+        response = self.client.patch(f'/api/alerts/{alert.pk}/', {'camera_id': 'CAM-2'}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.counts(), {(self.MOMENT.replace(second=0), 'CAM-2', 'WEAPON_DETECTED'): 1})
+
+    def test_rebuild_merges_null_and_empty_cameras(self):
+        make_alert(self.MOMENT, camera_id=None)
+        make_alert(self.MOMENT, camera_id='')
+        make_alert(self.MOMENT, camera_id='CAM-1')
+        incremental = self.counts()
+        rebuild()
+        self.assertEqual(self.counts(), incremental)
+        self.assertEqual(self.counts()[(self.MOMENT.replace(second=0), '', 'WEAPON_DETECTED')], 2)
+
+    def test_stats_reads_the_rollups(self):
+        make_alert(self.MOMENT)
+        make_alert(self.MOMENT, violation_type='NO_VEST')
+        make_alert(self.MOMENT + timedelta(hours=2))
+        params = {'granularity': 'minute', 'since': '2025-01-01T12:00:00Z', 'until': '2025-01-01T13:00:00Z'}
+        stats = self.client.get('/api/alerts/stats/', params).json()
+        self.assertEqual(stats['total'], 2)
+        self.assertEqual(len(stats['buckets']), 2)
+        stats = self.client.get('/api/alerts/stats/', {**params, 'group_by': ''}).json()
+        self.assertEqual(stats['buckets'], [{'bucket': '2025-01-01T12:34:00Z', 'count': 2}])
+        self.assertEqual(self.client.get('/api/alerts/stats/', {'group_by': 'summary'}).status_code, 400)
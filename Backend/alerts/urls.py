@@ -1,9 +1,21 @@
 # alerts/urls.py
 
 from django.urls import path
-from .views import CreateAlertView, AlertSummariesView
+from .views import (
+    CreateAlertView, UpdateAlertView, AlertSummariesView, AlertListView, AlertStreamView, AlertStatsView,
+    StartClipUploadView, ClipUploadStatusView, ClipChunkView, FinalizeClipUploadView,
+)
 
 urlpatterns = [
+    path('', AlertListView.as_view(), name='alert-list'),
     path('create/', CreateAlertView.as_view(), name='create-alert'),
+    path('<int:pk>/', UpdateAlertView.as_view(), name='update-alert'),
+    path('by-key/<str:key>/', UpdateAlertView.as_view(), name='update-alert-by-key'),
     path('summaries/', AlertSummariesView.as_view(), name='alert-summaries'),
+    path('stream/', AlertStreamView.as_view(), name='alert-stream'),
+    path('stats/', AlertStatsView.as_view(), name='alert-stats'),
+    path('uploads/', StartClipUploadView.as_view(), name='start-clip-upload'),
+    path('uploads/<uuid:upload_id>/', ClipUploadStatusView.as_view(), name='clip-upload-status'),
+    path('uploads/<uuid:upload_id>/chunks/<int:index>/', ClipChunkView.as_view(), name='clip-upload-chunk'),
+    path('uploads/<uuid:upload_id>/finalize/', FinalizeClipUploadView.as_view(), name='finalize-clip-upload'),
 ]
\ No newline at end of file
@@ -1,21 +1,54 @@
-from django.shortcuts import render
+import hashlib
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.handlers.asgi import ASGIRequest
+from django.db import IntegrityError, transaction
+from django.db.models import Sum
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
+from django.shortcuts import render, get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.views import View
 
 # Create your views here.
 # alerts/views.py
 
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework import status, parsers
-from .models import Alert
-from .serializers import AlertSerializer
+from rest_framework import generics, status, parsers
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination
+from .cache import cached_alert_read, cached_alert_read_when
+from .media import enqueue as enqueue_media, enqueue_for_upload as enqueue_media_jobs
+from .models import Alert, AlertRollup, ClipUpload
+from .stream import AlertEventStream
+from .serializers import AlertSerializer, AlertListSerializer, ClipUploadSerializer
 
 class CreateAlertView(APIView):
     parser_classes = [parsers.MultiPartParser, parsers.FormParser]  # enable file upload
 
     def post(self, request, *args, **kwargs):
+        # A retried request carries the same Idempotency-Key; answer it with the alert it created
+        key = request.headers.get('Idempotency-Key')
+        if key:
+            existing = Alert.objects.filter(idempotency_key=key).first()
+            if existing is not None:
+                return Response(AlertSerializer(existing).data, status=status.HTTP_200_OK)
+
         serializer = AlertSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save()
+            try:
+                with transaction.atomic():
+                    alert = serializer.save(idempotency_key=key or None)
+                    # Thumbnail, transcode and hashes happen in the background, after this response
+                    enqueue_media_jobs(alert, request.FILES)
+            except IntegrityError:
+                # A concurrent retry with the same key won the race
+                existing = get_object_or_404(Alert, idempotency_key=key)
+                return Response(AlertSerializer(existing).data, status=status.HTTP_200_OK)
             print(f"✅ Alert Received: {serializer.data.get('summary')}")
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         
@@ -24,6 +57,166 @@ class CreateAlertView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class UpdateAlertView(APIView):
+    """Second phase of an alert: the clip and VLM summary are attached after the snapshot alert was created.
+
+    The alert is looked up by id or by the Idempotency-Key it was created with.
+    """
+    parser_classes = [parsers.MultiPartParser, parsers.FormParser, parsers.JSONParser]
+
+    def patch(self, request, pk=None, key=None, *args, **kwargs):
+        alert = get_object_or_404(Alert, pk=pk) if pk is not None else get_object_or_404(Alert, idempotency_key=key)
+        serializer = AlertSerializer(alert, data=request.data, partial=True)
+        if serializer.is_valid():
+            with transaction.atomic():
+                serializer.save()
+                enqueue_media_jobs(alert, request.FILES)
+            print(f"✅ Alert #{alert.pk} updated: {serializer.data.get('summary')}")
+            return Response(serializer.data, status=status.HTTP_200_OK)
+
+        print(f"❌ Invalid update for alert #{alert.pk}: {serializer.errors}")
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class StartClipUploadView(APIView):
+    """Start (or, with the same Idempotency-Key, resume) a chunked clip upload for an alert.
+
+    Body: alert (id) or alert_key (Idempotency-Key of the alert), filename, size, chunk_size.
+    The response's offset is how many bytes the server already has.
+    """
+    parser_classes = [parsers.JSONParser, parsers.FormParser]
+
+    def post(self, request, *args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if key:
+            existing = ClipUpload.objects.filter(idempotency_key=key).first()
+            if existing is not None:
+                return Response(ClipUploadSerializer(existing).data, status=status.HTTP_200_OK)
+
+        alert_key = request.data.get('alert_key')
+        if alert_key:
+            alert = get_object_or_404(Alert, idempotency_key=alert_key)
+        else:
+            alert = get_object_or_404(Alert, pk=request.data.get('alert'))
+
+        try:
+            size = int(request.data.get('size'))
+            chunk_size = int(request.data.get('chunk_size'))
+        except (TypeError, ValueError):
+            return Response({'detail': "size and chunk_size must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+        if size < 0 or not 0 < chunk_size <= settings.CLIP_UPLOAD_MAX_CHUNK_BYTES:
+            return Response({'detail': f"chunk_size must be between 1 and {settings.CLIP_UPLOAD_MAX_CHUNK_BYTES}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        filename = os.path.basename(request.data.get('filename') or '') or 'clip.mp4'
+
+        try:
+            upload = ClipUpload.objects.create(idempotency_key=key or None, alert=alert, filename=filename,
+                                               size=size, chunk_size=chunk_size)
+        except IntegrityError:
+            # A concurrent retry with the same key won the race
+            upload = get_object_or_404(ClipUpload, idempotency_key=key)
+            return Response(ClipUploadSerializer(upload).data, status=status.HTTP_200_OK)
+
+        os.makedirs(os.path.dirname(default_storage.path(upload.part_name)), exist_ok=True)
+        open(default_storage.path(upload.part_name), 'wb').close()
+        print(f"📥 Clip upload {upload.id} started for alert #{alert.pk}: {size} bytes")
+        return Response(ClipUploadSerializer(upload).data, status=status.HTTP_201_CREATED)
+
+
+class ClipUploadStatusView(APIView):
+    """Where an interrupted upload should resume."""
+
+    def get(self, request, upload_id, *args, **kwargs):
+        upload = get_object_or_404(ClipUpload, pk=upload_id)
+        return Response(ClipUploadSerializer(upload).data, status=status.HTTP_200_OK)
+
+
+class ClipChunkView(APIView):
+    """Append chunk N (raw request body) of an upload, streamed to the .part file without buffering it.
+
+    Chunks must arrive in order; a chunk the server already has is acknowledged again
+    and anything else gets 409 with the offset to resume from.
+    """
+    READ_BYTES = 64 * 1024
+
+    def put(self, request, upload_id, index, *args, **kwargs):
+        with transaction.atomic():
+            upload = get_object_or_404(ClipUpload.objects.select_for_update(), pk=upload_id)
+            start = index * upload.chunk_size
+            length = int(request.headers.get('Content-Length') or 0)
+            expected = min(upload.chunk_size, upload.size - start)
+
+            if upload.status == 'complete' or start + length <= upload.received and length == expected:
+                return Response(ClipUploadSerializer(upload).data, status=status.HTTP_200_OK)
+            if start != upload.received:
+                return Response({'detail': f"Expected chunk at offset {upload.received}",
+                                 **ClipUploadSerializer(upload).data}, status=status.HTTP_409_CONFLICT)
+            if length != expected:
+                return Response({'detail': f"Chunk {index} must be {expected} bytes, got {length}"},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+            written = 0
+            with open(default_storage.path(upload.part_name), 'r+b') as part:
+                part.seek(start)
+                while written < length:
+                    block = request.stream.read(min(self.READ_BYTES, length - written))
+                    if not block:
+                        break
+                    part.write(block)
+                    written += len(block)
+                part.truncate()
+            if written != length:
+                return Response({'detail': f"Chunk {index} was cut off after {written} bytes",
+                                 **ClipUploadSerializer(upload).data}, status=status.HTTP_400_BAD_REQUEST)
+
+            upload.received = start + written
+            upload.save(update_fields=['received'])
+            return Response(ClipUploadSerializer(upload).data, status=status.HTTP_200_OK)
+
+
+class FinalizeClipUploadView(APIView):
+    """Check the assembled file against the client's SHA-256 and attach it to the alert as its clip."""
+    parser_classes = [parsers.JSONParser, parsers.FormParser]
+    READ_BYTES = 1024 * 1024
+
+    def post(self, request, upload_id, *args, **kwargs):
+        with transaction.atomic():
+            upload = get_object_or_404(ClipUpload.objects.select_for_update().select_related('alert'), pk=upload_id)
+            if upload.status == 'complete':
+                return Response(AlertSerializer(upload.alert).data, status=status.HTTP_200_OK)
+            if upload.received != upload.size:
+                return Response({'detail': f"Only {upload.received} of {upload.size} bytes received",
+                                 **ClipUploadSerializer(upload).data}, status=status.HTTP_409_CONFLICT)
+
+            part_path = default_storage.path(upload.part_name)
+            digest = hashlib.sha256()
+            with open(part_path, 'rb') as part:
+                for block in iter(lambda: part.read(self.READ_BYTES), b''):
+                    digest.update(block)
+            if digest.hexdigest() != (request.data.get('sha256') or '').lower():
+                # The bytes on disk are wrong somewhere; the client has to send the clip again
+                upload.received = 0
+                upload.save(update_fields=['received'])
+                open(part_path, 'wb').close()
+                print(f"❌ Clip upload {upload.id} failed its checksum, restarting")
+                return Response({'detail': "SHA-256 mismatch, upload restarted",
+                                 **ClipUploadSerializer(upload).data}, status=status.HTTP_409_CONFLICT)
+
+            name = default_storage.get_available_name(f"clips/{upload.filename}")
+            os.replace(part_path, default_storage.path(name))
+            upload.alert.clip.name = name
+            upload.alert.save(update_fields=['clip'])
+            enqueue_media(upload.alert, 'clip')
+            upload.sha256 = digest.hexdigest()
+            upload.status = 'complete'
+            upload.completed_at = timezone.now()
+            upload.save(update_fields=['sha256', 'status', 'completed_at'])
+
+        print(f"✅ Clip upload {upload.id} attached to alert #{upload.alert.pk}: {name}")
+        return Response(AlertSerializer(upload.alert).data, status=status.HTTP_200_OK)
+
+
+@cached_alert_read
 class AlertSummariesView(APIView):
     def get(self, request, *args, **kwargs):
         alerts = (
@@ -32,4 +225,105 @@ class AlertSummariesView(APIView):
             .order_by("-timestamp")[:10]  # last 10
         )
         serializer = AlertSerializer(alerts, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
\ No newline at end of file
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class AlertCursorPagination(CursorPagination):
+    """Keyset pagination: each page continues after the last timestamp seen, so deep pages cost the same as the first."""
+    ordering = ('-timestamp', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+def parse_moment(params, param):
+    """?param= as an aware datetime, None when absent; 400 when it is not ISO 8601."""
+    if not params.get(param):
+        return None
+    moment = parse_datetime(params[param])
+    if moment is None:
+        raise ValidationError({param: "Expected an ISO 8601 date-time"})
+    return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+
+@cached_alert_read
+class AlertListView(generics.ListAPIView):
+    """Newest alerts first, filtered by ?camera_id=, ?violation_type=, ?since= / ?until= (ISO 8601)."""
+    serializer_class = AlertListSerializer
+    pagination_class = AlertCursorPagination
+
+    def get_queryset(self):
+        alerts = Alert.objects.only(*AlertListSerializer.Meta.fields)
+        params = self.request.query_params
+        if params.get('camera_id'):
+            alerts = alerts.filter(camera_id=params['camera_id'])
+        if params.get('violation_type'):
+            alerts = alerts.filter(violation_type=params['violation_type'])
+        for param, lookup in (('since', 'timestamp__gte'), ('until', 'timestamp__lt')):
+            moment = parse_moment(params, param)
+            if moment is not None:
+                alerts = alerts.filter(**{lookup: moment})
+        return alerts
+
+
+# Without ?until= the window ends at "now" and slides between alert writes, so it is not cached
+@cached_alert_read_when(lambda request: bool(request.GET.get('until')))
+class AlertStatsView(APIView):
+    """Alert counts per minute or hour bucket, read only from the rollup table.
+
+    ?granularity=minute|hour (default hour), ?since= / ?until= (default: the last 60
+    minutes or 24 hours), optional ?camera_id= / ?violation_type= filters and
+    ?group_by= any of camera_id,violation_type (empty for one total per bucket).
+    """
+    DEFAULT_WINDOWS = {'minute': timedelta(hours=1), 'hour': timedelta(days=1)}
+    GROUP_FIELDS = ('camera_id', 'violation_type')
+
+    def get(self, request, *args, **kwargs):
+        params = request.query_params
+        granularity = params.get('granularity', 'hour')
+        if granularity not in self.DEFAULT_WINDOWS:
+            raise ValidationError({'granularity': "Expected 'minute' or 'hour'"})
+        group_by = [field for field in params.get('group_by', 'camera_id,violation_type').split(',') if field]
+        if any(field not in self.GROUP_FIELDS for field in group_by):
+            raise ValidationError({'group_by': f"Expected a comma-separated subset of {', '.join(self.GROUP_FIELDS)}"})
+
+        until = parse_moment(params, 'until') or timezone.now()
+        since = parse_moment(params, 'since') or until - self.DEFAULT_WINDOWS[granularity]
+        rollups = AlertRollup.objects.filter(granularity=granularity, bucket__gte=since, bucket__lt=until)
+        for field in self.GROUP_FIELDS:
+            if params.get(field):
+                rollups = rollups.filter(**{field: params[field]})
+
+        buckets = list(
+            rollups.values('bucket', *group_by)
+            .annotate(count=Sum('count'))
+            .filter(count__gt=0)
+            .order_by('bucket', *group_by)
+        )
+        return Response({
+            'granularity': granularity,
+            'since': since,
+            'until': until,
+            'total': sum(bucket['count'] for bucket in buckets),
+            'buckets': buckets
+        }, status=status.HTTP_200_OK)
+
+
+class AlertStreamView(View):
+    """Server-sent events: one 'alert' event per newly created Alert, pushed as soon as it is saved.
+
+    Reconnecting clients resume after Last-Event-ID (sent by EventSource) or ?last_id=.
+    """
+    def get(self, request, *args, **kwargs):
+        last_id = request.headers.get('Last-Event-ID') or request.GET.get('last_id')
+        try:
+            last_id = int(last_id) if last_id else None
+        except ValueError:
+            return HttpResponseBadRequest("last_id must be an alert id")
+
+        stream = AlertEventStream(last_id)
+        events = stream.async_events() if isinstance(request, ASGIRequest) else stream.sync_events()
+        response = StreamingHttpResponse(events, content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # Keep nginx from buffering the stream
+        return response
\ No newline at end of file
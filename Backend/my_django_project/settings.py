@@ -130,4 +130,49 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 import os
 
 MEDIA_URL = '/media/'
-MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
\ No newline at end of file
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Chunked clip uploads (alerts/uploads/): largest chunk a client may declare
+CLIP_UPLOAD_MAX_CHUNK_BYTES = 8 * 1024 * 1024
+
+# Alert read endpoints (alerts/cache.py): listings are cached per alert version and
+# revalidated with ETag / Last-Modified. Local memory is per process; use a shared
+# backend when running several server processes.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'alerts',
+    }
+}
+ALERTS_CACHE_ENABLED = True
+ALERTS_CACHE_SECONDS = 60
+
+# Alert stream (alerts/stream.py, /api/alerts/stream/): serve under ASGI so waiting
+# clients do not hold a thread each
+ALERT_STREAM_BUFFER = 100  # Events held per client before it is backfilled from the database
+ALERT_STREAM_BACKLOG = 500  # Most alerts replayed on reconnect or after an overflow
+ALERT_STREAM_HEARTBEAT_SECONDS = 15
+ALERT_STREAM_RETRY_MS = 3000  # EventSource reconnect delay
+
+# Background media jobs (alerts/media.py): thumbnails, H.264 faststart transcodes, hashes
+MEDIA_WORKERS = 2  # Worker threads in the server process; 0 if only `manage.py run_media_worker` should run jobs
+MEDIA_JOB_MAX_ATTEMPTS = 3
+MEDIA_JOB_RETRY_SECONDS = 30  # Times the attempt number
+MEDIA_JOB_POLL_SECONDS = 5
+MEDIA_THUMBNAIL_SIZE = 320
+FFMPEG_BINARY = 'ffmpeg'
+MEDIA_TRANSCODE_PRESET = 'veryfast'
+MEDIA_TRANSCODE_CRF = 28
+MEDIA_TRANSCODE_TIMEOUT_SECONDS = 600
+# A running job whose worker disappeared is retried after this; it must outlast the longest
+# transcode (plus hashing and the save) or a slow but live job would be claimed twice
+MEDIA_JOB_LEASE_SECONDS = MEDIA_TRANSCODE_TIMEOUT_SECONDS + 120
+MEDIA_KEEP_ORIGINAL_CLIPS = False
+
+# Media serving (alerts/serving.py). With nginx in front set 'x-accel-redirect' and map
+# MEDIA_ACCEL_REDIRECT_PREFIX to MEDIA_ROOT as an internal location; 'x-sendfile' for
+# Apache mod_xsendfile or lighttpd; None streams from Django
+MEDIA_SENDFILE_BACKEND = None
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'
+MEDIA_STREAM_CHUNK_BYTES = 64 * 1024
+MEDIA_CACHE_SECONDS = 24 * 3600
@@ -20,13 +20,12 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include  # <-- Make sure 'include' is imported
 from django.conf import settings
-from django.conf.urls.static import static
+from alerts.serving import serve_media
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     # Add this line to point to your alerts app
     path('api/alerts/', include('alerts.urls')), 
-]
-
-# Add this line to serve media files (snapshots/clips)
-urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+    # Media files (snapshots/clips) with Range support and optional proxy offload
+    path(f"{settings.MEDIA_URL.strip('/')}/<path:path>", serve_media, name='media'),
+]
\ No newline at end of file
@@ -2,8 +2,10 @@ import threading
 import state
 import config  # This will run the os.makedirs commands
 from core import app, socketio
-from vlm import TORCH_AVAILABLE, TRANSFORMERS_AVAILABLE
+from vlm import TORCH_AVAILABLE, TRANSFORMERS_AVAILABLE, vlm_manager
 from detection_loop import YOLO_AVAILABLE, detection_loop
+from process_pipeline import run_process_pipeline
+import violation_processor
 
 # These imports are crucial!
 # They register the routes and event handlers with the app/socketio instances.
@@ -25,7 +27,10 @@ def main():
         print(f"🚀 Using device: {device}")
     
     # Check model availability
-    if TRANSFORMERS_AVAILABLE:
+    if TRANSFORMERS_AVAILABLE and config.VLM_PRELOAD:
+        print(f"🤖 SmolVLM2 is loading in the background (readiness in /api/violations)")
+        vlm_manager.preload()
+    elif TRANSFORMERS_AVAILABLE:
         print(f"🤖 SmolVLM2 will be loaded on-demand for efficient memory usage")
     else:
         print(f"⚠️ SmolVLM2 not available - using basic violation descriptions")
@@ -39,6 +44,8 @@ def main():
     print("WEAPON DETECTION CONFIGURATION")
     print("=" * 60)
     print(f"Model: {config.ENGINE_PATH}")
+    print(f"Cameras: {[source['camera_id'] for source in config.CAMERA_SOURCES]} (max batch {config.INFERENCE_MAX_BATCH})")
+    print(f"Pipeline Mode: {config.PIPELINE_MODE}")
     print(f"Classes: ['criminal', 'person', 'weapon']")
     print(f"Person Class ID: {config.PERSON_CLASS_ID}")
     print(f"Weapon Class ID: {config.WEAPON_CLASS_ID}")
@@ -46,8 +53,11 @@ def main():
     print(f"Note: 'criminal' class (ID 0) is IGNORED")
     print("=" * 60)
     
-    # Start detection loop in separate thread
-    detection_thread = threading.Thread(target=detection_loop, daemon=True)
+    violation_processor.start()  # Alert outbox and violation stage workers
+    
+    # Start detection loop in separate thread (or supervise the process pipeline from it)
+    pipeline = run_process_pipeline if config.PIPELINE_MODE == 'process' else detection_loop
+    detection_thread = threading.Thread(target=pipeline, daemon=True)
     detection_thread.start()
     
     print("🌐 Starting Flask web server...")
@@ -61,8 +71,9 @@ def main():
         print("\n🛑 Interrupted by user...")
     finally:
         print("🛑 Stopping Flask server...")
-        if state.vs:
-            state.vs.stop()
+        for camera in state.cameras.values():
+            if camera.vs:
+                camera.vs.stop()
         if TORCH_AVAILABLE:
             import torch
             if torch.cuda.is_available():
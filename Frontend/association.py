@@ -0,0 +1,80 @@
+import numpy as np
+
+import config
+
+def extract_detections(result):
+    """Return (boxes (N, 4), class_ids (N,), confidences (N,)) of one YOLO result.
+
+    boxes.data holds [x1, y1, x2, y2, (track id,) conf, cls] per row, so the whole
+    result comes to the host in a single device-to-host transfer.
+    """
+    if result.boxes is None or len(result.boxes) == 0:
+        return np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+    data = result.boxes.data.cpu().numpy()
+    return data[:, :4].astype(np.float32), data[:, -1].astype(np.int64), data[:, -2].astype(np.float32)
+
+def box_overlap(boxes_a, boxes_b):
+    """Pairwise intersection area and IoU between (N, 4) and (M, 4) xyxy arrays."""
+    a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return inter, np.where(union > 0, inter / np.maximum(union, 1e-6), 0.0)
+
+def armed_person_mask(persons, weapons, person_conf=None, weapon_conf=None):
+    """For each person box, whether a weapon is near/carried by them, as one broadcast (N, M) computation.
+
+    A person/weapon pair matches when both pass the ASSOCIATION_MIN_*_CONFIDENCE rules and either
+    1. the weapon center lies within ASSOCIATION_MAX_DISTANCE_RATIO (of person height) of the
+       hands/torso band given by ASSOCIATION_REGION, or
+    2. the boxes overlap with IoU >= ASSOCIATION_MIN_IOU.
+    The defaults reproduce the original rule: center inside the person box, or any overlap.
+    """
+    persons = np.asarray(persons, dtype=np.float32).reshape(-1, 4)
+    weapons = np.asarray(weapons, dtype=np.float32).reshape(-1, 4)
+    if len(persons) == 0 or len(weapons) == 0:
+        return np.zeros(len(persons), dtype=bool)
+
+    px1, py1, px2, py2 = (persons[:, i:i + 1] for i in range(4))
+    height = py2 - py1
+    top, bottom = config.ASSOCIATION_REGION
+    region_y1 = py1 + top * height
+    region_y2 = py1 + bottom * height
+
+    wcx = ((weapons[:, 0] + weapons[:, 2]) / 2)[None, :]
+    wcy = ((weapons[:, 1] + weapons[:, 3]) / 2)[None, :]
+
+    # 1. Distance from weapon center to the person's hands/torso band (0 when inside)
+    dx = np.maximum(np.maximum(px1 - wcx, wcx - px2), 0)
+    dy = np.maximum(np.maximum(region_y1 - wcy, wcy - region_y2), 0)
+    near = np.hypot(dx, dy) <= config.ASSOCIATION_MAX_DISTANCE_RATIO * height
+
+    # 2. Weapon box overlaps with person box
+    inter, iou = box_overlap(persons, weapons)
+    overlapping = (inter > 0) & (iou >= config.ASSOCIATION_MIN_IOU)
+
+    matches = near | overlapping
+    if person_conf is not None:
+        matches &= (np.asarray(person_conf) >= config.ASSOCIATION_MIN_PERSON_CONFIDENCE)[:, None]
+    if weapon_conf is not None:
+        matches &= (np.asarray(weapon_conf) >= config.ASSOCIATION_MIN_WEAPON_CONFIDENCE)[None, :]
+    return matches.any(axis=1)
+
+def update_tracks(tracker, result, now):
+    """Feed one YOLO result into a camera's tracker, flag armed person tracks and return those due for a violation."""
+    boxes, class_ids, confidences = extract_detections(result)
+    track_ids = tracker.update(boxes, class_ids, confidences, now)
+
+    person_idx = np.flatnonzero(class_ids == config.PERSON_CLASS_ID)
+    weapon_idx = np.flatnonzero(class_ids == config.WEAPON_CLASS_ID)
+    armed = armed_person_mask(boxes[person_idx], boxes[weapon_idx],
+                              confidences[person_idx], confidences[weapon_idx])
+    for i, is_armed in zip(person_idx, armed):
+        tracker.mark_armed(track_ids[i], bool(is_armed))
+    return tracker.tracks_to_alert(now)
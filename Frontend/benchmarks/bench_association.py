@@ -0,0 +1,90 @@
+"""Person/weapon association: per-box Python loops vs. broadcast NumPy.
+
+Generates crowded scenes (50+ people) and times the original nested
+person x weapon loop against association.armed_person_mask, checking that
+both agree under the default rules. With --torch (and CUDA available) it
+also times per-box .cpu() transfers against one transfer of boxes.data.
+
+    python benchmarks/bench_association.py
+    python benchmarks/bench_association.py --persons 50 100 200 --torch
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from association import armed_person_mask
+
+def make_scene(rng, n_persons, n_weapons, width=1280, height=720):
+    px = rng.uniform(0, width - 80, n_persons)
+    py = rng.uniform(0, height - 200, n_persons)
+    persons = np.stack([px, py, px + rng.uniform(40, 80, n_persons), py + rng.uniform(120, 200, n_persons)], axis=1)
+    wx = rng.uniform(0, width - 40, n_weapons)
+    wy = rng.uniform(0, height - 40, n_weapons)
+    weapons = np.stack([wx, wy, wx + rng.uniform(10, 40, n_weapons), wy + rng.uniform(10, 40, n_weapons)], axis=1)
+    return persons.astype(np.float32), weapons.astype(np.float32)
+
+def legacy_mask(persons, weapons):
+    """The association loop as it was in detection_loop before vectorization."""
+    armed = []
+    for person_box in persons:
+        person_has_weapon = False
+        px1, py1, px2, py2 = person_box
+        for weapon_box in weapons:
+            wx1, wy1, wx2, wy2 = weapon_box
+            weapon_center_x = (wx1 + wx2) / 2
+            weapon_center_y = (wy1 + wy2) / 2
+            if (px1 <= weapon_center_x <= px2 and py1 <= weapon_center_y <= py2):
+                person_has_weapon = True
+                break
+            x_overlap = max(0, min(px2, wx2) - max(px1, wx1))
+            y_overlap = max(0, min(py2, wy2) - max(py1, wy1))
+            if (x_overlap * y_overlap) > 0:
+                person_has_weapon = True
+                break
+        armed.append(person_has_weapon)
+    return np.array(armed, dtype=bool)
+
+def timeit(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+def bench_transfers(n_boxes, repeat):
+    import torch
+    if not torch.cuda.is_available():
+        print("   (CUDA not available, skipping transfer benchmark)")
+        return
+    data = torch.rand((n_boxes, 6), device='cuda')
+    per_box = timeit(lambda: [data[i, :4].cpu().numpy() for i in range(n_boxes)], repeat)
+    single = timeit(lambda: data.cpu().numpy(), repeat)
+    print(f"   transfers for {n_boxes} boxes: per-box {per_box:8.3f} ms   single {single:8.3f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--persons', type=int, nargs='+', default=[10, 50, 100, 200])
+    parser.add_argument('--weapon-ratio', type=float, default=0.3)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--torch', action='store_true', help="Also time device-to-host transfers")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'persons':>8} {'weapons':>8} {'loop ms':>10} {'numpy ms':>10} {'speedup':>8}")
+    for n_persons in args.persons:
+        n_weapons = max(1, int(n_persons * args.weapon_ratio))
+        persons, weapons = make_scene(rng, n_persons, n_weapons)
+        assert np.array_equal(legacy_mask(persons, weapons), armed_person_mask(persons, weapons))
+
+        loop = timeit(lambda: legacy_mask(persons, weapons), args.repeat)
+        vectorized = timeit(lambda: armed_person_mask(persons, weapons), args.repeat)
+        print(f"{n_persons:8d} {n_weapons:8d} {loop:10.3f} {vectorized:10.3f} {loop / vectorized:7.1f}x")
+        if args.torch:
+            bench_transfers(n_persons + n_weapons, args.repeat)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""Threaded vs. shared-memory process pipeline throughput.
+
+Runs the same capture -> detect -> JPEG-encode chain twice on synthetic
+1280x720 frames: once as three threads handing frames over with copies (the
+current threaded mode), once as three processes connected by SharedFrameRing.
+Detection is a CPU stand-in (blur + plot-like drawing) unless --model is given.
+
+    python benchmarks/bench_pipeline.py --seconds 10
+    python benchmarks/bench_pipeline.py --seconds 10 --model best.pt
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+import multiprocessing as mp
+from collections import deque
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from process_pipeline import SharedFrameRing
+
+SHAPE = config.PIPELINE_FRAME_SHAPE
+
+def make_source():
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 255, size=SHAPE, dtype=np.uint8)
+    return cv2.GaussianBlur(base, (9, 9), 0)
+
+def capture_step(base, counter):
+    frame = base.copy()
+    cv2.putText(frame, str(counter), (50, 100), cv2.FONT_HERSHEY_SIMPLEX, 2, (255, 255, 255), 3)
+    return frame
+
+def load_detector(model_path):
+    if not model_path:
+        return None
+    from ultralytics import YOLO
+    return YOLO(model_path)
+
+def detect_step(model, frame):
+    if model is not None:
+        return model.predict(source=frame, verbose=False, conf=0.5)[0].plot(img=frame)
+    small = cv2.resize(frame, (640, 360))
+    cv2.GaussianBlur(small, (15, 15), 0)
+    for i in range(10):
+        cv2.rectangle(frame, (20 + i * 100, 200), (100 + i * 100, 500), (0, 0, 255), 2)
+    return frame
+
+def encode_step(frame):
+    ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
+    return buffer
+
+# --- Threaded Mode ---
+
+def run_threaded(seconds, model_path):
+    model = load_detector(model_path)
+    base = make_source()
+    raw, annotated = deque(maxlen=1), deque(maxlen=1)
+    stop = threading.Event()
+    encoded = [0]
+
+    def capture():
+        counter = 0
+        while not stop.is_set():
+            counter += 1
+            raw.append((counter, capture_step(base, counter)))
+
+    def detect():
+        last = 0
+        while not stop.is_set():
+            try:
+                seq, frame = raw[0]
+            except IndexError:
+                time.sleep(0.001)
+                continue
+            if seq == last:
+                time.sleep(0.001)
+                continue
+            last = seq
+            annotated.append((seq, detect_step(model, frame.copy())))
+
+    def encode():
+        last = 0
+        while not stop.is_set():
+            try:
+                seq, frame = annotated[0]
+            except IndexError:
+                time.sleep(0.001)
+                continue
+            if seq == last:
+                time.sleep(0.001)
+                continue
+            last = seq
+            encode_step(frame.copy())
+            encoded[0] += 1
+
+    threads = [threading.Thread(target=t, daemon=True) for t in (capture, detect, encode)]
+    for t in threads:
+        t.start()
+
+    while encoded[0] == 0:
+        time.sleep(0.05)
+    start_count = encoded[0]
+    time.sleep(seconds)
+    fps = (encoded[0] - start_count) / seconds
+
+    stop.set()
+    for t in threads:
+        t.join(timeout=2)
+    return fps
+
+# --- Process Mode ---
+
+def _capture_proc(raw_spec, stop):
+    ring = SharedFrameRing.attach(raw_spec)
+    base = make_source()
+    counter = 0
+    while not stop.is_set():
+        counter += 1
+        ring.write(capture_step(base, counter))
+    ring.close()
+
+def _detect_proc(raw_spec, ann_spec, model_path, stop):
+    raw, annotated = SharedFrameRing.attach(raw_spec), SharedFrameRing.attach(ann_spec)
+    model = load_detector(model_path)
+    last = 0
+    while not stop.is_set():
+        seq, frame = raw.read_latest(last)
+        if frame is None:
+            time.sleep(0.001)
+            continue
+        last = seq
+        annotated.write(detect_step(model, frame))
+    raw.close()
+    annotated.close()
+
+def _encode_proc(ann_spec, counter, stop):
+    annotated = SharedFrameRing.attach(ann_spec)
+    last = 0
+    while not stop.is_set():
+        seq, frame = annotated.read_latest(last)
+        if frame is None:
+            time.sleep(0.001)
+            continue
+        last = seq
+        encode_step(frame)
+        with counter.get_lock():
+            counter.value += 1
+    annotated.close()
+
+def run_processes(seconds, model_path):
+    ctx = mp.get_context('spawn')
+    stop = ctx.Event()
+    counter = ctx.Value('i', 0)
+    raw = SharedFrameRing(f"bench{os.getpid()}_raw", SHAPE, create=True)
+    annotated = SharedFrameRing(f"bench{os.getpid()}_ann", SHAPE, create=True)
+    processes = [
+        ctx.Process(target=_capture_proc, args=(raw.spec(), stop)),
+        ctx.Process(target=_detect_proc, args=(raw.spec(), annotated.spec(), model_path, stop)),
+        ctx.Process(target=_encode_proc, args=(annotated.spec(), counter, stop)),
+    ]
+    for p in processes:
+        p.start()
+
+    # Wait for the first encoded frame so process start-up and model load are not measured
+    while counter.value == 0:
+        time.sleep(0.05)
+    start_count = counter.value
+    time.sleep(seconds)
+    fps = (counter.value - start_count) / seconds
+
+    stop.set()
+    for p in processes:
+        p.join(timeout=5)
+    raw.close()
+    annotated.close()
+    return fps
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--model', default=None, help="Optional YOLO weights to use as the detect stage")
+    args = parser.parse_args()
+
+    print(f"Frame shape: {SHAPE}, duration: {args.seconds}s, detector: {args.model or 'synthetic'}")
+    threaded = run_threaded(args.seconds, args.model)
+    print(f"threaded : {threaded:7.1f} encoded frames/s")
+    processes = run_processes(args.seconds, args.model)
+    print(f"process  : {processes:7.1f} encoded frames/s")
+    if threaded > 0:
+        print(f"speedup  : {processes / threaded:7.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Pre-roll memory per camera: raw deque vs. compressed PrerollBuffer.
+
+Fills both buffers with PREROLL_SECONDS of frames at the given fps and reports
+the memory each one holds, the per-frame cost on the detection loop (append) and
+on the camera's encoder thread (encode), plus how long a violation snapshot and a
+full decode of it take. Uses a video file when --video is given, synthetic frames otherwise
+(synthetic frames compress worse than typical surveillance footage).
+
+    python benchmarks/bench_preroll.py --fps 30
+    python benchmarks/bench_preroll.py --video sample.mp4
+"""
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from preroll import PrerollBuffer, RawPrerollBuffer
+
+def frame_source(video_path, shape):
+    if video_path:
+        cap = cv2.VideoCapture(video_path)
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                continue
+            yield cv2.resize(frame, (shape[1], shape[0]))
+
+    rng = np.random.default_rng(0)
+    background = cv2.GaussianBlur(rng.integers(0, 255, size=shape, dtype=np.uint8), (31, 31), 0)
+    i = 0
+    while True:
+        frame = background.copy()
+        x = 100 + (i * 7) % (shape[1] - 300)
+        cv2.rectangle(frame, (x, 200), (x + 120, 560), (40, 40, 40), -1)
+        noise = rng.integers(0, 8, size=shape, dtype=np.uint8)
+        yield cv2.add(frame, noise)
+        i += 1
+
+def mb(n):
+    return n / (1024 * 1024)
+
+def measure(name, buffer, frames, total):
+    fill = 0.0
+    for _ in range(total):
+        frame = next(frames)
+        start = time.perf_counter()
+        buffer.append(frame)
+        fill += time.perf_counter() - start
+        if hasattr(buffer, 'flush'):
+            buffer.flush()  # Keep every frame; the encode itself is timed by the encoder thread
+
+    start = time.perf_counter()
+    snapshot = buffer.snapshot()
+    snap = time.perf_counter() - start
+
+    start = time.perf_counter()
+    decoded = sum(1 for _ in snapshot)
+    drain = time.perf_counter() - start
+    snapshot.release()
+
+    stats = buffer.stats()
+    print(f"{name:10s} frames={stats['frames']:4d}  held={mb(stats['bytes_used']):8.1f} MB  "
+          f"reserved={mb(stats['bytes_reserved']):8.1f} MB  append={fill / total * 1000:5.2f} ms/frame  "
+          f"encode={stats.get('avg_encode_ms', 0.0):5.2f} ms/frame  "
+          f"snapshot={snap * 1000:6.2f} ms  iterate={drain * 1000:7.1f} ms ({decoded} frames)")
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fps', type=float, default=30.0)
+    parser.add_argument('--video', default=None)
+    parser.add_argument('--cameras', type=int, default=4, help="Cameras to extrapolate the totals for")
+    args = parser.parse_args()
+
+    shape = config.PIPELINE_FRAME_SHAPE
+    total = int(args.fps * config.PREROLL_SECONDS)
+    print(f"{shape[1]}x{shape[0]} @ {args.fps} fps, {config.PREROLL_SECONDS}s window ({total} frames)")
+
+    raw = measure('raw deque', RawPrerollBuffer(args.fps), frame_source(args.video, shape), total)
+    jpeg = measure('jpeg ring', PrerollBuffer(args.fps), frame_source(args.video, shape), total)
+
+    print(f"\nPer camera: raw {mb(raw['bytes_used']):.1f} MB vs. compressed {mb(jpeg['bytes_reserved']):.1f} MB reserved")
+    print(f"{args.cameras} cameras: raw {mb(raw['bytes_used'] * args.cameras):.1f} MB vs. "
+          f"compressed {mb(jpeg['bytes_reserved'] * args.cameras):.1f} MB")
+
+if __name__ == "__main__":
+    main()
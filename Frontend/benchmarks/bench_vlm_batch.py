@@ -0,0 +1,89 @@
+"""VLM keyframe captioning: sequential generate_caption() calls vs. one batched generate().
+
+Times the three VLM_CAPTION_MODE settings on the same keyframes: 'sequential'
+(one processor + generate per keyframe, the old behaviour), 'batch' (all
+keyframes padded into one generate call) and 'multi_image' (one prompt over
+all keyframes). Keyframes come from --clip if given, otherwise from synthetic
+frames. Needs torch + transformers; the model is loaded before timing starts.
+
+    python benchmarks/bench_vlm_batch.py
+    python benchmarks/bench_vlm_batch.py --clip ../violations/violation_CAM-01_1700000000.mp4 --repeat 3
+"""
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from vlm import vlm_manager
+
+PROMPTS = [
+    "Describe the security scene and any weapons or threats you observe:",
+    "Focus on the person - describe their appearance and any weapons they are carrying:",
+    "Describe the environment and location where this incident is occurring:",
+    "What specific security threats or weapons do you see in this image?"
+]
+
+def load_keyframes(clip_path, count):
+    cap = cv2.VideoCapture(clip_path)
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    frames = []
+    for p in np.linspace(0.1, 0.9, count):
+        cap.set(cv2.CAP_PROP_POS_FRAMES, int(total * p))
+        ret, frame = cap.read()
+        if ret:
+            frames.append(frame)
+    cap.release()
+    return frames
+
+def synthetic_keyframes(count, width=640, height=360):
+    rng = np.random.default_rng(0)
+    frames = []
+    for i in range(count):
+        frame = np.full((height, width, 3), 90, dtype=np.uint8)
+        x = 100 + i * 80
+        cv2.rectangle(frame, (x, 80), (x + 90, 330), (60, 60, 200), -1)
+        cv2.rectangle(frame, (x + 80, 180), (x + 150, 200), (20, 20, 20), -1)
+        frames.append(cv2.add(frame, rng.integers(0, 20, frame.shape, dtype=np.uint8)))
+    return frames
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clip', help="Take keyframes from this clip instead of synthetic frames")
+    parser.add_argument('--keyframes', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=2)
+    parser.add_argument('--modes', nargs='+', default=['sequential', 'batch', 'multi_image'])
+    args = parser.parse_args()
+
+    vlm_manager.caption_cache = None  # Repeats would otherwise be served from the cache
+    if not vlm_manager.load_models():
+        print("❌ SmolVLM could not be loaded (needs torch + transformers); nothing to benchmark.")
+        return
+
+    frames = load_keyframes(args.clip, args.keyframes) if args.clip else synthetic_keyframes(args.keyframes)
+    print(f"{len(frames)} keyframes of {frames[0].shape[1]}x{frames[0].shape[0]} on {vlm_manager.device}")
+
+    # Warm-up so the first timed mode does not pay for lazy initialisation
+    vlm_manager.generate_caption(frames[0], PROMPTS[0])
+
+    print(f"{'mode':>12} {'captions':>9} {'seconds':>9} {'per frame':>10}")
+    for mode in args.modes:
+        if mode == 'multi_image':
+            items = [(frame, config.VLM_MULTI_IMAGE_PROMPT) for frame in frames]
+        else:
+            items = [(frame, PROMPTS[i % len(PROMPTS)]) for i, frame in enumerate(frames)]
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            captions = vlm_manager.generate_captions(items, mode=mode)
+        seconds = (time.perf_counter() - start) / args.repeat
+        print(f"{mode:>12} {len(captions):9d} {seconds:9.2f} {seconds / len(frames):10.2f}")
+        for caption in captions:
+            print(f"{'':>12}   {caption[:90]}")
+
+if __name__ == "__main__":
+    main()
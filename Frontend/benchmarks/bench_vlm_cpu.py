@@ -0,0 +1,94 @@
+"""CPU VLM profiles: per-caption latency and peak RSS of fp32, bf16 and int8.
+
+Each profile runs in a fresh child process so peak RSS is measured per profile
+and one profile's allocations cannot inflate the next. A child forces the CPU
+device, loads the model with the profile (see VLM_CPU_PROFILE in config.py),
+warms up once, then captions the same synthetic keyframe --captions times.
+Results are deterministic apart from sampling in generate().
+
+    python benchmarks/bench_vlm_cpu.py
+    python benchmarks/bench_vlm_cpu.py --profiles fp32 int8 --threads 4 --captions 8
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PROMPT = "Describe the security scene and any weapons or threats you observe:"
+
+def run_child(args):
+    import cv2
+    import config
+    config.VLM_CPU_THREADS = args.threads
+    config.VLM_CPU_IMAGE_LONGEST_EDGE = args.longest_edge
+    from vlm import vlm_manager
+
+    vlm_manager.device = "cpu"
+    vlm_manager.cpu_profile = args.child
+    vlm_manager.caption_cache = None  # Every caption must run the model
+    start = time.perf_counter()
+    if not vlm_manager.load_models():
+        print(json.dumps({'profile': args.child, 'error': 'model could not be loaded'}))
+        return
+    load_seconds = time.perf_counter() - start
+
+    frame = np.full((720, 1280, 3), 90, dtype=np.uint8)
+    cv2.rectangle(frame, (560, 160), (700, 620), (60, 60, 200), -1)
+    cv2.rectangle(frame, (690, 360), (820, 390), (20, 20, 20), -1)
+    vlm_manager.generate_caption(frame, PROMPT, record=False)
+
+    latencies = []
+    for _ in range(args.captions):
+        start = time.perf_counter()
+        vlm_manager.generate_caption(frame, PROMPT, record=False)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    print(json.dumps({
+        'profile': vlm_manager.stats['cpu_profile'],
+        'requested': args.child,
+        'threads': vlm_manager.stats['cpu_threads'],
+        'load_s': round(load_seconds, 1),
+        'mean_ms': round(float(np.mean(latencies)), 1),
+        'p50_ms': round(float(np.percentile(latencies, 50)), 1),
+        'max_ms': round(float(np.max(latencies)), 1),
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)  # KiB on Linux
+    }))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profiles', nargs='+', default=['fp32', 'bf16', 'int8'])
+    parser.add_argument('--threads', type=int, default=None, help="Intra-op threads (default: VLM_CPU_THREADS rules for the configured PIPELINE_MODE)")
+    parser.add_argument('--longest-edge', type=int, default=384, help="Processor image size, 0 for the model default")
+    parser.add_argument('--captions', type=int, default=5)
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    args.longest_edge = args.longest_edge or None
+
+    if args.child:
+        run_child(args)
+        return
+
+    print(f"{'profile':>8} {'threads':>8} {'load s':>7} {'mean ms':>9} {'p50 ms':>9} {'max ms':>9} {'peak RSS MB':>12}")
+    for profile in args.profiles:
+        command = [sys.executable, os.path.abspath(__file__), '--child', profile,
+                   '--captions', str(args.captions), '--longest-edge', str(args.longest_edge or 0)]
+        if args.threads:
+            command += ['--threads', str(args.threads)]
+        output = subprocess.run(command, capture_output=True, text=True).stdout.strip().splitlines()
+        result = json.loads(output[-1]) if output and output[-1].startswith('{') else {'error': 'child failed'}
+        if 'error' in result:
+            print(f"{profile:>8}   {result['error']}")
+            continue
+        label = result['profile'] if result['profile'] == profile else f"{profile}->{result['profile']}"
+        print(f"{label:>8} {result['threads']:8d} {result['load_s']:7.1f} {result['mean_ms']:9.1f} "
+              f"{result['p50_ms']:9.1f} {result['max_ms']:9.1f} {result['peak_rss_mb']:12.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,28 @@
 import cv2
 import threading
+import time
 from collections import deque
 
+class FrameSignal:
+    """Lets one consumer sleep until any of several VideoStreams delivers a new frame."""
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.version = 0
+
+    def notify(self):
+        with self.condition:
+            self.version += 1
+            self.condition.notify_all()
+
+    def wait(self, last_version, timeout=0.5):
+        """Block until a frame arrived after last_version was read; returns the current version."""
+        with self.condition:
+            self.condition.wait_for(lambda: self.version != last_version, timeout=timeout)
+            return self.version
+
 class VideoStream:
     """A class to read frames from a camera in a dedicated thread."""
-    def __init__(self, src=0):
+    def __init__(self, src=0, frame_signal=None):
         self.stream = cv2.VideoCapture(src)
         if not self.stream.isOpened():
             print(f"Error: Could not open video source at {src}")
@@ -22,6 +40,8 @@ class VideoStream:
         print(f"Camera initialized: {self.width}x{self.height} @ {self.fps} FPS")
 
         self.deque = deque(maxlen=1)
+        self.frame_seq = 0
+        self.frame_signal = frame_signal
         self.stopped = False
         self.thread = threading.Thread(target=self.update, args=())
         self.thread.daemon = True
@@ -34,14 +54,24 @@ class VideoStream:
         while not self.stopped:
             ret, frame = self.stream.read()
             if ret:
-                self.deque.append(frame)
+                self.frame_seq += 1
+                self.deque.append((self.frame_seq, frame, time.time()))
+                if self.frame_signal is not None:
+                    self.frame_signal.notify()
 
     def read(self):
         try:
-            return self.deque[0]
+            return self.deque[0][1]
         except IndexError:
             return None
 
+    def read_latest(self):
+        """Return (sequence number, frame, capture time) of the newest frame, or (0, None, 0.0) before the first one."""
+        try:
+            return self.deque[0]
+        except IndexError:
+            return 0, None, 0.0
+
     def stop(self):
         self.stopped = True
         self.thread.join(timeout=1)
@@ -0,0 +1,88 @@
+import cv2
+import threading
+import time
+import numpy as np
+from collections import OrderedDict
+
+import config
+
+def image_hash(image, hash_size=config.VLM_CACHE_HASH_SIZE):
+    """Difference hash (dHash) of a BGR or RGB image as an int of hash_size**2 bits.
+
+    The image is shrunk to (hash_size + 1) x hash_size grey pixels and each bit records
+    whether a pixel is brighter than its right neighbour, so small changes in lighting,
+    noise or JPEG artefacts flip only a few bits.
+    """
+    image = np.asarray(image)
+    grey = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    small = cv2.resize(grey, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+class CaptionCache:
+    """LRU cache of VLM captions keyed by prompt and perceptual hashes of the image(s).
+
+    A lookup hits when an entry with the same prompt and the same number of images has
+    every image hash within max_distance bits of the query and is younger than ttl.
+    """
+    def __init__(self, max_entries=config.VLM_CACHE_SIZE, ttl=config.VLM_CACHE_TTL_SECONDS,
+                 max_distance=config.VLM_CACHE_MAX_DISTANCE):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self.entries = OrderedDict() # (prompt, hashes) -> (caption, stored_at)
+        self.lock = threading.Lock()
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expired': 0,
+            'size': 0
+        }
+
+    def _find(self, prompt, hashes, now):
+        if (prompt, hashes) in self.entries:
+            return (prompt, hashes)
+        best_key, best_distance = None, self.max_distance + 1
+        for key in self.entries:
+            if key[0] != prompt or len(key[1]) != len(hashes):
+                continue
+            distance = max(hamming(a, b) for a, b in zip(key[1], hashes))
+            if distance < best_distance:
+                best_key, best_distance = key, distance
+        return best_key
+
+    def get(self, prompt, hashes, now=None):
+        """Cached caption for near-identical images with this prompt, or None."""
+        if now is None:
+            now = time.time()
+        with self.lock:
+            key = self._find(prompt, hashes, now)
+            if key is not None:
+                caption, stored_at = self.entries[key]
+                if now - stored_at <= self.ttl:
+                    self.entries.move_to_end(key)
+                    self.stats['hits'] += 1
+                    return caption
+                del self.entries[key]
+                self.stats['expired'] += 1
+                self.stats['size'] = len(self.entries)
+            self.stats['misses'] += 1
+            return None
+
+    def put(self, prompt, hashes, caption, now=None):
+        with self.lock:
+            self.entries[(prompt, hashes)] = (caption, time.time() if now is None else now)
+            self.entries.move_to_end((prompt, hashes))
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.stats['evictions'] += 1
+            self.stats['size'] = len(self.entries)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.stats['size'] = 0
@@ -0,0 +1,88 @@
+import cv2
+import os
+import config
+
+def save_violation_clip(frame_buffer, current_frame, timestamp, fps, camera_id):
+    """Fixed version with better error handling and codec fallback.
+
+    frame_buffer may be any sized iterable of frames, e.g. a PrerollSnapshot.
+    """
+    if not frame_buffer:
+        print("❌ Frame buffer is empty, cannot save clip.")
+        return None
+    
+    if fps <= 0:
+        fps = 30.0
+        print(f"⚠️ Invalid FPS detected, using default: {fps}")
+    
+    try:
+        h, w, _ = current_frame.shape
+        
+        codecs_to_try = [
+            ('MJPG', cv2.VideoWriter_fourcc(*'MJPG'), '.avi'),
+            ('XVID', cv2.VideoWriter_fourcc(*'XVID'), '.avi'),  
+            ('mp4v', cv2.VideoWriter_fourcc(*'mp4v'), '.mp4'),
+        ]
+        
+        out = None
+        clip_path = None
+        working_codec = None
+        
+        for codec_name, fourcc, extension in codecs_to_try:
+            try:
+                clip_path = os.path.join(config.SAVE_DIR, f"violation_{camera_id}_{timestamp}{extension}")
+                print(f"   Trying codec: {codec_name} -> {clip_path}")
+                
+                out = cv2.VideoWriter(clip_path, fourcc, fps, (w, h))
+                
+                if out.isOpened():
+                    working_codec = codec_name
+                    print(f"   ✅ Using codec: {codec_name}")
+                    break
+                else:
+                    out.release()
+                    out = None
+                    if os.path.exists(clip_path):
+                        os.remove(clip_path)
+                    
+            except Exception as e:
+                print(f"   ❌ Codec {codec_name} failed: {e}")
+                if out:
+                    out.release()
+                    out = None
+                if clip_path and os.path.exists(clip_path):
+                    os.remove(clip_path)
+                continue
+        
+        if out is None or not out.isOpened():
+            print("❌ Error: All video codecs failed. Cannot save video.")
+            return None
+        
+        frames_written = 0
+        for frame in frame_buffer:
+            if frame is not None:
+                out.write(frame)
+                frames_written += 1
+        
+        if current_frame is not None:
+            out.write(current_frame)
+            frames_written += 1
+        
+        out.release()
+        
+        if os.path.exists(clip_path) and os.path.getsize(clip_path) > 0:
+            print(f"💾 Violation clip saved: {clip_path} (codec: {working_codec}, frames: {frames_written})")
+            return clip_path
+        else:
+            print(f"❌ Video file creation failed or file is empty: {clip_path}")
+            if os.path.exists(clip_path):
+                os.remove(clip_path)
+            return None
+            
+    except Exception as e:
+        print(f"❌ Failed to save video clip: {e}")
+        if out:
+            out.release()
+        if clip_path and os.path.exists(clip_path):
+            os.remove(clip_path)
+        return None
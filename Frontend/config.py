@@ -6,16 +6,157 @@ SAVE_DIR = "violations"
 
 # --- API & Endpoints ---
 DJANGO_API_URL = "http://127.0.0.1:8000/api/alerts/create/" 
+DJANGO_ALERT_UPDATE_URL = "http://127.0.0.1:8000/api/alerts/by-key/{key}/"  # Alerts are addressed by idempotency key
+DJANGO_CLIP_UPLOAD_URL = "http://127.0.0.1:8000/api/alerts/uploads/"  # Chunked, resumable clip uploads
+
+# --- Cameras ---
+# Every source gets its own VideoStream; all of them feed one batched YOLO scheduler.
+CAMERA_SOURCES = [
+    {'camera_id': 'CAM-01', 'src': 0},
+]
+# Upper bound on frames per predict() call. TensorRT engines must be exported
+# with a dynamic (or at least this large) batch dimension.
+INFERENCE_MAX_BATCH = 8
+# A camera source may add 'priority': <number>; its violations are handled before those
+# of lower-priority cameras when the violation queues back up.
+
+# --- Pipeline Mode ---
+# 'threaded': capture, detection and streaming run as threads in this process.
+# 'process': capture, detection and MJPEG encoding each run in their own process
+#            and exchange frames through shared-memory rings (see process_pipeline.py).
+PIPELINE_MODE = 'threaded'
+PIPELINE_FRAME_SHAPE = (720, 1280, 3)  # Slot size of the shared frame rings (h, w, c)
+PIPELINE_RING_SLOTS = 4
+PIPELINE_JPEG_SLOT_BYTES = 1024 * 1024
 
 # --- Detection Logic ---
 # Class IDs from your model: [ 'person', 'weapon']
 PERSON_CLASS_ID = 1  # person
 WEAPON_CLASS_ID = 2  # weapon
 
-# --- Cooldowns & Performance ---
-ALERT_COOLDOWN_SECONDS = 30
-VIOLATION_COOLDOWN_SECONDS = 10
-DETECTION_SKIP_FRAMES = 3
+# --- VLM Summary ---
+# Load the VLM in the background at startup instead of on the first violation, and run
+# one throwaway generation so the first incident is as fast as the following ones.
+VLM_PRELOAD = True
+VLM_WARMUP = True
+# CPU-only deployments (ignored on CUDA). Profiles: 'fp32', 'bf16' (falls back to fp32
+# where unsupported) or 'int8' (dynamic quantization of the Linear layers). Compare
+# them with `python benchmarks/bench_vlm_cpu.py`.
+VLM_CPU_PROFILE = 'fp32'
+# Torch intra-op threads for the VLM, None = half the cores in 'process' pipeline mode
+# (detection has its own process and keeps the rest) and torch's default in 'threaded'
+# mode. The setting is process-wide, so in 'threaded' mode a value here also limits YOLO.
+VLM_CPU_THREADS = None
+VLM_CPU_IMAGE_LONGEST_EDGE = 384  # Processor input size on CPU (multiples of 384); None = model default
+# Partial captions are pushed to the dashboard as violation_summary_progress events while
+# the VLM generates, at most once per interval per violation.
+VLM_STREAM_PROGRESS = True
+VLM_STREAM_MIN_INTERVAL_SECONDS = 0.1
+# Captions are cached by prompt + perceptual hash (dHash) of the image, so near-identical
+# keyframes from a fixed camera reuse the caption instead of running the model again.
+VLM_CACHE_ENABLED = True
+VLM_CACHE_SIZE = 256
+VLM_CACHE_TTL_SECONDS = 3600
+VLM_CACHE_HASH_SIZE = 8  # 8x8 = 64-bit hashes
+VLM_CACHE_MAX_DISTANCE = 6  # Differing bits still treated as the same image
+# How keyframes are captioned: 'batch' (one padded generate() over all keyframes),
+# 'multi_image' (one prompt over all keyframes, one caption) or 'sequential'.
+# Compare them with `python benchmarks/bench_vlm_batch.py`.
+VLM_CAPTION_MODE = 'batch'
+VLM_MULTI_IMAGE_PROMPT = ("These frames come from one security camera clip, in time order. "
+                          "Describe the person, any weapons or threats you observe, and the location:")
+# Per-incident budget for the VLM summary, counted from detection. Generation stops when
+# it runs out; finished captions are kept and the rest become basic descriptions, so a
+# slow or contended model cannot hold a violation (and its alert update) indefinitely.
+VLM_SUMMARY_DEADLINE_SECONDS = 30
+# Keyframes are picked from the in-memory pre-roll by detection score (confidence x box
+# size of the armed person) and, with cropping on, cut around that person's box.
+VLM_KEYFRAMES = 4
+VLM_CROP_ARMED_PERSON = True
+VLM_CROP_MARGIN = 0.3  # Extra context around the box, as a fraction of its size
+VLM_CROP_MIN_SIZE = 384  # Crops are at least this many pixels per side where the frame allows
+
+# --- Violation Queue ---
+# Violations go through alert -> clip -> summary stages, each a bounded priority queue
+# with its own worker pool. The alert stage raises the dashboard alert and queues the
+# Django Alert from the snapshot right away; clip and summary are attached later.
+# When the alert, clip or summary queue is full:
+#   'degrade': skip that stage (no clip / basic caption) but still alert
+#   'drop_lowest': drop the lowest-priority queued violation
+VIOLATION_QUEUE_SIZE = 32
+VIOLATION_ALERT_WORKERS = 2
+VIOLATION_CLIP_WORKERS = 2
+VIOLATION_SUMMARY_WORKERS = 1  # The VLM is one model; more workers only contend for it
+VIOLATION_QUEUE_FULL_POLICY = 'degrade'  # or 'drop_lowest' (clip and summary stages only; alerts always degrade)
+VIOLATION_CLIP_WAIT_SECONDS = 60  # Process pipeline: how long to wait for the detection process's clip
+
+# --- Alert Outbox ---
+# Django requests are written to an SQLite outbox before they are sent and deleted once
+# Django confirms them, so no alert is lost while Django or the network is down.
+OUTBOX_PATH = os.path.join(SAVE_DIR, "outbox.sqlite3")
+OUTBOX_WORKERS = 2  # Sender threads, each with its own keep-alive session
+OUTBOX_BASE_BACKOFF_SECONDS = 1.0  # First retry delay, doubled per failed attempt
+OUTBOX_MAX_BACKOFF_SECONDS = 300
+OUTBOX_CONNECT_TIMEOUT_SECONDS = 5
+OUTBOX_READ_TIMEOUT_SECONDS = 30
+OUTBOX_IDLE_POLL_SECONDS = 5
+OUTBOX_CLIP_CHUNK_BYTES = 1024 * 1024  # Clips are sent in chunks of this size; a retry resumes at the last one Django has
+
+# --- Detection Scheduler ---
+# Idle cameras are detected at most once per interval; the interval adapts between the
+# min and max so that capture-to-result latency stays near the target. Cameras with
+# people or weapons in view are always detected at full rate.
+DETECTION_TARGET_LATENCY_MS = 250
+DETECTION_START_INTERVAL_SECONDS = 0.1
+DETECTION_MIN_INTERVAL_SECONDS = 0.0
+DETECTION_MAX_INTERVAL_SECONDS = 1.0
+DETECTION_LATENCY_SMOOTHING = 0.2
+
+# --- Person/Weapon Association ---
+# A person is armed when a weapon's center lies within ASSOCIATION_MAX_DISTANCE_RATIO
+# (of the person's height) of the hands/torso band ASSOCIATION_REGION (top, bottom as
+# fractions of the person box), or when the boxes overlap with IoU >= ASSOCIATION_MIN_IOU.
+ASSOCIATION_REGION = (0.0, 1.0)
+ASSOCIATION_MAX_DISTANCE_RATIO = 0.0
+ASSOCIATION_MIN_IOU = 0.0
+ASSOCIATION_MIN_PERSON_CONFIDENCE = 0.5
+ASSOCIATION_MIN_WEAPON_CONFIDENCE = 0.5
+
+# --- Tracking ---
+# Person and weapon boxes are tracked across frames; each armed person track raises
+# one violation, so different people are alerted separately and a lingering person
+# only re-alerts after TRACK_REALERT_SECONDS.
+TRACK_IOU_THRESHOLD = 0.3
+TRACK_MAX_AGE_SECONDS = 1.5  # Drop tracks that were not matched for this long
+TRACK_DRAW_SECONDS = 0.5  # Stop drawing a track's predicted box after this long unmatched
+TRACK_CONFIRM_HITS = 2  # Consecutive detections with a weapon before a person counts as armed
+TRACK_REALERT_SECONDS = 300
+
+# --- Motion Gate ---
+# Frames due for detection are first checked for motion on a downscaled grey image.
+# Static scenes skip YOLO except for a keep-alive pass every MOTION_KEEPALIVE_SECONDS.
+# A camera source may add 'motion_mask': [[(x, y), ...], ...] polygons (full-resolution
+# pixels) to only count motion inside those regions.
+MOTION_GATE_ENABLED = True
+MOTION_DOWNSCALE_WIDTH = 160
+MOTION_PIXEL_THRESHOLD = 25  # Grey-level change that counts a pixel as moving
+MOTION_MIN_AREA_RATIO = 0.002  # Fraction of (masked) pixels that must move
+MOTION_BACKGROUND_ALPHA = 0.05
+MOTION_HOLD_SECONDS = 3.0  # Keep detecting this long after motion or detections
+MOTION_KEEPALIVE_SECONDS = 2.0
+
+# --- Pre-roll Buffer ---
+# Frames kept before a violation for the evidence clip. Compressed mode stores JPEGs in
+# one preallocated arena of PREROLL_MAX_BYTES per camera; raw mode keeps BGR frames in a
+# deque (~1 GB per 1280x720@30 camera for 12 s).
+PREROLL_SECONDS = 12
+PREROLL_COMPRESSED = True
+PREROLL_MAX_BYTES = 64 * 1024 * 1024
+PREROLL_JPEG_QUALITY = 80
+PREROLL_ENCODE_BACKLOG = 8  # Frames queued for a camera's encoder thread before the oldest is dropped
+
+# --- Live View ---
+STREAM_JPEG_QUALITY = 85
 
 # --- Directory Setup ---
 os.makedirs(SAVE_DIR, exist_ok=True)
@@ -1,10 +1,13 @@
 import cv2
 import time
-from collections import deque
-
 import state
 import config
-from camera import VideoStream
+from camera import VideoStream, FrameSignal
+from preroll import make_preroll_buffer
+from motion import MotionGate
+from scheduler import AdaptiveDetectionScheduler
+from association import update_tracks
+from tracker import IoUTracker, draw_tracks, track_detections, keyframe_score
 from violation_processor import process_violation_async
 from vlm import TORCH_AVAILABLE, TRANSFORMERS_AVAILABLE
 
@@ -16,6 +19,86 @@ except ImportError:
     YOLO_AVAILABLE = False
     exit(1)
 
+def start_cameras(frame_signal):
+    """Open every source in config.CAMERA_SOURCES and register its CameraState."""
+    cameras = []
+    for source in config.CAMERA_SOURCES:
+        camera = state.CameraState(source['camera_id'], source['src'])
+        camera.priority = source.get('priority', 0)
+        print(f"Starting threaded video stream for {camera.camera_id} (src={camera.src})...")
+        try:
+            camera.vs = VideoStream(src=camera.src, frame_signal=frame_signal).start()
+        except Exception as e:
+            print(f"❌ Failed to initialize video stream for {camera.camera_id}: {e}")
+            continue
+
+        camera.fps = camera.vs.fps
+        camera.frame_buffer = make_preroll_buffer(camera.fps)
+        camera.motion_gate = MotionGate(camera.camera_id, source.get('motion_mask'))
+        camera.tracker = IoUTracker()
+        state.cameras[camera.camera_id] = camera
+        cameras.append(camera)
+    return cameras
+
+def run_batched_inference(batch):
+    """Run one predict() over the latest frame of several cameras.
+
+    batch is a list of (camera, frame, capture_time); returns (results in batch order, seconds spent).
+    """
+    frames = [frame for _, frame, _ in batch]
+    results = []
+    start = time.time()
+    for i in range(0, len(frames), config.INFERENCE_MAX_BATCH):
+        # Detect only person and weapon classes (ignore criminal class)
+        results.extend(state.yolo_model.predict(
+            source=frames[i:i + config.INFERENCE_MAX_BATCH],
+            verbose=False,
+            conf=0.5,
+            iou=0.4,
+            classes=[config.PERSON_CLASS_ID, config.WEAPON_CLASS_ID]
+        ))
+    elapsed = time.time() - start
+
+    state.inference_stats['batches'] += 1
+    state.inference_stats['frames'] += len(frames)
+    state.inference_stats['last_batch_size'] = len(frames)
+    state.inference_stats['last_batch_ms'] = round(elapsed * 1000, 1)
+    if elapsed > 0:
+        state.inference_stats['frames_per_second'] = round(len(frames) / elapsed, 1)
+    return results, elapsed
+
+def check_violation(camera, frame, result, now):
+    """Update the camera's tracks from a result and raise one violation per newly armed person track."""
+    due = update_tracks(camera.tracker, result, now)
+    score, box = keyframe_score(camera.tracker, now, frame.shape)
+    if score > 0:
+        camera.frame_buffer.annotate(now, score, box)
+    for track in due:
+        track.last_alert_time = now
+        ai_status = "SmolVLM2" if TRANSFORMERS_AVAILABLE else "Basic"
+        print(f"🚨 WEAPON THREAT DETECTED on {camera.camera_id}! Armed person track #{track.track_id}! Processing with {ai_status}...")
+        process_violation_async(camera, frame.copy(), camera.frame_buffer.snapshot(), camera.fps,
+                                track_id=track.track_id, confidence=track.confidence,
+                                detections=track_detections(camera.tracker, now), detected_at=now)
+    camera.stats['tracks'] = len(camera.tracker.tracks)
+
+def draw_overlay(camera, now):
+    """Draw the tracked boxes (predicted forward to the frame's capture time) and status text onto the camera's streaming frame."""
+    try:
+        with camera.current_frame_lock:
+            draw_tracks(camera.current_frame, camera.tracker, now)
+
+            # Add status text
+            ai_mode = "SmolVLM2" if TRANSFORMERS_AVAILABLE else "Basic Mode"
+            status_text = f"{camera.camera_id} | {ai_mode} Weapon Detection | Frame: {camera.frame_counter} | Processing: {camera.violations_in_progress}"
+            cv2.putText(camera.current_frame, status_text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+
+            # Add violation stats
+            stats_text = f"Total Threats: {camera.stats['total_violations']} | Status: {camera.stats['current_status']}"
+            cv2.putText(camera.current_frame, stats_text, (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 2)
+    except:
+        pass
+
 def detection_loop():
     if not YOLO_AVAILABLE:
         return
@@ -28,112 +111,69 @@ def detection_loop():
         print(f"❌ Error loading YOLO model: {e}")
         return
 
-    print("Starting threaded video stream...")
-    try:
-        state.vs = VideoStream(src=0).start()
-        time.sleep(2.0)
-    except Exception as e:
-        print(f"❌ Failed to initialize video stream: {e}")
+    frame_signal = FrameSignal()
+    scheduler = AdaptiveDetectionScheduler()
+    state.detection_scheduler = scheduler
+    cameras = start_cameras(frame_signal)
+    if not cameras:
+        print("❌ No camera could be opened. Stopping detection loop.")
         return
+    time.sleep(2.0)
 
-    fps = state.vs.fps
-    buffer_len = int(fps * 12)
-    frame_buffer = deque(maxlen=buffer_len)
-
-    print(f"🚀 Starting weapon detection loop...")
-    state.last_results = None
+    print(f"🚀 Starting weapon detection loop for {len(cameras)} camera(s)...")
+    for camera in cameras:
+        camera.stats['current_status'] = 'monitoring'
     state.violation_stats['current_status'] = 'monitoring'
 
     try:
         while True:
-            frame = state.vs.read()
-            if frame is None:
-                time.sleep(0.01)
-                continue
+            signal_version = frame_signal.version
+            now = time.time()
+            updated, candidates = [], []
+            for camera in cameras:
+                seq, frame, capture_time = camera.vs.read_latest()
+                if frame is None or seq == camera.last_frame_seq:
+                    continue
+                camera.last_frame_seq = seq
+                camera.frame_counter += 1
+                camera.stats['frames_processed'] += 1
+
+                # Update current frame for streaming
+                with camera.current_frame_lock:
+                    camera.current_frame = frame.copy()
+
+                camera.frame_buffer.append(frame, capture_time)
+                updated.append((camera, capture_time))
 
-            state.frame_counter += 1
-            
-            # Update current frame for streaming
-            with state.current_frame_lock:
-                state.current_frame = frame.copy()
-            
-            frame_buffer.append(frame)
+                # Detect when the scheduler says this camera is due, and only if the scene is not static
+                if scheduler.is_due(camera.camera_id, now) and (
+                        scheduler.is_active(camera.camera_id) or camera.motion_gate.should_detect(frame, now)):
+                    candidates.append((camera.camera_id, capture_time, (camera, frame)))
 
-            # Run detection on a subset of frames
-            if (state.frame_counter % config.DETECTION_SKIP_FRAMES) == 0:
+            if not updated:
+                # Sleep until any camera delivers a new frame
+                frame_signal.wait(signal_version)
+                continue
+
+            batch = [(camera, frame, capture_time) for _, capture_time, (camera, frame) in scheduler.select(candidates)]
+            if batch:
                 try:
-                    # Detect only person and weapon classes (ignore criminal class)
-                    results = state.yolo_model.predict(
-                        source=frame, 
-                        verbose=False, 
-                        conf=0.5, 
-                        iou=0.4, 
-                        classes=[config.PERSON_CLASS_ID, config.WEAPON_CLASS_ID]
-                    )
-                    state.last_results = results
-
-                    current_time = time.time()
-                    if not state.violation_processing and (current_time - state.last_violation_time) > config.VIOLATION_COOLDOWN_SECONDS:
-                        persons, weapons = [], []
-                        if results and results[0].boxes is not None:
-                            for box in results[0].boxes:
-                                class_id = int(box.cls[0])
-                                if class_id == config.PERSON_CLASS_ID:
-                                    persons.append(box.xyxy[0].cpu().numpy())
-                                elif class_id == config.WEAPON_CLASS_ID:
-                                    weapons.append(box.xyxy[0].cpu().numpy())
-
-                        # Check if any person is near/carrying a weapon
-                        for person_box in persons:
-                            person_has_weapon = False
-                            px1, py1, px2, py2 = person_box
-                            
-                            for weapon_box in weapons:
-                                wx1, wy1, wx2, wy2 = weapon_box
-                                weapon_center_x = (wx1 + wx2) / 2
-                                weapon_center_y = (wy1 + wy2) / 2
-                                
-                                # 1. Weapon center is inside person box
-                                if (px1 <= weapon_center_x <= px2 and py1 <= weapon_center_y <= py2):
-                                    person_has_weapon = True
-                                    break
-                                
-                                # 2. Weapon box overlaps with person box
-                                x_overlap = max(0, min(px2, wx2) - max(px1, wx1))
-                                y_overlap = max(0, min(py2, wy2) - max(py1, wy1))
-                                
-                                if (x_overlap * y_overlap) > 0:
-                                    person_has_weapon = True
-                                    break
-                            
-                            if person_has_weapon:
-                                ai_status = "SmolVLM2" if TRANSFORMERS_AVAILABLE else "Basic"
-                                print(f"🚨 WEAPON THREAT DETECTED! Person with weapon found! Processing with {ai_status}...")
-                                process_violation_async(frame.copy(), list(frame_buffer), fps)
-                                break  # Process only one violation at a time
-                                
+                    results, elapsed = run_batched_inference(batch)
+                    detections = []
+                    for (camera, frame, capture_time), result in zip(batch, results):
+                        camera.stats['inferences'] += 1
+                        object_count = len(result.boxes) if result.boxes is not None else 0
+                        camera.motion_gate.note_detections(object_count)
+                        detections.append((camera.camera_id, capture_time, object_count > 0))
+                        check_violation(camera, frame, result, capture_time)
+                    scheduler.record(detections, elapsed)
                 except Exception as e:
                     print(f"❌ YOLO prediction error: {e}")
-                    continue
-            
-            # Add detection overlays to current frame
-            if state.last_results:
-                try:
-                    with state.current_frame_lock:
-                        state.current_frame = state.last_results[0].plot(img=state.current_frame)
-                        
-                        # Add status text
-                        ai_mode = "SmolVLM2" if TRANSFORMERS_AVAILABLE else "Basic Mode"
-                        status_text = f"{ai_mode} Weapon Detection | Frame: {state.frame_counter} | Processing: {'Yes' if state.violation_processing else 'No'}"
-                        cv2.putText(state.current_frame, status_text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-                        
-                        # Add violation stats
-                        stats_text = f"Total Threats: {state.violation_stats['total_violations']} | Status: {state.violation_stats['current_status']}"
-                        cv2.putText(state.current_frame, stats_text, (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 2)
-                except:
-                    pass
-            
-            time.sleep(0.01)  # Small delay to prevent excessive CPU usage
+
+            # Add detection overlays to current frames and hand them to the live view
+            for camera, capture_time in updated:
+                draw_overlay(camera, capture_time)
+                camera.broadcaster.submit(camera.current_frame)
 
     except KeyboardInterrupt:
         print("\n🛑 Detection loop interrupted by user...")
@@ -141,10 +181,12 @@ def detection_loop():
         print(f"❌ Unexpected error in detection loop: {e}")
     finally:
         print("🛑 Stopping detection loop...")
-        if state.vs:
-            state.vs.stop()
+        for camera in cameras:
+            camera.broadcaster.stop()
+            if camera.vs:
+                camera.vs.stop()
         if TORCH_AVAILABLE:
             import torch
             if torch.cuda.is_available():
                 torch.cuda.empty_cache()
-        print("✅ Detection cleanup complete.")
\ No newline at end of file
+        print("✅ Detection cleanup complete.")
@@ -20,6 +20,17 @@ def emit_violation_alert(violation_data):
         socketio.emit('violation_detected', violation_data)
     print(f"🔔 Violation alert sent to frontend: {violation_data['summary'][:50]}...")
 
+def emit_violation_update(violation_data):
+    """Emit the enriched version (clip + VLM summary) of an alert that was already sent"""
+    with app.app_context():
+        socketio.emit('violation_updated', violation_data)
+    print(f"🔔 Violation #{violation_data['id']} updated on frontend: {violation_data['summary'][:50]}...")
+
+def emit_summary_progress(progress):
+    """Emit a partial VLM caption while the summary of a violation is being generated"""
+    with app.app_context():
+        socketio.emit('violation_summary_progress', progress)
+
 def emit_status_update(status_data):
     """Emit status update to all connected clients"""
     with app.app_context():  # <-- CHANGED: Use 'app.app_context()'
@@ -0,0 +1,93 @@
+import cv2
+import time
+import numpy as np
+
+import config
+
+class MotionGate:
+    """Cheap motion pre-stage that decides whether a frame is worth a YOLO pass.
+
+    Frames are downscaled to grey, compared against a running-average background and,
+    if a mask is configured, only changes inside the mask polygons count. Detection
+    runs while there is motion, for MOTION_HOLD_SECONDS after motion or detections
+    were last seen, and at least once every MOTION_KEEPALIVE_SECONDS regardless.
+    """
+    def __init__(self, camera_id, mask_polygons=None):
+        self.camera_id = camera_id
+        self.enabled = config.MOTION_GATE_ENABLED
+        self.mask_polygons = mask_polygons or []
+        self.mask = None
+        self.mask_pixels = 0
+        self.background = None
+        self.size = None
+
+        self.last_activity_time = 0
+        self.last_inference_time = 0
+        self.stats = {
+            'frames_checked': 0,
+            'motion_frames': 0,
+            'inferences_saved': 0,
+            'keepalive_inferences': 0,
+            'last_motion_ratio': 0.0
+        }
+
+    def _prepare(self, frame):
+        h, w = frame.shape[:2]
+        scale = config.MOTION_DOWNSCALE_WIDTH / float(w)
+        self.size = (config.MOTION_DOWNSCALE_WIDTH, max(1, int(h * scale)))
+        if self.mask_polygons:
+            self.mask = np.zeros((self.size[1], self.size[0]), dtype=np.uint8)
+            for polygon in self.mask_polygons:
+                points = (np.array(polygon, dtype=np.float32) * scale).astype(np.int32)
+                cv2.fillPoly(self.mask, [points], 255)
+            self.mask_pixels = int(np.count_nonzero(self.mask))
+        else:
+            self.mask_pixels = self.size[0] * self.size[1]
+
+    def motion_ratio(self, frame):
+        """Fraction of (masked) pixels that differ from the background; updates the background."""
+        if self.size is None:
+            self._prepare(frame)
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        grey = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+
+        if self.background is None:
+            self.background = grey.astype(np.float32)
+            return 1.0
+
+        diff = cv2.absdiff(grey, cv2.convertScaleAbs(self.background))
+        _, changed = cv2.threshold(diff, config.MOTION_PIXEL_THRESHOLD, 255, cv2.THRESH_BINARY)
+        if self.mask is not None:
+            changed = cv2.bitwise_and(changed, self.mask)
+        cv2.accumulateWeighted(grey, self.background, config.MOTION_BACKGROUND_ALPHA)
+        return cv2.countNonZero(changed) / float(max(1, self.mask_pixels))
+
+    def should_detect(self, frame, now=None):
+        """Return True if this frame should be sent to the detector."""
+        if not self.enabled:
+            return True
+        if now is None:
+            now = time.time()
+        self.stats['frames_checked'] += 1
+
+        ratio = self.motion_ratio(frame)
+        self.stats['last_motion_ratio'] = round(ratio, 4)
+        if ratio >= config.MOTION_MIN_AREA_RATIO:
+            self.stats['motion_frames'] += 1
+            self.last_activity_time = now
+
+        if (now - self.last_activity_time) <= config.MOTION_HOLD_SECONDS:
+            self.last_inference_time = now
+            return True
+        if (now - self.last_inference_time) >= config.MOTION_KEEPALIVE_SECONDS:
+            self.stats['keepalive_inferences'] += 1
+            self.last_inference_time = now
+            return True
+
+        self.stats['inferences_saved'] += 1
+        return False
+
+    def note_detections(self, count, now=None):
+        """Keep the gate open while the detector still sees people or weapons, even if they stand still."""
+        if count > 0:
+            self.last_activity_time = time.time() if now is None else now
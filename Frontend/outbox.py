@@ -0,0 +1,247 @@
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import config
+
+class AlertOutbox:
+    """Disk-backed queue of Django alert requests, drained by a small pool of sender threads.
+
+    Every request is a row in an SQLite database in SAVE_DIR, written before the caller
+    returns, so alerts survive Django restarts, network blips and restarts of this app.
+    Rows carry an idempotency key that is sent as the Idempotency-Key header; Django
+    answers a repeated create with the alert it already has, so a retry after a lost
+    response never duplicates an alert. Updates and clips wait until the create they
+    depend on has been delivered. Clips go up in chunks straight from disk and a retry
+    resumes from the offset Django already has. Failed attempts are retried with capped
+    exponential backoff; only responses that can never succeed (4xx other than
+    408/409/429) mark a row failed.
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            idempotency_key TEXT NOT NULL UNIQUE,
+            kind TEXT NOT NULL,
+            depends_on TEXT,
+            payload TEXT NOT NULL,
+            files TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL,
+            last_error TEXT
+        );
+        CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at);
+    """
+
+    def __init__(self, path=config.OUTBOX_PATH, workers=config.OUTBOX_WORKERS):
+        self.path = path
+        self.blob_dir = os.path.splitext(path)[0] + "_files"
+        os.makedirs(self.blob_dir, exist_ok=True)
+
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(self.SCHEMA)
+        # Rows a previous run was sending when it stopped are simply sent again
+        self.db.execute("UPDATE outbox SET status = 'pending' WHERE status = 'sending'")
+        self.lock = threading.Lock()
+        self.wakeup = threading.Condition(self.lock)
+        self.stats = {
+            'workers': workers,
+            'sent': 0,
+            'retries': 0,
+            'failed': 0,
+            'in_flight': 0,
+            'last_error': None,
+            'avg_delivery_ms': 0.0,
+            'max_delivery_ms': 0.0
+        }
+        for i in range(workers):
+            threading.Thread(target=self._worker, name=f"outbox-{i}", daemon=True).start()
+
+    # --- Producers ---
+
+    def _insert(self, key, kind, payload, files, created_at, depends_on=None):
+        with self.lock:
+            self.db.execute(
+                "INSERT OR IGNORE INTO outbox (idempotency_key, kind, depends_on, payload, files, created_at, next_attempt_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, kind, depends_on, json.dumps(payload), json.dumps(files), created_at, time.time())
+            )
+            self.wakeup.notify()
+
+    def enqueue_create(self, key, snapshot_jpeg, payload, created_at=None):
+        """Queue an alert creation; snapshot_jpeg (bytes) is written next to the database first."""
+        snapshot_path = os.path.join(self.blob_dir, f"{key}.jpg")
+        with open(snapshot_path, "wb") as f:
+            f.write(snapshot_jpeg)
+        files = [['snapshot', snapshot_path, 'image/jpeg', True]]
+        self._insert(key, 'create', payload, files, created_at or time.time())
+
+    def enqueue_update(self, key, depends_on, payload, created_at=None):
+        """Queue a partial update of the alert created under the depends_on key."""
+        self._insert(key, 'update', payload, [], created_at or time.time(), depends_on)
+
+    def enqueue_clip(self, key, depends_on, clip_path, created_at=None):
+        """Queue a chunked upload of clip_path as the clip of the alert created under depends_on."""
+        files = [['clip', clip_path, 'video/mp4', False]]
+        self._insert(key, 'clip', {}, files, created_at or time.time(), depends_on)
+
+    # --- Sender pool ---
+
+    def _claim(self):
+        """Mark the oldest deliverable row as sending and return it, or the seconds until one is due."""
+        now = time.time()
+        row = self.db.execute(
+            "SELECT id, idempotency_key, kind, depends_on, payload, files, created_at, attempts FROM outbox o "
+            "WHERE status = 'pending' AND next_attempt_at <= ? AND (depends_on IS NULL OR NOT EXISTS ("
+            "    SELECT 1 FROM outbox d WHERE d.idempotency_key = o.depends_on AND d.status IN ('pending', 'sending'))) "
+            "ORDER BY id LIMIT 1", (now,)
+        ).fetchone()
+        if row is not None:
+            self.db.execute("UPDATE outbox SET status = 'sending' WHERE id = ?", (row[0],))
+            self.stats['in_flight'] += 1
+            return row, None
+        next_due = self.db.execute(
+            "SELECT MIN(next_attempt_at) FROM outbox WHERE status = 'pending'"
+        ).fetchone()[0]
+        return None, (max(0.05, next_due - now) if next_due is not None else None)
+
+    def _worker(self):
+        session = requests.Session()
+        session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        while True:
+            with self.lock:
+                row, wait = self._claim()
+                if row is None:
+                    self.wakeup.wait(timeout=min(wait or config.OUTBOX_IDLE_POLL_SECONDS, config.OUTBOX_IDLE_POLL_SECONDS))
+                    continue
+            self._deliver(session, row)
+
+    def _send(self, session, kind, key, depends_on, payload, files):
+        timeout = (config.OUTBOX_CONNECT_TIMEOUT_SECONDS, config.OUTBOX_READ_TIMEOUT_SECONDS)
+        if kind == 'clip':
+            return self._send_clip(session, key, depends_on, files[0][1], timeout)
+        handles = {}
+        try:
+            for field, path, content_type, _ in files:
+                if os.path.exists(path):
+                    handles[field] = (os.path.basename(path), open(path, "rb"), content_type)
+            headers = {'Idempotency-Key': key}
+            if kind == 'create':
+                return session.post(config.DJANGO_API_URL, data=payload, files=handles, headers=headers, timeout=timeout)
+            url = config.DJANGO_ALERT_UPDATE_URL.format(key=depends_on)
+            return session.patch(url, data=payload, files=handles, headers=headers, timeout=timeout)
+        finally:
+            for _, handle, _ in handles.values():
+                handle.close()
+
+    def _send_clip(self, session, key, alert_key, path, timeout):
+        """Start (or resume) the upload, send the chunks Django is missing, then finalize with the SHA-256.
+
+        Only one chunk is in memory at a time. Returns the first unsuccessful response, or
+        the finalize response.
+        """
+        size = os.path.getsize(path)
+        response = session.post(config.DJANGO_CLIP_UPLOAD_URL, json={
+            'alert_key': alert_key,
+            'filename': os.path.basename(path),
+            'size': size,
+            'chunk_size': config.OUTBOX_CLIP_CHUNK_BYTES
+        }, headers={'Idempotency-Key': key}, timeout=timeout)
+        if response.status_code not in (200, 201):
+            return response
+        upload = response.json()
+        if upload['status'] == 'complete':
+            return response
+
+        upload_url = f"{config.DJANGO_CLIP_UPLOAD_URL}{upload['upload_id']}/"
+        chunk_size, offset = upload['chunk_size'], upload['offset']
+        if offset:
+            print(f"🔁 Outbox clip {key} resuming at {offset}/{size} bytes")
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            while offset < size:
+                index = offset // chunk_size
+                f.seek(index * chunk_size)
+                response = session.put(f"{upload_url}chunks/{index}/", data=f.read(chunk_size),
+                                       headers={'Content-Type': 'application/octet-stream'}, timeout=timeout)
+                if response.status_code not in (200, 409):
+                    return response
+                offset = response.json()['offset']  # 409: Django tells us where to carry on
+            f.seek(0)
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        return session.post(f"{upload_url}finalize/", json={'sha256': digest.hexdigest()}, timeout=timeout)
+
+    def _deliver(self, session, row):
+        row_id, key, kind, depends_on, payload, files, created_at, attempts = row
+        files = json.loads(files)
+        error, permanent = None, False
+        try:
+            response = self._send(session, kind, key, depends_on, json.loads(payload), files)
+            if response.status_code in (200, 201):
+                self._delivered(row_id, kind, key, files, created_at)
+                return
+            error = f"HTTP {response.status_code}: {response.text[:100]}"
+            permanent = 400 <= response.status_code < 500 and response.status_code not in (408, 409, 429)
+        except requests.exceptions.RequestException as e:
+            error = f"Network error: {e}"
+        except FileNotFoundError as e:
+            error, permanent = f"Missing file: {e}", True
+        except Exception as e:
+            error = f"Unknown error: {e}"
+
+        attempts += 1
+        delay = min(config.OUTBOX_MAX_BACKOFF_SECONDS, config.OUTBOX_BASE_BACKOFF_SECONDS * (2 ** (attempts - 1)))
+        delay *= random.uniform(0.8, 1.2)  # Jitter so a recovering Django is not hit by every row at once
+        with self.lock:
+            self.stats['in_flight'] -= 1
+            self.stats['last_error'] = error
+            if permanent:
+                self.stats['failed'] += 1
+                self.db.execute("UPDATE outbox SET status = 'failed', attempts = ?, last_error = ? WHERE id = ?",
+                                (attempts, error, row_id))
+                print(f"❌ Outbox {kind} {key} rejected by Django, giving up: {error}")
+            else:
+                self.stats['retries'] += 1
+                self.db.execute("UPDATE outbox SET status = 'pending', attempts = ?, next_attempt_at = ?, last_error = ? "
+                                "WHERE id = ?", (attempts, time.time() + delay, error, row_id))
+                print(f"⚠️ Outbox {kind} {key} failed ({error}), retry #{attempts} in {delay:.1f}s")
+
+    def _delivered(self, row_id, kind, key, files, created_at):
+        latency_ms = (time.time() - created_at) * 1000
+        with self.lock:
+            self.db.execute("DELETE FROM outbox WHERE id = ?", (row_id,))
+            self.stats['in_flight'] -= 1
+            self.stats['sent'] += 1
+            previous = self.stats['avg_delivery_ms']
+            self.stats['avg_delivery_ms'] = round(latency_ms if previous == 0.0 else previous * 0.9 + latency_ms * 0.1, 1)
+            self.stats['max_delivery_ms'] = round(max(self.stats['max_delivery_ms'], latency_ms), 1)
+            self.wakeup.notify_all()  # Updates waiting on this create are deliverable now
+        for _, path, _, owned in files:
+            if owned and os.path.exists(path):
+                os.remove(path)
+        print(f"✅ Outbox {kind} {key} delivered ({latency_ms:.0f} ms after detection)")
+
+    def queue_stats(self):
+        """Counters plus current depth and the age of the oldest undelivered row."""
+        with self.lock:
+            depth, oldest = self.db.execute(
+                "SELECT COUNT(*), MIN(created_at) FROM outbox WHERE status IN ('pending', 'sending')"
+            ).fetchone()
+            failed_rows = self.db.execute("SELECT COUNT(*) FROM outbox WHERE status = 'failed'").fetchone()[0]
+            return {
+                **self.stats,
+                'depth': depth,
+                'oldest_age_seconds': round(time.time() - oldest, 1) if oldest is not None else 0.0,
+                'failed_rows': failed_rows
+            }
@@ -0,0 +1,361 @@
+import cv2
+import itertools
+import threading
+import time
+import numpy as np
+from collections import deque
+
+import config
+
+def select_keyframes(timestamps, scores, count):
+    """Indices of up to count frames in time order.
+
+    Frames with the highest detection scores are taken first, at least a fraction of the
+    window apart so they do not all come from the same second; the remaining picks are
+    spread evenly over the window.
+    """
+    n = len(timestamps)
+    count = min(count, n)
+    if count == 0:
+        return []
+    min_gap = (timestamps[-1] - timestamps[0]) / (count * 2)
+    picks = []
+    for i in np.argsort(-np.asarray(scores), kind='stable'):
+        if scores[i] <= 0 or len(picks) == count:
+            break
+        if all(abs(timestamps[i] - timestamps[j]) >= min_gap for j in picks):
+            picks.append(int(i))
+    for i in np.linspace(0, n - 1, count).astype(int):
+        if len(picks) == count:
+            break
+        if i not in picks:
+            picks.append(int(i))
+    return sorted(picks)
+
+def crop_to_box(frame, box, margin=config.VLM_CROP_MARGIN, min_size=config.VLM_CROP_MIN_SIZE):
+    """Crop around box (xyxy) with a margin, at least min_size pixels per side where the frame allows."""
+    h, w = frame.shape[:2]
+    x1, y1, x2, y2 = box
+    cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
+    half_w = max((x2 - x1) * (1 + 2 * margin), min_size) / 2
+    half_h = max((y2 - y1) * (1 + 2 * margin), min_size) / 2
+    left, right = int(max(0, cx - half_w)), int(min(w, cx + half_w))
+    top, bottom = int(max(0, cy - half_h)), int(min(h, cy + half_h))
+    if right - left < 2 or bottom - top < 2:
+        return frame
+    return frame[top:bottom, left:right]
+
+class KeyframeSnapshot:
+    """keyframes() for pre-roll snapshots; subclasses provide timestamps, scores, boxes and _frame_at()."""
+    def keyframes(self, count, crop=False):
+        """Decode the best-scored frames: [(image, seconds into the window)].
+
+        With crop, frames that carry a detection box are cropped around it so the VLM
+        sees the armed person at a higher effective resolution.
+        """
+        keyframes = []
+        for i in select_keyframes(self.timestamps, self.scores, count):
+            frame = self._frame_at(i)
+            if frame is None:
+                continue
+            box = self.boxes[i]
+            if crop and not np.isnan(box).any():
+                frame = crop_to_box(frame, box)
+            keyframes.append((frame, float(self.timestamps[i] - self.timestamps[0])))
+        return keyframes
+
+class FrameListSnapshot(list, KeyframeSnapshot):
+    """Snapshot of a raw pre-roll buffer. release() exists only to match PrerollSnapshot."""
+    def __init__(self, frames, meta=()):
+        super().__init__(frames)
+        meta = list(meta) or [(0.0, 0.0, None)] * len(self)
+        self.timestamps = np.array([m[0] for m in meta], dtype=np.float64)
+        self.scores = np.array([m[1] for m in meta], dtype=np.float32)
+        self.boxes = np.array([m[2] if m[2] is not None else [np.nan] * 4 for m in meta], dtype=np.float32).reshape(-1, 4)
+
+    def _frame_at(self, i):
+        return self[i]
+
+    def release(self):
+        pass
+
+class RawPrerollBuffer:
+    """The original deque of raw BGR frames, kept for comparison (config.PREROLL_COMPRESSED = False)."""
+    def __init__(self, fps, seconds=config.PREROLL_SECONDS):
+        self.frames = deque(maxlen=int(fps * seconds))
+        self.meta = deque(maxlen=int(fps * seconds)) # [timestamp, score, box] per frame
+        self.frame_bytes = 0
+
+    def __len__(self):
+        return len(self.frames)
+
+    def append(self, frame, timestamp=None):
+        self.frame_bytes = frame.nbytes
+        self.frames.append(frame)
+        self.meta.append([timestamp or time.time(), 0.0, None])
+
+    def annotate(self, timestamp, score, box=None):
+        """Attach a detection score (and the box to crop) to the frame appended with this timestamp."""
+        for meta in reversed(self.meta):
+            if meta[0] == timestamp:
+                meta[1], meta[2] = score, box
+                return True
+        return False
+
+    def snapshot(self):
+        return FrameListSnapshot(self.frames, self.meta)
+
+    def stats(self):
+        used = len(self.frames) * self.frame_bytes
+        return {
+            'mode': 'raw',
+            'frames': len(self.frames),
+            'bytes_used': used,
+            'bytes_reserved': used,
+            'raw_equivalent_bytes': used
+        }
+
+class PrerollSnapshot(KeyframeSnapshot):
+    """Zero-copy view of a PrerollBuffer window.
+
+    Holds only (slot, seq, offset, length) records plus each frame's timestamp and
+    detection score; frames are decoded straight out of the buffer's arena while
+    iterating. The window stays pinned against time-based eviction until release();
+    a frame overwritten under memory pressure is skipped.
+    """
+    def __init__(self, buffer, entries, pin_id, timestamps, scores, boxes):
+        self.buffer = buffer
+        self.entries = entries
+        self.pin_id = pin_id
+        self.timestamps = timestamps
+        self.scores = scores
+        self.boxes = boxes
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        for slot, seq, offset, length in self.entries:
+            frame = self.buffer.decode(slot, seq, offset, length)
+            if frame is not None:
+                yield frame
+
+    def _frame_at(self, i):
+        return self.buffer.decode(*self.entries[i])
+
+    def release(self):
+        if self.pin_id is not None:
+            self.buffer.unpin(self.pin_id)
+            self.pin_id = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+class PrerollBuffer:
+    """Time-windowed pre-roll of JPEG-compressed frames in one preallocated byte arena.
+
+    append() only queues the frame; the buffer's own encoder thread JPEG-encodes it, so
+    the encode cost stays off the shared detection loop and each camera encodes in
+    parallel. If the encoder falls behind by more than PREROLL_ENCODE_BACKLOG frames the
+    oldest queued frame is dropped. Encoded frames are written back to back into the arena, wrapping
+    around at the end. The oldest frames are evicted once they fall out of the time
+    window, when the arena has no room left (the memory cap), or when the metadata
+    ring is full. Each slot carries a sequence number that is invalidated before its
+    bytes are reused, so readers can detect frames overwritten underneath them.
+    """
+    def __init__(self, fps, seconds=config.PREROLL_SECONDS, max_bytes=config.PREROLL_MAX_BYTES,
+                 quality=config.PREROLL_JPEG_QUALITY, backlog=config.PREROLL_ENCODE_BACKLOG):
+        self.seconds = seconds
+        self.quality = quality
+        self.backlog = max(2, backlog)
+        self.arena = np.empty(max_bytes, dtype=np.uint8)
+        self.max_entries = max(2, int(fps * seconds) * 2)  # Headroom for windows pinned by snapshots
+
+        self.seqs = np.full(self.max_entries, -1, dtype=np.int64)
+        self.offsets = np.zeros(self.max_entries, dtype=np.int64)
+        self.lengths = np.zeros(self.max_entries, dtype=np.int64)
+        self.timestamps = np.zeros(self.max_entries, dtype=np.float64)
+        self.scores = np.zeros(self.max_entries, dtype=np.float32) # Detection score, see annotate()
+        self.boxes = np.full((self.max_entries, 4), np.nan, dtype=np.float32)
+
+        self.head = 0 # Next metadata slot
+        self.count = 0
+        self.write_pos = 0 # Next arena byte
+        self.bytes_used = 0
+        self.next_seq = 1
+        self.frame_bytes = 0
+        self.dropped_frames = 0
+        self.pins = {}
+        self._pin_ids = itertools.count(1)
+        self.lock = threading.Lock()
+
+        self.pending = deque() # [frame, timestamp, score, box] waiting for the encoder; [0] is in flight
+        self.pending_cond = threading.Condition()
+        self.avg_encode_ms = 0.0
+        self.encoder = None
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def oldest(self):
+        return (self.head - self.count) % self.max_entries
+
+    def _evict_oldest(self):
+        slot = self.oldest
+        self.seqs[slot] = -1
+        self.bytes_used -= int(self.lengths[slot])
+        self.count -= 1
+
+    def _reserve(self, size):
+        """Evict until size contiguous bytes are free and return their offset."""
+        arena_size = self.arena.size
+        while True:
+            if self.count == 0:
+                if self.write_pos + size > arena_size:
+                    self.write_pos = 0
+                return self.write_pos
+
+            oldest_offset = int(self.offsets[self.oldest])
+            if oldest_offset >= self.write_pos:
+                if oldest_offset - self.write_pos >= size:
+                    return self.write_pos
+            else:
+                if arena_size - self.write_pos >= size:
+                    return self.write_pos
+                if oldest_offset >= size:
+                    self.write_pos = 0
+                    return 0
+            self._evict_oldest()
+
+    def append(self, frame, timestamp=None):
+        """Queue a frame for the encoder thread; the caller must not modify it afterwards."""
+        with self.pending_cond:
+            if self.encoder is None:
+                self.encoder = threading.Thread(target=self._encode_loop, name="preroll-encoder", daemon=True)
+                self.encoder.start()
+            if len(self.pending) >= self.backlog:
+                del self.pending[1]  # Oldest frame not yet being encoded
+                self.dropped_frames += 1
+            self.pending.append([frame, timestamp or time.time(), 0.0, None])
+            self.pending_cond.notify_all()
+
+    def flush(self, timeout=1.0):
+        """Wait until every queued frame is in the arena; False on timeout."""
+        with self.pending_cond:
+            return self.pending_cond.wait_for(lambda: not self.pending, timeout=timeout)
+
+    def _encode_loop(self):
+        while True:
+            with self.pending_cond:
+                self.pending_cond.wait_for(lambda: self.pending)
+                frame, timestamp = self.pending[0][:2]
+            start = time.perf_counter()
+            ok, encoded = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+            encode_ms = (time.perf_counter() - start) * 1000
+            with self.pending_cond:
+                # Insert and dequeue together so annotate() always finds the frame in one of the two
+                _, _, score, box = self.pending.popleft()
+                if ok and encoded.size <= self.arena.size:
+                    self._insert(encoded, frame.nbytes, timestamp, score, box)
+                else:
+                    self.dropped_frames += 1
+                self.avg_encode_ms = encode_ms if self.avg_encode_ms == 0.0 else self.avg_encode_ms * 0.95 + encode_ms * 0.05
+                self.pending_cond.notify_all()
+
+    def _insert(self, encoded, frame_bytes, timestamp, score, box):
+        size = encoded.size
+        with self.lock:
+            self.frame_bytes = frame_bytes
+            pinned_from = min(self.pins.values()) if self.pins else None
+            while self.count > 0 and self.timestamps[self.oldest] < timestamp - self.seconds:
+                if pinned_from is not None and self.seqs[self.oldest] >= pinned_from:
+                    break
+                self._evict_oldest()
+            if self.count == self.max_entries:
+                self._evict_oldest()
+
+            offset = self._reserve(size)
+            slot = self.head
+            self.arena[offset:offset + size] = encoded.reshape(-1)
+            self.seqs[slot] = self.next_seq
+            self.offsets[slot] = offset
+            self.lengths[slot] = size
+            self.timestamps[slot] = timestamp
+            self.scores[slot] = score
+            self.boxes[slot] = box if box is not None else np.nan
+
+            self.next_seq += 1
+            self.head = (self.head + 1) % self.max_entries
+            self.count += 1
+            self.write_pos = offset + size
+            self.bytes_used += size
+
+    def annotate(self, timestamp, score, box=None):
+        """Attach a detection score (and the box to crop) to the frame appended with this timestamp."""
+        with self.pending_cond:
+            for item in reversed(self.pending):
+                if item[1] == timestamp:
+                    item[2] = score
+                    if box is not None:
+                        item[3] = box
+                    return True
+        with self.lock:
+            for i in range(self.count):
+                slot = (self.head - 1 - i) % self.max_entries
+                if self.timestamps[slot] == timestamp:
+                    self.scores[slot] = score
+                    if box is not None:
+                        self.boxes[slot] = box
+                    return True
+                if self.timestamps[slot] < timestamp:
+                    break
+        return False
+
+    def snapshot(self):
+        """Pin and describe the current window without copying any frame data.
+        Frames still queued for encoding are waited for, so the triggering frame is included."""
+        self.flush()
+        with self.lock:
+            slots = (self.oldest + np.arange(self.count)) % self.max_entries
+            entries = [(int(slot), int(self.seqs[slot]), int(self.offsets[slot]), int(self.lengths[slot]))
+                       for slot in slots]
+            pin_id = None
+            if entries:
+                pin_id = next(self._pin_ids)
+                self.pins[pin_id] = entries[0][1]
+            return PrerollSnapshot(self, entries, pin_id, self.timestamps[slots], self.scores[slots], self.boxes[slots])
+
+    def unpin(self, pin_id):
+        with self.lock:
+            self.pins.pop(pin_id, None)
+
+    def decode(self, slot, seq, offset, length):
+        """Decode one frame in place from the arena; None if it was evicted before or during decoding."""
+        if self.seqs[slot] != seq:
+            return None
+        frame = cv2.imdecode(self.arena[offset:offset + length], cv2.IMREAD_COLOR)
+        if self.seqs[slot] != seq:
+            return None
+        return frame
+
+    def stats(self):
+        return {
+            'mode': 'jpeg',
+            'frames': self.count,
+            'bytes_used': self.bytes_used,
+            'bytes_reserved': self.arena.nbytes,
+            'raw_equivalent_bytes': self.count * self.frame_bytes,
+            'dropped_frames': self.dropped_frames,
+            'avg_encode_ms': round(self.avg_encode_ms, 2),
+            'encode_backlog': len(self.pending)
+        }
+
+def make_preroll_buffer(fps):
+    """Pre-roll buffer for one camera, compressed unless config.PREROLL_COMPRESSED is off."""
+    if config.PREROLL_COMPRESSED:
+        return PrerollBuffer(fps)
+    return RawPrerollBuffer(fps)
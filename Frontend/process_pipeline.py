@@ -0,0 +1,405 @@
+"""Process-based pipeline mode (config.PIPELINE_MODE = 'process').
+
+Capture, detection and MJPEG encoding each run in their own process so they no
+longer compete for one GIL. Frames move between them through SharedFrameRing
+blocks of preallocated slots stamped with sequence numbers; only small control
+messages (stats, violation events) are pickled through a queue back to the
+Flask process, which keeps handling violations, Socket.IO and HTTP.
+"""
+import cv2
+import os
+import time
+import threading
+import numpy as np
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+import config
+
+class SharedFrameRing:
+    """Single-writer ring of fixed-size slots in shared memory.
+
+    The header holds the latest published sequence number followed by a
+    (sequence, length) pair per slot. The writer marks a slot with -1 while
+    copying into it; readers re-check the slot's sequence after copying and
+    drop the frame if it was overwritten underneath them.
+    """
+    def __init__(self, name, shape, slots=config.PIPELINE_RING_SLOTS, dtype=np.uint8, create=False):
+        self.name = name
+        self.shape = tuple(shape)
+        self.slots = slots
+        self.dtype = np.dtype(dtype)
+        self.owner = create
+
+        slot_size = int(np.prod(self.shape)) * self.dtype.itemsize
+        header_size = (slots + 1) * 2 * 8
+        if create:
+            try:
+                stale = shared_memory.SharedMemory(name=name)
+                stale.close()
+                stale.unlink()
+            except FileNotFoundError:
+                pass
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=header_size + slots * slot_size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+
+        self.header = np.ndarray((slots + 1, 2), dtype=np.int64, buffer=self.shm.buf)
+        self.data = np.ndarray((slots,) + self.shape, dtype=self.dtype, buffer=self.shm.buf, offset=header_size)
+        if create:
+            self.header[:] = 0
+
+    def spec(self):
+        """Picklable description used by other processes to attach to this ring."""
+        return (self.name, self.shape, self.slots, self.dtype.str)
+
+    @classmethod
+    def attach(cls, spec):
+        name, shape, slots, dtype = spec
+        return cls(name, shape, slots=slots, dtype=dtype)
+
+    @property
+    def latest_seq(self):
+        return int(self.header[0, 0])
+
+    def write(self, array):
+        """Copy array into the next slot and publish it. Returns the new sequence number."""
+        flat = array.reshape(-1)
+        seq = self.latest_seq + 1
+        slot = seq % self.slots
+        target = self.data[slot].reshape(-1)
+        if flat.size > target.size:
+            raise ValueError(f"Frame of {flat.size} elements does not fit slot of {target.size}")
+
+        self.header[slot + 1, 0] = -1
+        target[:flat.size] = flat
+        self.header[slot + 1, 1] = flat.size
+        self.header[slot + 1, 0] = seq
+        self.header[0, 0] = seq
+        return seq
+
+    def read_latest(self, last_seq=0):
+        """Return (seq, copy) of the newest slot, or (last_seq, None) when nothing newer is readable."""
+        seq = self.latest_seq
+        if seq == 0 or seq == last_seq:
+            return last_seq, None
+
+        slot = seq % self.slots
+        if int(self.header[slot + 1, 0]) != seq:
+            return last_seq, None
+        length = int(self.header[slot + 1, 1])
+        out = self.data[slot].reshape(-1)[:length].copy()
+        if int(self.header[slot + 1, 0]) != seq:
+            return last_seq, None  # Overwritten while copying
+
+        if length == out.size and length == int(np.prod(self.shape)):
+            out = out.reshape(self.shape)
+        return seq, out
+
+    def close(self):
+        del self.header
+        del self.data
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+# --- Worker Processes ---
+
+def capture_worker(camera_id, src, raw_spec, fps_value, stop_event):
+    """Read frames from one camera and publish them into its raw ring."""
+    from camera import VideoStream
+
+    ring = SharedFrameRing.attach(raw_spec)
+    h, w = ring.shape[:2]
+    try:
+        vs = VideoStream(src=src)  # Only opens the device; frames are read inline in this process
+    except Exception as e:
+        print(f"❌ [{camera_id}] Capture process could not open source: {e}")
+        ring.close()
+        return
+
+    fps_value.value = vs.fps
+    try:
+        while not stop_event.is_set():
+            ret, frame = vs.stream.read()
+            if not ret:
+                time.sleep(0.005)
+                continue
+            if frame.shape != ring.shape:
+                frame = cv2.resize(frame, (w, h))
+            ring.write(frame)
+    finally:
+        vs.stream.release()
+        ring.close()
+
+def _save_clip_and_report(events, camera_id, frames, frame, timestamp, fps, track_id):
+    from clip_writer import save_violation_clip
+
+    try:
+        keyframes = frames.keyframes(config.VLM_KEYFRAMES, crop=config.VLM_CROP_ARMED_PERSON)
+        clip_path = save_violation_clip(frames, frame, timestamp, fps, camera_id)
+    finally:
+        frames.release()
+    # Keyframes travel as JPEGs so the Flask process can caption them without re-reading the clip
+    encoded = []
+    for image, offset in keyframes:
+        ok, jpeg = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 90])
+        if ok:
+            encoded.append((jpeg.tobytes(), offset))
+    events.put(('clip', camera_id, (track_id, timestamp), clip_path, encoded))
+
+def detection_worker(cameras, events, stop_event):
+    """Batched YOLO over the newest raw frame of every camera; annotated frames go to the encode rings.
+
+    cameras: list of (camera_id, raw_spec, annotated_spec, fps_value, motion_mask).
+    """
+    from ultralytics import YOLO
+    from association import update_tracks
+    from tracker import IoUTracker, draw_tracks, track_detections, keyframe_score
+    from preroll import make_preroll_buffer
+    from motion import MotionGate
+    from scheduler import AdaptiveDetectionScheduler
+
+    try:
+        model = YOLO(config.ENGINE_PATH)
+    except Exception as e:
+        print(f"❌ Detection process could not load YOLO model: {e}")
+        return
+
+    streams = []
+    for camera_id, raw_spec, annotated_spec, fps_value, motion_mask in cameras:
+        streams.append({
+            'camera_id': camera_id,
+            'raw': SharedFrameRing.attach(raw_spec),
+            'annotated': SharedFrameRing.attach(annotated_spec),
+            'fps_value': fps_value,
+            'motion_gate': MotionGate(camera_id, motion_mask),
+            'last_seq': 0,
+            'frame_counter': 0,
+            'inferences': 0,
+            'frame_buffer': None,
+            'tracker': IoUTracker(),
+        })
+
+    scheduler = AdaptiveDetectionScheduler()
+    last_stats_time = time.time()
+    try:
+        while not stop_event.is_set():
+            now = time.time()
+            updated, candidates = [], []
+            for stream in streams:
+                seq, frame = stream['raw'].read_latest(stream['last_seq'])
+                if frame is None:
+                    continue
+                stream['last_seq'] = seq
+                stream['frame_counter'] += 1
+                if stream['frame_buffer'] is None:
+                    stream['frame_buffer'] = make_preroll_buffer(stream['fps_value'].value)
+                stream['frame_buffer'].append(frame, now)
+                updated.append((stream, frame, now))
+                camera_id = stream['camera_id']
+                if scheduler.is_due(camera_id, now) and (
+                        scheduler.is_active(camera_id) or stream['motion_gate'].should_detect(frame, now)):
+                    # Ring frames carry no capture time; the read time is a close lower bound
+                    candidates.append((camera_id, now, (stream, frame)))
+
+            if not updated:
+                time.sleep(0.005)
+                continue
+
+            batch = [payload for _, _, payload in scheduler.select(candidates)]
+            if batch:
+                frames = [frame for _, frame in batch]
+                results = []
+                start = time.time()
+                for i in range(0, len(frames), config.INFERENCE_MAX_BATCH):
+                    results.extend(model.predict(
+                        source=frames[i:i + config.INFERENCE_MAX_BATCH],
+                        verbose=False,
+                        conf=0.5,
+                        iou=0.4,
+                        classes=[config.PERSON_CLASS_ID, config.WEAPON_CLASS_ID]
+                    ))
+                elapsed = time.time() - start
+
+                detections = []
+                for (stream, frame), result in zip(batch, results):
+                    stream['inferences'] += 1
+                    object_count = len(result.boxes) if result.boxes is not None else 0
+                    stream['motion_gate'].note_detections(object_count)
+                    detections.append((stream['camera_id'], now, object_count > 0))
+                    due = update_tracks(stream['tracker'], result, now)
+                    score, box = keyframe_score(stream['tracker'], now, frame.shape)
+                    if score > 0:
+                        stream['frame_buffer'].annotate(now, score, box)
+                    for track in due:
+                        track.last_alert_time = now
+                        print(f"🚨 WEAPON THREAT DETECTED on {stream['camera_id']}! Armed person track #{track.track_id}! Saving clip in detection process...")
+                        # Alert first, the clip follows as its own event once it is written
+                        ok, snapshot = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
+                        if ok:
+                            events.put(('violation', stream['camera_id'], (track.track_id, int(now)), snapshot.tobytes(),
+                                        stream['fps_value'].value, track.confidence,
+                                        track_detections(stream['tracker'], now), now))
+                        threading.Thread(
+                            target=_save_clip_and_report,
+                            args=(events, stream['camera_id'], stream['frame_buffer'].snapshot(), frame.copy(),
+                                  int(now), stream['fps_value'].value, track.track_id),
+                            daemon=True
+                        ).start()
+                scheduler.record(detections, elapsed)
+
+            for stream, frame, captured in updated:
+                annotated = draw_tracks(frame.copy(), stream['tracker'], captured)
+                status_text = f"{stream['camera_id']} | Process Pipeline | Frame: {stream['frame_counter']}"
+                cv2.putText(annotated, status_text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+                stream['annotated'].write(annotated)
+
+            if time.time() - last_stats_time >= 1.0:
+                last_stats_time = time.time()
+                for stream in streams:
+                    events.put(('stats', stream['camera_id'], {
+                        'frames_processed': stream['frame_counter'],
+                        'inferences': stream['inferences'],
+                        'tracks': len(stream['tracker'].tracks),
+                        'inferences_saved': stream['motion_gate'].stats['inferences_saved'],
+                    }))
+    finally:
+        for stream in streams:
+            stream['raw'].close()
+            stream['annotated'].close()
+
+def encoder_worker(cameras, stop_event):
+    """JPEG-encode every new annotated frame once into each camera's jpeg ring.
+
+    cameras: list of (camera_id, annotated_spec, jpeg_spec).
+    """
+    streams = [(SharedFrameRing.attach(annotated), SharedFrameRing.attach(jpeg), [0])
+               for _, annotated, jpeg in cameras]
+    try:
+        while not stop_event.is_set():
+            encoded_any = False
+            for annotated, jpeg, last_seq in streams:
+                seq, frame = annotated.read_latest(last_seq[0])
+                if frame is None:
+                    continue
+                last_seq[0] = seq
+                ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
+                if ok and buffer.size <= jpeg.shape[0]:
+                    jpeg.write(buffer)
+                encoded_any = True
+            if not encoded_any:
+                time.sleep(0.005)
+    finally:
+        for annotated, jpeg, _ in streams:
+            annotated.close()
+            jpeg.close()
+
+# --- Flask-side Supervisor ---
+
+def _pump_jpeg_ring(camera, stop_event):
+    """Forward JPEGs from the encoder process into the camera's broadcaster without re-encoding."""
+    last_seq = 0
+    while not stop_event.is_set() and camera.jpeg_ring is not None:
+        seq, buffer = camera.jpeg_ring.read_latest(last_seq)
+        if buffer is None:
+            time.sleep(0.005)
+            continue
+        last_seq = seq
+        camera.broadcaster.publish_jpeg(buffer.tobytes())
+
+def run_process_pipeline():
+    """Start the capture/detection/encoder processes and relay their events into this process."""
+    import state
+    from violation_processor import process_violation_async
+
+    ctx = mp.get_context('spawn')
+    stop_event = ctx.Event()
+    events = ctx.Queue(maxsize=256)
+    rings, processes = [], []
+    pending_clips = {} # (camera_id, (track_id, timestamp)) -> ViolationJob waiting for its clip
+    detection_args, encoder_args = [], []
+    prefix = f"seccam{os.getpid()}"
+
+    try:
+        for source in config.CAMERA_SOURCES:
+            camera = state.CameraState(source['camera_id'], source['src'])
+            camera.priority = source.get('priority', 0)
+            raw = SharedFrameRing(f"{prefix}_{camera.camera_id}_raw", config.PIPELINE_FRAME_SHAPE, create=True)
+            annotated = SharedFrameRing(f"{prefix}_{camera.camera_id}_ann", config.PIPELINE_FRAME_SHAPE, create=True)
+            jpeg = SharedFrameRing(f"{prefix}_{camera.camera_id}_jpg", (config.PIPELINE_JPEG_SLOT_BYTES,), create=True)
+            rings.extend([raw, annotated, jpeg])
+            camera.jpeg_ring = jpeg
+            state.cameras[camera.camera_id] = camera
+
+            fps_value = ctx.Value('d', 30.0)
+            processes.append(ctx.Process(
+                target=capture_worker,
+                args=(camera.camera_id, camera.src, raw.spec(), fps_value, stop_event),
+                name=f"capture-{camera.camera_id}", daemon=True
+            ))
+            detection_args.append((camera.camera_id, raw.spec(), annotated.spec(), fps_value, source.get('motion_mask')))
+            encoder_args.append((camera.camera_id, annotated.spec(), jpeg.spec()))
+
+        processes.append(ctx.Process(target=detection_worker, args=(detection_args, events, stop_event),
+                                     name="detection", daemon=True))
+        processes.append(ctx.Process(target=encoder_worker, args=(encoder_args, stop_event),
+                                     name="encoder", daemon=True))
+        for process in processes:
+            process.start()
+        for camera in state.cameras.values():
+            threading.Thread(target=_pump_jpeg_ring, args=(camera, stop_event),
+                             name=f"jpeg-pump-{camera.camera_id}", daemon=True).start()
+
+        print(f"🚀 Process pipeline started: {len(processes)} processes for {len(state.cameras)} camera(s)")
+        for camera in state.cameras.values():
+            camera.stats['current_status'] = 'monitoring'
+        state.violation_stats['current_status'] = 'monitoring'
+
+        while any(process.is_alive() for process in processes):
+            try:
+                message = events.get(timeout=0.5)
+            except Exception:
+                continue
+
+            kind, camera_id = message[0], message[1]
+            camera = state.cameras.get(camera_id)
+            if camera is None:
+                continue
+            if kind == 'stats':
+                camera.stats.update(message[2])
+            elif kind == 'violation':
+                _, _, key, snapshot, fps, confidence, detections, detected_at = message
+                frame = cv2.imdecode(np.frombuffer(snapshot, dtype=np.uint8), cv2.IMREAD_COLOR)
+                camera.fps = fps
+                pending_clips[(camera_id, key)] = process_violation_async(
+                    camera, frame, None, fps, track_id=key[0], confidence=confidence,
+                    detections=detections, detected_at=detected_at, clip_ready=threading.Event())
+            elif kind == 'clip':
+                _, _, key, clip_path, keyframes = message
+                job = pending_clips.pop((camera_id, key), None)
+                if job is not None:
+                    job.clip_path = clip_path
+                    job.keyframes = [(cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR), offset)
+                                     for jpeg, offset in keyframes]
+                    job.clip_ready.set()
+    except KeyboardInterrupt:
+        print("\n🛑 Process pipeline interrupted by user...")
+    except Exception as e:
+        print(f"❌ Unexpected error in process pipeline: {e}")
+    finally:
+        print("🛑 Stopping process pipeline...")
+        stop_event.set()
+        for process in processes:
+            process.join(timeout=2)
+            if process.is_alive():
+                process.terminate()
+        for camera in state.cameras.values():
+            camera.jpeg_ring = None
+            camera.broadcaster.stop()
+        for ring in rings:
+            ring.close()
+        print("✅ Process pipeline cleanup complete.")
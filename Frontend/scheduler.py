@@ -0,0 +1,91 @@
+import time
+
+import config
+
+class AdaptiveDetectionScheduler:
+    """Decides which cameras get a detection pass, based on measured latency instead of a fixed skip count.
+
+    Every camera has a minimum interval between detections. Cameras with people or weapons
+    in view ignore it and run at full rate; for the rest the interval grows while the
+    smoothed capture-to-result latency is above DETECTION_TARGET_LATENCY_MS and shrinks
+    again once there is headroom. The batch size of each pass is capped so that the
+    predicted predict() time of the batch fits the same latency target.
+    """
+    def __init__(self):
+        self.target = config.DETECTION_TARGET_LATENCY_MS / 1000.0
+        self.interval = config.DETECTION_START_INTERVAL_SECONDS
+        self.per_frame_latency = None
+        self.end_to_end_latency = None
+        self.cameras = {}
+        self.stats = {
+            'idle_interval_ms': round(self.interval * 1000, 1),
+            'per_frame_latency_ms': None,
+            'end_to_end_latency_ms': None,
+            'max_batch': config.INFERENCE_MAX_BATCH,
+            'active_cameras': 0,
+            'deferred': 0
+        }
+
+    def _camera(self, camera_id):
+        if camera_id not in self.cameras:
+            self.cameras[camera_id] = {'last_detection': 0.0, 'active': False}
+        return self.cameras[camera_id]
+
+    def is_active(self, camera_id):
+        """True while the last detection on this camera found people or weapons."""
+        return self._camera(camera_id)['active']
+
+    def is_due(self, camera_id, now=None):
+        if now is None:
+            now = time.time()
+        camera = self._camera(camera_id)
+        return camera['active'] or (now - camera['last_detection']) >= self.interval
+
+    def max_batch(self):
+        """Largest batch whose predicted predict() time still fits the latency target."""
+        if not self.per_frame_latency:
+            return config.INFERENCE_MAX_BATCH
+        return max(1, int(self.target / self.per_frame_latency))
+
+    def select(self, candidates):
+        """Pick the cameras to detect now from (camera_id, capture_time, payload) candidates.
+
+        Active cameras go first, then the ones waiting longest. Returns the chosen candidates.
+        """
+        candidates = sorted(candidates, key=lambda c: (not self.is_active(c[0]), self._camera(c[0])['last_detection']))
+        limit = self.max_batch()
+        self.stats['max_batch'] = limit
+        self.stats['deferred'] += max(0, len(candidates) - limit)
+        return candidates[:limit]
+
+    def record(self, detections, predict_seconds, now=None):
+        """Feed back one batch: detections is a list of (camera_id, capture_time, objects_in_view)."""
+        if not detections:
+            return
+        if now is None:
+            now = time.time()
+
+        per_frame = predict_seconds / len(detections)
+        end_to_end = max(now - capture_time for _, capture_time, _ in detections)
+        alpha = config.DETECTION_LATENCY_SMOOTHING
+        if self.per_frame_latency is None:
+            self.per_frame_latency, self.end_to_end_latency = per_frame, end_to_end
+        else:
+            self.per_frame_latency += alpha * (per_frame - self.per_frame_latency)
+            self.end_to_end_latency += alpha * (end_to_end - self.end_to_end_latency)
+
+        for camera_id, _, objects_in_view in detections:
+            camera = self._camera(camera_id)
+            camera['last_detection'] = now
+            camera['active'] = objects_in_view
+
+        if self.end_to_end_latency > self.target:
+            self.interval = min(config.DETECTION_MAX_INTERVAL_SECONDS,
+                                max(self.interval * 1.25, self.per_frame_latency))
+        elif self.end_to_end_latency < self.target * 0.5:
+            self.interval = max(config.DETECTION_MIN_INTERVAL_SECONDS, self.interval * 0.8)
+
+        self.stats['idle_interval_ms'] = round(self.interval * 1000, 1)
+        self.stats['per_frame_latency_ms'] = round(self.per_frame_latency * 1000, 1)
+        self.stats['end_to_end_latency_ms'] = round(self.end_to_end_latency * 1000, 1)
+        self.stats['active_cameras'] = sum(1 for c in self.cameras.values() if c['active'])
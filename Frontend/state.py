@@ -1,10 +1,49 @@
 import threading
 from collections import deque
 
-# --- Shared Frame ---
-current_frame = None
-current_frame_lock = threading.Lock()
-last_results = None # To store last YOLO results for drawing
+from streaming import FrameBroadcaster
+
+class CameraState:
+    """Per-camera runtime state: stream handle, pre-roll buffer, tracker and stats."""
+    def __init__(self, camera_id, src):
+        self.camera_id = camera_id
+        self.src = src
+        self.priority = 0 # Higher-priority cameras are served first by the violation queues
+        self.vs = None # VideoStream instance
+        self.fps = 30.0
+        self.frame_buffer = None # PrerollBuffer (or RawPrerollBuffer), see preroll.py
+        self.motion_gate = None # MotionGate deciding which frames reach YOLO
+
+        # --- Shared Frame ---
+        self.current_frame = None
+        self.current_frame_lock = threading.Lock()
+        self.tracker = None # IoUTracker carrying person/weapon boxes across frames
+        self.jpeg_ring = None # SharedFrameRing of encoded frames in process pipeline mode
+        self.broadcaster = FrameBroadcaster(camera_id) # Encode-once MJPEG fan-out for /video_feed
+
+        # --- Timers ---
+        self.last_frame_seq = -1
+        self.frame_counter = 0
+        self.violations_in_progress = 0
+
+        self.stats = {
+            'camera_id': camera_id,
+            'total_violations': 0,
+            'last_violation_time': None,
+            'frames_processed': 0,
+            'inferences': 0,
+            'tracks': 0,
+            'current_status': 'initializing'
+        }
+
+# --- Camera Registry ---
+cameras = {} # camera_id -> CameraState, in config order
+
+def get_camera(camera_id=None):
+    """Return the named camera, or the first registered one when no id is given."""
+    if camera_id is None:
+        return next(iter(cameras.values()), None)
+    return cameras.get(camera_id)
 
 # --- Violation State ---
 latest_violations = deque(maxlen=10)  # Store last 10 violations
@@ -16,13 +55,19 @@ violation_stats = {
 violation_history = deque(maxlen=20)
 total_violations = 0
 
+# --- Inference Scheduler Stats ---
+inference_stats = {
+    'batches': 0,
+    'frames': 0,
+    'last_batch_size': 0,
+    'last_batch_ms': 0.0,
+    'frames_per_second': 0.0
+}
+
+detection_scheduler = None # AdaptiveDetectionScheduler of the running detection loop
+
 # --- Timers and Locks ---
-last_alert_time = 0
-last_violation_time = 0
-frame_counter = 0
-violation_processing = False
 violation_lock = threading.Lock()
 
 # --- Component Handles ---
-vs = None # VideoStream instance
-yolo_model = None # YOLO model instance
\ No newline at end of file
+yolo_model = None # YOLO model instance, shared by all cameras
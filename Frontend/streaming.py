@@ -0,0 +1,85 @@
+import cv2
+import threading
+
+import config
+
+STOPPED = object() # Returned by wait_for_frame() once the broadcaster has been stopped
+
+class FrameBroadcaster:
+    """JPEG-encodes each new annotated frame exactly once and fans it out to every /video_feed viewer.
+
+    Producers call submit() with the latest annotated frame (or publish_jpeg() with bytes
+    that are already encoded). A single encoder thread turns the newest submitted frame into
+    a JPEG tagged with a sequence number, and viewers block in wait_for_frame() until a
+    sequence newer than the one they last sent exists. Nothing is encoded while nobody watches.
+    """
+    def __init__(self, name, quality=config.STREAM_JPEG_QUALITY):
+        self.name = name
+        self.quality = quality
+        self.condition = threading.Condition()
+        self.seq = 0
+        self.jpeg = None
+        self.stats = {
+            'viewers': 0,
+            'frames_submitted': 0,
+            'frames_encoded': 0
+        }
+
+        self._pending = None
+        self._pending_lock = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._encode_loop, name=f"broadcaster-{name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, frame):
+        """Hand over a finished annotated frame. The caller must not modify it afterwards."""
+        with self._pending_lock:
+            self._pending = frame
+            self.stats['frames_submitted'] += 1
+            self._pending_lock.notify()
+
+    def publish_jpeg(self, jpeg_bytes):
+        """Publish an already encoded frame to all viewers."""
+        with self.condition:
+            self.seq += 1
+            self.jpeg = jpeg_bytes
+            self.condition.notify_all()
+
+    def wait_for_frame(self, last_seq, timeout=1.0):
+        """Block until a frame newer than last_seq exists; returns (seq, jpeg bytes), (last_seq, None)
+        on timeout or (last_seq, STOPPED) once stop() was called."""
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.seq != last_seq or self._stopped, timeout=timeout):
+                return last_seq, None
+            if self.seq == last_seq:
+                return last_seq, STOPPED
+            return self.seq, self.jpeg
+
+    def add_viewer(self):
+        with self.condition:
+            self.stats['viewers'] += 1
+
+    def remove_viewer(self):
+        with self.condition:
+            self.stats['viewers'] -= 1
+
+    def stop(self):
+        self._stopped = True
+        with self._pending_lock:
+            self._pending_lock.notify()
+        with self.condition:
+            self.condition.notify_all()
+
+    def _encode_loop(self):
+        while not self._stopped:
+            with self._pending_lock:
+                self._pending_lock.wait_for(lambda: self._pending is not None or self._stopped)
+                frame, self._pending = self._pending, None
+            if frame is None or self.stats['viewers'] <= 0:
+                continue
+
+            ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+            if not ok:
+                continue
+            self.stats['frames_encoded'] += 1
+            self.publish_jpeg(buffer.tobytes())
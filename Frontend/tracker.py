@@ -0,0 +1,178 @@
+import cv2
+import itertools
+import numpy as np
+
+import config
+from association import box_overlap
+
+class KalmanBoxFilter:
+    """Constant-velocity Kalman filter over a box centre and size: (cx, cy, w, h, vx, vy)."""
+    H = np.hstack([np.eye(4), np.zeros((4, 2))])
+    R = np.diag([10.0, 10.0, 20.0, 20.0])
+
+    def __init__(self, box, now):
+        x1, y1, x2, y2 = box
+        self.x = np.array([(x1 + x2) / 2, (y1 + y2) / 2, x2 - x1, y2 - y1, 0.0, 0.0])
+        self.P = np.diag([10.0, 10.0, 10.0, 10.0, 1000.0, 1000.0])
+        self.time = now
+
+    @staticmethod
+    def _transition(dt):
+        F = np.eye(6)
+        F[0, 4] = dt
+        F[1, 5] = dt
+        return F
+
+    def predict(self, now):
+        dt = max(0.0, now - self.time)
+        F = self._transition(dt)
+        Q = np.diag([1.0, 1.0, 1.0, 1.0, 500.0, 500.0]) * max(dt, 1e-3)
+        self.x = F @ self.x
+        self.P = F @ self.P @ F.T + Q
+        self.time = now
+
+    def update(self, box):
+        x1, y1, x2, y2 = box
+        z = np.array([(x1 + x2) / 2, (y1 + y2) / 2, x2 - x1, y2 - y1])
+        S = self.H @ self.P @ self.H.T + self.R
+        K = self.P @ self.H.T @ np.linalg.inv(S)
+        self.x = self.x + K @ (z - self.H @ self.x)
+        self.P = (np.eye(6) - K @ self.H) @ self.P
+
+    def box_at(self, now):
+        """Predicted xyxy box at time now, without changing the filter state."""
+        cx, cy, w, h = (self._transition(max(0.0, now - self.time)) @ self.x)[:4]
+        return np.array([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2])
+
+class Track:
+    def __init__(self, track_id, class_id, box, confidence, now):
+        self.track_id = track_id
+        self.class_id = class_id
+        self.confidence = confidence
+        self.filter = KalmanBoxFilter(box, now)
+        self.first_seen = now
+        self.last_seen = now
+        self.hits = 1
+        self.armed_hits = 0
+        self.last_alert_time = None
+
+    @property
+    def armed(self):
+        return self.armed_hits >= config.TRACK_CONFIRM_HITS
+
+class IoUTracker:
+    """Greedy IoU tracker with a Kalman motion model, one per camera.
+
+    Detections are matched per class against the tracks' predicted boxes, so IDs stay
+    stable across frames the scheduler skipped. Person tracks remember whether they were
+    seen with a weapon, which lets the detection loop raise exactly one violation per
+    armed person instead of throttling the whole camera.
+    """
+    def __init__(self):
+        self.tracks = {}
+        self._ids = itertools.count(1)
+
+    def update(self, boxes, class_ids, confidences, now):
+        """Match one frame of detections; returns the track id assigned to each detection."""
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        class_ids = np.asarray(class_ids).reshape(-1)
+        confidences = np.asarray(confidences).reshape(-1)
+        assigned = [None] * len(boxes)
+
+        for track in self.tracks.values():
+            track.filter.predict(now)
+
+        for class_id in np.unique(class_ids):
+            det_idx = np.flatnonzero(class_ids == class_id)
+            tracks = [t for t in self.tracks.values() if t.class_id == class_id]
+            if tracks:
+                predicted = np.array([t.filter.box_at(now) for t in tracks])
+                _, ious = box_overlap(predicted, boxes[det_idx])
+                for flat in np.argsort(-ious, axis=None):
+                    ti, di = np.unravel_index(flat, ious.shape)
+                    if ious[ti, di] < config.TRACK_IOU_THRESHOLD:
+                        break
+                    if tracks[ti] is None or assigned[det_idx[di]] is not None:
+                        continue
+                    track = tracks[ti]
+                    track.filter.update(boxes[det_idx[di]])
+                    track.confidence = float(confidences[det_idx[di]])
+                    track.last_seen = now
+                    track.hits += 1
+                    assigned[det_idx[di]] = track.track_id
+                    tracks[ti] = None
+
+            for di in det_idx:
+                if assigned[di] is None:
+                    track = Track(next(self._ids), int(class_id), boxes[di], float(confidences[di]), now)
+                    self.tracks[track.track_id] = track
+                    assigned[di] = track.track_id
+
+        for track_id in [tid for tid, t in self.tracks.items() if now - t.last_seen > config.TRACK_MAX_AGE_SECONDS]:
+            del self.tracks[track_id]
+        return assigned
+
+    def mark_armed(self, track_id, armed):
+        track = self.tracks.get(track_id)
+        if track is not None:
+            track.armed_hits = track.armed_hits + 1 if armed else 0
+
+    def tracks_to_alert(self, now):
+        """Armed person tracks that have not alerted yet, or not for TRACK_REALERT_SECONDS."""
+        due = []
+        for track in self.tracks.values():
+            if track.class_id != config.PERSON_CLASS_ID or not track.armed:
+                continue
+            if track.last_alert_time is None or (now - track.last_alert_time) >= config.TRACK_REALERT_SECONDS:
+                due.append(track)
+        return due
+
+    def visible_tracks(self, now):
+        """(track, predicted box) for tracks seen recently enough to draw."""
+        return [(t, t.filter.box_at(now)) for t in self.tracks.values()
+                if now - t.last_seen <= config.TRACK_DRAW_SECONDS]
+
+def track_detections(tracker, now):
+    """JSON-friendly boxes of the visible tracks, sent along with the first alert."""
+    detections = []
+    for track, box in tracker.visible_tracks(now):
+        detections.append({
+            'track_id': track.track_id,
+            'class': 'weapon' if track.class_id == config.WEAPON_CLASS_ID else 'person',
+            'armed': track.armed,
+            'confidence': round(track.confidence, 3),
+            'box': [round(float(v), 1) for v in box]
+        })
+    return detections
+
+def keyframe_score(tracker, now, frame_shape):
+    """Score of the frame detected at now for VLM keyframe selection, and the box to crop (or None).
+
+    Person tracks matched in this frame score confidence x sqrt(box area / frame area),
+    weighted up when the person is seen with a weapon; the best one wins.
+    """
+    frame_area = float(frame_shape[0] * frame_shape[1])
+    best_score, best_box = 0.0, None
+    for track, box in tracker.visible_tracks(now):
+        if track.last_seen != now or track.class_id != config.PERSON_CLASS_ID:
+            continue
+        area = max(0.0, float(box[2] - box[0])) * max(0.0, float(box[3] - box[1]))
+        score = track.confidence * np.sqrt(area / frame_area) * (1.0 if track.armed_hits > 0 else 0.2)
+        if score > best_score:
+            best_score, best_box = score, box
+    return best_score, best_box
+
+def draw_tracks(frame, tracker, now):
+    """Draw predicted track boxes with their IDs; armed people in red."""
+    for track, box in tracker.visible_tracks(now):
+        x1, y1, x2, y2 = [int(v) for v in box]
+        if track.class_id == config.WEAPON_CLASS_ID:
+            color, label = (0, 165, 255), f"weapon #{track.track_id}"
+        elif track.armed:
+            color, label = (0, 0, 255), f"ARMED #{track.track_id}"
+        else:
+            color, label = (0, 255, 0), f"person #{track.track_id}"
+        cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+        cv2.putText(frame, f"{label} {track.confidence:.2f}", (x1, max(15, y1 - 6)),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+    return frame
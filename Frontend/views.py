@@ -1,8 +1,9 @@
 from flask import render_template, Response, jsonify
-import cv2
-import time
 from core import app
 import state
+from streaming import STOPPED
+from violation_processor import violation_queue_stats
+from vlm import vlm_manager
 
 @app.route('/')
 def index():
@@ -13,27 +14,47 @@ def get_violations():
     """API endpoint to get recent violations"""
     return jsonify({
         'violations': list(state.latest_violations),
-        'stats': state.violation_stats
+        'stats': state.violation_stats,
+        'cameras': {
+            camera_id: {
+                **camera.stats,
+                'stream': camera.broadcaster.stats,
+                'motion': camera.motion_gate.stats if camera.motion_gate is not None else None,
+                'preroll': camera.frame_buffer.stats() if camera.frame_buffer is not None else None
+            }
+            for camera_id, camera in state.cameras.items()
+        },
+        'inference': state.inference_stats,
+        'scheduler': state.detection_scheduler.stats if state.detection_scheduler is not None else None,
+        'violation_queue': violation_queue_stats(),
+        'vlm': vlm_manager.stats
     })
 
-def generate_frames():
-    """Generate video frames for streaming"""
-    while True:
-        if state.current_frame is not None:
-            with state.current_frame_lock:
-                frame = state.current_frame.copy()
-            
-            # Encode frame as JPEG
-            _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
-            frame_bytes = buffer.tobytes()
-            
+def generate_frames(camera):
+    """Generate video frames for streaming from the camera's encode-once broadcaster"""
+    broadcaster = camera.broadcaster
+    broadcaster.add_viewer()
+    last_seq = 0
+    try:
+        while True:
+            seq, frame_bytes = broadcaster.wait_for_frame(last_seq)
+            if frame_bytes is STOPPED:
+                return  # The producer is gone; end the stream instead of spinning
+            if frame_bytes is None:
+                continue
+            last_seq = seq
+
             yield (b'--frame\r\n'
                    b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-        else:
-            time.sleep(0.1)
+    finally:
+        broadcaster.remove_viewer()
 
 @app.route('/video_feed')
-def video_feed():
-    """Video streaming route"""
-    return Response(generate_frames(),
+@app.route('/video_feed/<camera_id>')
+def video_feed(camera_id=None):
+    """Video streaming route, defaults to the first configured camera"""
+    camera = state.get_camera(camera_id)
+    if camera is None:
+        return jsonify({'error': f'Unknown camera: {camera_id}'}), 404
+    return Response(generate_frames(camera),
                     mimetype='multipart/x-mixed-replace; boundary=frame')
\ No newline at end of file
@@ -1,49 +1,33 @@
 import cv2
-import threading
-import requests
+import json
 import time
-import os
 import state
 import config
 from vlm import vlm_manager
-from events import emit_violation_alert, emit_status_update
+from clip_writer import save_violation_clip
+from violation_queue import ViolationJob, StageQueue
+from outbox import AlertOutbox
+from events import emit_violation_alert, emit_violation_update, emit_summary_progress, emit_status_update
 
-def generate_summary_from_clip(clip_path):
-    """Extract keyframes from clip and generate intelligent, unique summary using SmolVLM2."""
+def _fallback_summary():
+    timestamp = int(time.time())
+    fallback_options = [
+        f"Security alert: Armed individual detected at location {timestamp % 10 + 1} - immediate response required",
+        f"Critical threat: Person carrying weapon identified - incident #{timestamp % 100}",
+        f"Weapon detection: Armed subject confirmed - alert {timestamp} requires urgent attention",
+        f"Security breach: Individual with weapon detected - priority security response needed"
+    ]
+    return fallback_options[timestamp % len(fallback_options)]
+
+def generate_summary_from_keyframes(keyframes, frame_timestamps, on_progress=None, deadline=None, outcome=None):
+    """Generate intelligent, unique summary of a violation's keyframes using SmolVLM2.
+
+    on_progress(keyframe_index, partial_caption) is called while the captions are generated.
+    Captions still unfinished at deadline (a time.time() value) become basic descriptions.
+    outcome, if given, collects the caption counters of vlm_manager.generate_captions().
+    """
     print("🤖 Starting weapon detection analysis with SmolVLM2...")
     try:
-        cap = cv2.VideoCapture(clip_path)
-        if not cap.isOpened():
-            return "Error: Could not open saved video clip."
-        
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        if total_frames == 0:
-            cap.release()
-            return "Error: Video clip has no frames."
-        
-        frames_to_extract = []
-        if total_frames > 10:
-            frames_to_extract = [
-                int(total_frames * 0.1),
-                int(total_frames * 0.4),
-                int(total_frames * 0.7),
-                int(total_frames * 0.9)
-            ]
-        else:
-            frames_to_extract = [int(total_frames * p) for p in [0.3, 0.7]]
-        
-        keyframes = []
-        frame_timestamps = []
-        for idx in frames_to_extract:
-            cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
-            ret, frame = cap.read()
-            if ret:
-                keyframes.append(frame)
-                fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
-                timestamp = idx / fps
-                frame_timestamps.append(timestamp)
-        cap.release()
-
         if not keyframes:
             return "Security violation detected, but could not extract frames for analysis."
 
@@ -62,12 +46,15 @@ def generate_summary_from_clip(clip_path):
             "What specific security threats or weapons do you see in this image?"
         ]
         
-        for i, (frame, timestamp) in enumerate(zip(keyframes, frame_timestamps)):
-            print(f"   > Processing frame {i+1}/{len(keyframes)} at {timestamp:.1f}s...")
-            
-            prompt = prompts[min(i, len(prompts)-1)]
-            caption = vlm_manager.generate_caption(frame, prompt)
-            
+        if config.VLM_CAPTION_MODE == "multi_image":
+            items = [(frame, config.VLM_MULTI_IMAGE_PROMPT) for frame in keyframes]
+        else:
+            items = [(frame, prompts[min(i, len(prompts)-1)]) for i, frame in enumerate(keyframes)]
+        print(f"   > Captioning keyframes at {', '.join(f'{t:.1f}s' for t in frame_timestamps)} ({config.VLM_CAPTION_MODE})...")
+        captions = vlm_manager.generate_captions(items, mode=config.VLM_CAPTION_MODE, on_progress=on_progress,
+                                                 deadline=deadline, outcome=outcome)
+        
+        for caption in captions:
             if caption and len(caption.strip()) > 10:
                 caption_lower = caption.lower()
                 if any(word in caption_lower for word in ['weapon', 'gun', 'knife', 'armed', 'threat']):
@@ -127,255 +114,373 @@ def generate_summary_from_clip(clip_path):
 
     except Exception as e:
         print(f"❌ Error during SmolVLM2 analysis: {e}")
-        timestamp = int(time.time())
-        fallback_options = [
-            f"Security alert: Armed individual detected at location {timestamp % 10 + 1} - immediate response required",
-            f"Critical threat: Person carrying weapon identified - incident #{timestamp % 100}",
-            f"Weapon detection: Armed subject confirmed - alert {timestamp} requires urgent attention",
-            f"Security breach: Individual with weapon detected - priority security response needed"
-        ]
-        return fallback_options[timestamp % len(fallback_options)]
-    finally:
-        vlm_manager.clear_cache()
-        print("   > Cleared GPU cache.")
-
-def send_alert_to_django_async(frame, violation_type, clip_path, summary):
-    def send_alert():
-        current_time = time.time()
+        return _fallback_summary()
+
+def generate_summary_from_clip(clip_path, on_progress=None, deadline=None, outcome=None):
+    """Fallback when no in-memory keyframes are available: seek keyframes in the saved clip and summarize them."""
+    try:
+        cap = cv2.VideoCapture(clip_path)
+        if not cap.isOpened():
+            return "Error: Could not open saved video clip."
         
-        if (current_time - state.last_alert_time) < config.ALERT_COOLDOWN_SECONDS:
-            print("⏳ Alert cooldown active. Skipping send.")
-            return
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        if total_frames == 0:
+            cap.release()
+            return "Error: Video clip has no frames."
         
-        try:
-            ok, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
-            if not ok: 
-                print("❌ Failed to encode frame as JPEG")
-                return
-            
-            payload = {
-                'violation_type': violation_type, 
-                'camera_id': 'CAM-01', 
-                'summary': summary
-            }
-            
-            if not os.path.exists(clip_path):
-                print(f"❌ Clip file not found: {clip_path}")
-                return
-            
-            with open(clip_path, "rb") as clip_file:
-                files = {
-                    'snapshot': ('snapshot.jpg', buffer.tobytes(), 'image/jpeg'),
-                    'clip': (os.path.basename(clip_path), clip_file, 'video/mp4')
-                }
-                print(f"🚀 Sending alert to Django: {summary}")
-                response = requests.post(config.DJANGO_API_URL, data=payload, files=files, timeout=30)
-                if response.status_code == 201:
-                    print("✅ Alert sent successfully!")
-                    state.last_alert_time = current_time
-                else:
-                    print(f"❌ Django error: {response.status_code} - {response.text[:100]}")
-        except requests.exceptions.RequestException as e:
-            print(f"❌ Network error sending alert: {e}")
-        except Exception as e:
-            print(f"❌ Unknown error in send_alert: {e}")
+        frames_to_extract = []
+        if total_frames > 10:
+            frames_to_extract = [
+                int(total_frames * 0.1),
+                int(total_frames * 0.4),
+                int(total_frames * 0.7),
+                int(total_frames * 0.9)
+            ]
+        else:
+            frames_to_extract = [int(total_frames * p) for p in [0.3, 0.7]]
+        
+        keyframes = []
+        frame_timestamps = []
+        for idx in frames_to_extract:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
+            ret, frame = cap.read()
+            if ret:
+                keyframes.append(frame)
+                fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+                timestamp = idx / fps
+                frame_timestamps.append(timestamp)
+        cap.release()
+
+        return generate_summary_from_keyframes(keyframes, frame_timestamps, on_progress, deadline, outcome)
+    except Exception as e:
+        print(f"❌ Error reading keyframes from clip: {e}")
+        return _fallback_summary()
+
+# --- Django Alerts ---
+# Alerts reach Django through the persistent outbox (see outbox.py), keyed by the job's
+# idempotency key; the update of the second phase is delivered after the create.
+
+outbox = None  # AlertOutbox, opened by start()
+
+def queue_alert_create(job, violation_type="WEAPON_DETECTED"):
+    """Persist the first-phase Django alert (snapshot + detection boxes) in the outbox."""
+    ok, buffer = cv2.imencode(".jpg", job.frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
+    if not ok: 
+        print("❌ Failed to encode frame as JPEG")
+        return False
     
-    threading.Thread(target=send_alert, daemon=True).start()
+    payload = {
+        'violation_type': violation_type, 
+        'camera_id': job.camera.camera_id, 
+        'summary': job.summary,
+        'detections': json.dumps(job.detections)
+    }
+    outbox.enqueue_create(job.alert_key, buffer.tobytes(), payload, created_at=job.detected_at)
+    print(f"📮 Alert {job.alert_key} queued for Django: {job.summary}")
+    return True
 
-def save_violation_clip(frame_buffer, current_frame, timestamp, fps):
-    """Fixed version with better error handling and codec fallback"""
-    if not frame_buffer:
-        print("❌ Frame buffer is empty, cannot save clip.")
-        return None
+def queue_alert_update(job):
+    """Persist the second-phase update (VLM summary, chunked clip upload) of the job's alert in the outbox."""
+    outbox.enqueue_update(f"{job.alert_key}-update", job.alert_key, {'summary': job.summary},
+                          created_at=job.detected_at)
+    if job.clip_path:
+        outbox.enqueue_clip(f"{job.alert_key}-clip", job.alert_key, job.clip_path, created_at=job.detected_at)
+    print(f"📮 Alert {job.alert_key} enrichment queued for Django: {job.summary}")
+
+# --- Violation Work Queue ---
+# Alerting is two-phase. The alert stage emits violation_detected and queues the Django
+# Alert with the snapshot and detection boxes straight away; the clip and VLM summary
+# follow through the clip -> summary stages and update the same alert
+# (violation_updated on the dashboard, an outbox PATCH for Django).
+# Every stage is a bounded priority queue with a fixed worker pool. When the alert, clip
+# or summary stage is full, VIOLATION_QUEUE_FULL_POLICY decides: 'degrade' skips that
+# stage's expensive work (alert raised inline / no clip / basic caption) so the event
+# is still alerted, 'drop_lowest' drops the lowest-priority event.
+
+pipeline_stats = {
+    'submitted': 0,
+    'completed': 0,
+    'degraded': 0,
+    'dropped': 0,
+    'deadline_hits': 0,
+    'avg_first_alert_ms': 0.0,
+    'max_first_alert_ms': 0.0,
+    'avg_first_words_ms': 0.0,
+    'max_first_words_ms': 0.0,
+    'avg_latency_ms': 0.0,
+    'max_latency_ms': 0.0
+}
+
+def _record_latency(name, job):
+    """Time since detection for one milestone: first_alert (dashboard), first_words (first
+    streamed VLM text) or latency (done). Delivery to Django is timed by the outbox."""
+    latency_ms = (time.time() - job.detected_at) * 1000
+    with state.violation_lock:
+        avg_key, max_key = f'avg_{name}_ms', f'max_{name}_ms'
+        previous = pipeline_stats[avg_key]
+        pipeline_stats[avg_key] = round(latency_ms if previous == 0.0 else previous * 0.9 + latency_ms * 0.1, 1)
+        pipeline_stats[max_key] = round(max(pipeline_stats[max_key], latency_ms), 1)
+    return latency_ms
+
+def _mark_degraded(job):
+    if not job.degraded:
+        job.degraded = True
+        with state.violation_lock:
+            pipeline_stats['degraded'] += 1
+
+def _register_violation(job):
+    """Assign the violation id and update the counters shown on the dashboard."""
+    camera = job.camera
+    job.timestamp = int(time.time())
+    with state.violation_lock:
+        state.total_violations += 1
+        job.violation_id = state.total_violations
     
-    if fps <= 0:
-        fps = 30.0
-        print(f"⚠️ Invalid FPS detected, using default: {fps}")
+    # Update violation stats
+    state.violation_stats['total_violations'] = job.violation_id
+    state.violation_stats['last_violation_time'] = time.strftime("%Y-%m-%d %H:%M:%S")
+    state.violation_stats['current_status'] = 'violation_detected'
+    camera.stats['total_violations'] += 1
+    camera.stats['last_violation_time'] = state.violation_stats['last_violation_time']
+    camera.stats['current_status'] = 'violation_detected'
+
+def _violation_data(job):
+    return {
+        'id': job.violation_id,
+        'timestamp': time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(job.timestamp)),
+        'summary': job.summary,
+        'type': 'WEAPON_DETECTED',
+        'severity': 'CRITICAL',
+        'camera_id': job.camera.camera_id,
+        'track_id': job.track_id,
+        'alert_key': job.alert_key,
+        'detections': job.detections,
+        'enriched': job.enriched
+    }
+
+def _emit_first_alert(job):
+    """Phase one: put the violation on the dashboard with a basic description and the detection boxes."""
+    _register_violation(job)
+    job.summary = vlm_manager._generate_basic_caption()
+    job.violation_data = _violation_data(job)
+    state.latest_violations.append(job.violation_data)
+    emit_violation_alert(job.violation_data)
+    latency_ms = _record_latency('first_alert', job)
+    print(f"🔔 Violation #{job.violation_id} on {job.camera.camera_id} (track #{job.track_id}) alerted {latency_ms:.0f} ms after detection")
+
+def _unique_summary(summary, violation_id):
+    """Ensure summary uniqueness against recent history."""
+    similarity_threshold = 0.6
+    max_attempts = 3
+    attempts = 0
     
-    try:
-        h, w, _ = current_frame.shape
-        
-        codecs_to_try = [
-            ('MJPG', cv2.VideoWriter_fourcc(*'MJPG'), '.avi'),
-            ('XVID', cv2.VideoWriter_fourcc(*'XVID'), '.avi'),  
-            ('mp4v', cv2.VideoWriter_fourcc(*'mp4v'), '.mp4'),
-        ]
-        
-        out = None
-        clip_path = None
-        working_codec = None
+    while attempts < max_attempts:
+        is_unique = True
+        summary_words = set(summary.lower().split())
         
-        for codec_name, fourcc, extension in codecs_to_try:
-            try:
-                clip_path = os.path.join(config.SAVE_DIR, f"violation_{timestamp}{extension}")
-                print(f"   Trying codec: {codec_name} -> {clip_path}")
+        for prev_summary in state.violation_history:
+            prev_words = set(prev_summary.lower().split())
+            if len(summary_words) > 0 and len(prev_words) > 0:
+                overlap = len(summary_words.intersection(prev_words))
+                similarity = overlap / max(len(summary_words), len(prev_words))
                 
-                out = cv2.VideoWriter(clip_path, fourcc, fps, (w, h))
-                
-                if out.isOpened():
-                    working_codec = codec_name
-                    print(f"   ✅ Using codec: {codec_name}")
+                if similarity > similarity_threshold:
+                    is_unique = False
                     break
-                else:
-                    out.release()
-                    out = None
-                    if os.path.exists(clip_path):
-                        os.remove(clip_path)
-                    
-            except Exception as e:
-                print(f"   ❌ Codec {codec_name} failed: {e}")
-                if out:
-                    out.release()
-                    out = None
-                if clip_path and os.path.exists(clip_path):
-                    os.remove(clip_path)
-                continue
         
-        if out is None or not out.isOpened():
-            print("❌ Error: All video codecs failed. Cannot save video.")
-            return None
+        if is_unique:
+            break
         
-        frames_written = 0
-        for frame in frame_buffer:
-            if frame is not None:
-                out.write(frame)
-                frames_written += 1
+        attempts += 1
+        print(f"   > Summary too similar to previous ones, generating alternative (attempt {attempts})")
         
-        if current_frame is not None:
-            out.write(current_frame)
-            frames_written += 1
+        alternative_summary = f"Violation #{violation_id}: Security threat detected at {time.strftime('%H:%M:%S')} - Armed individual identified - Incident requires immediate security response"
         
-        out.release()
-        
-        if os.path.exists(clip_path) and os.path.getsize(clip_path) > 0:
-            print(f"💾 Violation clip saved: {clip_path} (codec: {working_codec}, frames: {frames_written})")
-            return clip_path
-        else:
-            print(f"❌ Video file creation failed or file is empty: {clip_path}")
-            if os.path.exists(clip_path):
-                os.remove(clip_path)
-            return None
-            
-    except Exception as e:
-        print(f"❌ Failed to save video clip: {e}")
-        if out:
-            out.release()
-        if clip_path and os.path.exists(clip_path):
-            os.remove(clip_path)
-        return None
+        if attempts == max_attempts:
+            summary = alternative_summary
+    return summary
 
-def process_violation_async(frame, frame_buffer_copy, fps):
+def _publish_summary(job, summary, unique=True):
+    """Phase two on the dashboard: replace the basic description with the VLM summary."""
+    if unique:
+        summary = _unique_summary(summary, job.violation_id)
+    job.summary = summary
+    job.enriched = True
     
-    def process():
-        with state.violation_lock:
-            if state.violation_processing: 
-                print("⚠️ Violation already being processed, skipping...")
-                return
-            state.violation_processing = True
-        
-        try:
-            timestamp = int(time.time())
-            state.last_violation_time = timestamp
-            state.total_violations += 1
-            
-            # Update violation stats
-            state.violation_stats['total_violations'] = state.total_violations
-            state.violation_stats['last_violation_time'] = time.strftime("%Y-%m-%d %H:%M:%S")
-            state.violation_stats['current_status'] = 'violation_detected'
-            
-            print(f"🎥 Processing violation #{state.total_violations} with SmolVLM2...")
-            
-            # Emit real-time status to frontend
-            emit_status_update({
-                'status': 'processing_violation',
-                'message': f'Processing violation #{state.total_violations}...',
-                'stats': state.violation_stats
-            })
-            
-            clip_path = save_violation_clip(frame_buffer_copy, frame, timestamp, fps)
-            
-            if clip_path:
-                summary = generate_summary_from_clip(clip_path)
-                
-                # Ensure summary uniqueness
-                similarity_threshold = 0.6
-                max_attempts = 3
-                attempts = 0
-                
-                while attempts < max_attempts:
-                    is_unique = True
-                    summary_words = set(summary.lower().split())
-                    
-                    for prev_summary in state.violation_history:
-                        prev_words = set(prev_summary.lower().split())
-                        if len(summary_words) > 0 and len(prev_words) > 0:
-                            overlap = len(summary_words.intersection(prev_words))
-                            similarity = overlap / max(len(summary_words), len(prev_words))
-                            
-                            if similarity > similarity_threshold:
-                                is_unique = False
-                                break
-                    
-                    if is_unique:
-                        break
-                    
-                    attempts += 1
-                    print(f"   > Summary too similar to previous ones, generating alternative (attempt {attempts})")
-                    
-                    alternative_summary = f"Violation #{state.total_violations}: Security threat detected at {time.strftime('%H:%M:%S')} - Armed individual identified - Incident requires immediate security response"
-                    
-                    if attempts == max_attempts:
-                        summary = alternative_summary
-                
-                # Store summary in history
-                state.violation_history.append(summary)
-                
-                # Create violation data for frontend
-                violation_data = {
-                    'id': state.total_violations,
-                    'timestamp': time.strftime("%Y-%m-%d %H:%M:%S"),
-                    'summary': summary,
-                    'type': 'WEAPON_DETECTED',
-                    'severity': 'CRITICAL',
-                    'camera_id': 'CAM-01'
-                }
-                
-                # Add to latest violations
-                state.latest_violations.append(violation_data)
-                
-                # Send to Django
-                send_alert_to_django_async(frame, "WEAPON_DETECTED", clip_path, summary)
-                
-                # Emit violation alert to frontend
-                emit_violation_alert(violation_data)
-                
-                # Update status back to monitoring
-                state.violation_stats['current_status'] = 'monitoring'
-                emit_status_update({
-                    'status': 'monitoring',
-                    'message': 'Violation processed successfully',
-                    'stats': state.violation_stats
-                })
-                
-            else:
-                print("❌ Skipping alert because clip saving failed.")
-                state.violation_stats['current_status'] = 'monitoring'
-                emit_status_update({
-                    'status': 'error',
-                    'message': 'Failed to save violation clip',
-                    'stats': state.violation_stats
-                })
-                
-        except Exception as e:
-            print(f"❌ Violation processing failed: {e}")
-            state.violation_stats['current_status'] = 'error'
-            emit_status_update({
-                'status': 'error',
-                'message': f'Violation processing error: {str(e)}',
-                'stats': state.violation_stats
-            })
-        finally:
-            with state.violation_lock:
-                state.violation_processing = False
+    # Store summary in history
+    state.violation_history.append(summary)
+    
+    job.violation_data.update(summary=summary, enriched=True)
+    emit_violation_update(job.violation_data)
+
+def _back_to_monitoring(job):
+    state.violation_stats['current_status'] = 'monitoring'
+    job.camera.stats['current_status'] = 'monitoring'
+    emit_status_update({
+        'status': 'monitoring',
+        'message': 'Violation processed successfully',
+        'stats': state.violation_stats
+    })
+
+def _finish_job(job, dropped=False):
+    job.release_buffer()
+    with state.violation_lock:
+        job.camera.violations_in_progress -= 1
+        if dropped:
+            pipeline_stats['dropped'] += 1
+            return
+        pipeline_stats['completed'] += 1
+    _record_latency('latency', job)
+
+def _fail_job(job, error):
+    state.violation_stats['current_status'] = 'error'
+    job.camera.stats['current_status'] = 'error'
+    emit_status_update({
+        'status': 'error',
+        'message': f'Violation processing error: {str(error)}',
+        'stats': state.violation_stats
+    })
+    _finish_job(job)
+
+def _enqueue(stage, job, degrade):
+    """Queue a job on the alert, clip or summary stage, applying the overflow policy if it is full.
+    The alert stage always degrades: a confirmed event must still reach the dashboard and outbox."""
+    if config.VIOLATION_QUEUE_FULL_POLICY == 'drop_lowest' and stage is not alert_stage:
+        displaced = stage.put(job, evict_lowest=True)
+        if displaced is not None:
+            print(f"⚠️ Violation {stage.name} queue full, dropping lowest-priority event from {displaced.camera.camera_id}")
+            _finish_job(displaced, dropped=True)
+    elif stage.put(job) is not None:
+        print(f"⚠️ Violation {stage.name} queue full, degrading event from {job.camera.camera_id}")
+        _mark_degraded(job)
+        degrade(job)
+
+def _alert_stage(job):
+    _emit_first_alert(job)
+    queue_alert_create(job)
+    _enqueue(clip_stage, job, _degrade_clip)
+
+def _degrade_alert(job):
+    # Both the dashboard alert and the outbox insert are cheap enough to do inline
+    _alert_stage(job)
+
+def _clip_stage(job):
+    print(f"🎥 Processing violation #{job.violation_id} from {job.camera.camera_id} (track #{job.track_id}) with SmolVLM2...")
+    emit_status_update({
+        'status': 'processing_violation',
+        'message': f'Processing violation #{job.violation_id} on {job.camera.camera_id}...',
+        'stats': state.violation_stats
+    })
+    
+    if job.clip_ready is not None:
+        # Process pipeline: the detection process writes the clip and reports it separately
+        if not job.clip_ready.wait(config.VIOLATION_CLIP_WAIT_SECONDS):
+            print(f"⚠️ Clip for violation #{job.violation_id} did not arrive in time")
+    elif job.frame_buffer is not None:
+        # Keyframes come straight from the pinned pre-roll, ranked by detection score
+        job.keyframes = job.frame_buffer.keyframes(config.VLM_KEYFRAMES, crop=config.VLM_CROP_ARMED_PERSON)
+        if job.clip_path is None:
+            job.clip_path = save_violation_clip(job.frame_buffer, job.frame, job.timestamp, job.fps, job.camera.camera_id)
+    job.release_buffer()
+    
+    if not job.clip_path:
+        print("❌ Clip saving failed.")
+        if not job.keyframes:
+            print("   > No keyframes either, keeping the snapshot alert and basic description.")
+            _mark_degraded(job)
+            _degrade_summary(job)
+            return
+    _enqueue(summary_stage, job, _degrade_summary)
+
+def _degrade_clip(job):
+    job.release_buffer()
+    _degrade_summary(job)
+
+def _summary_progress(job):
+    """Callback streaming partial VLM captions of one violation to the dashboard."""
+    if not config.VLM_STREAM_PROGRESS:
+        return None
+    first_words = []
     
-    threading.Thread(target=process, daemon=True).start()
\ No newline at end of file
+    def report(keyframe, text):
+        if not first_words:
+            first_words.append(_record_latency('first_words', job))
+        emit_summary_progress({
+            'id': job.violation_id,
+            'camera_id': job.camera.camera_id,
+            'track_id': job.track_id,
+            'keyframe': keyframe,
+            'text': text
+        })
+    return report
+
+def _summary_stage(job):
+    # The budget runs from detection, so time spent queued or writing the clip counts against it
+    deadline = job.detected_at + config.VLM_SUMMARY_DEADLINE_SECONDS
+    on_progress = _summary_progress(job)
+    outcome = {}
+    if job.keyframes:
+        images, offsets = zip(*job.keyframes)
+        summary = generate_summary_from_keyframes(list(images), list(offsets), on_progress, deadline, outcome)
+    else:
+        summary = generate_summary_from_clip(job.clip_path, on_progress, deadline, outcome)
+    if outcome.get('deadline_cut'):
+        with state.violation_lock:
+            pipeline_stats['deadline_hits'] += 1
+        print(f"⏱️ Violation #{job.violation_id} hit the {config.VLM_SUMMARY_DEADLINE_SECONDS}s summary deadline")
+    # Cached captions mean the same scene was seen before, so a summary resembling an earlier
+    # one is expected; the uniqueness rewrite would throw the VLM description away
+    _publish_summary(job, summary, unique=not outcome.get('cached'))
+    _finish_enrichment(job)
+
+def _degrade_summary(job):
+    # Keep the basic description the dashboard already shows
+    _finish_enrichment(job)
+
+def _finish_enrichment(job):
+    _back_to_monitoring(job)
+    if job.clip_path or job.enriched:
+        queue_alert_update(job)
+    _finish_job(job)
+
+alert_stage = clip_stage = summary_stage = None  # StageQueues, started by start()
+
+def start():
+    """Open the outbox and start the stage workers; called once at app startup, before any violation.
+    Importing this module has no side effects, so tools can use its helpers without a running pipeline."""
+    global outbox, alert_stage, clip_stage, summary_stage
+    if outbox is not None:
+        return
+    outbox = AlertOutbox()
+    alert_stage = StageQueue('alert', _alert_stage, config.VIOLATION_ALERT_WORKERS, config.VIOLATION_QUEUE_SIZE, _fail_job)
+    clip_stage = StageQueue('clip', _clip_stage, config.VIOLATION_CLIP_WORKERS, config.VIOLATION_QUEUE_SIZE, _fail_job)
+    summary_stage = StageQueue('summary', _summary_stage, config.VIOLATION_SUMMARY_WORKERS, config.VIOLATION_QUEUE_SIZE, _fail_job)
+
+def violation_queue_stats():
+    stages = [stage for stage in (alert_stage, clip_stage, summary_stage) if stage is not None]
+    return {
+        **pipeline_stats,
+        'stages': {stage.name: stage.stats for stage in stages},
+        'outbox': outbox.queue_stats() if outbox is not None else None
+    }
+
+def process_violation_async(camera, frame, frame_buffer_copy, fps, clip_path=None, track_id=None, confidence=0.0,
+                            detections=None, detected_at=None, clip_ready=None):
+    """Queue one violation for the alert -> clip -> summary workers and return its job.
+
+    frame_buffer_copy is a pre-roll snapshot (see preroll.py); it is released once the clip is saved.
+    A clip_path means the clip was already written elsewhere; a clip_ready Event means it is
+    still being written elsewhere and clip_path will be set on the job when it is done.
+    detections are the track boxes sent with the first alert; detected_at is the capture
+    time of the frame, used to measure time-to-first-alert.
+    Deduplication happens per track before this is called, so concurrent incidents are all processed.
+    Priority is the camera's configured priority plus the detection confidence.
+    """
+    job = ViolationJob(camera, frame, frame_buffer_copy, fps, camera.priority + confidence,
+                       clip_path=clip_path, track_id=track_id, confidence=confidence,
+                       detections=detections, detected_at=detected_at, clip_ready=clip_ready)
+    with state.violation_lock:
+        camera.violations_in_progress += 1
+        pipeline_stats['submitted'] += 1
+    _enqueue(alert_stage, job, _degrade_alert)
+    return job
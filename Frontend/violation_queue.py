@@ -0,0 +1,118 @@
+import heapq
+import itertools
+import threading
+import time
+import uuid
+
+class ViolationJob:
+    """One confirmed weapon event on its way through the alert -> clip -> summary stages."""
+    def __init__(self, camera, frame, frame_buffer, fps, priority, clip_path=None, track_id=None, confidence=0.0,
+                 detections=None, detected_at=None, clip_ready=None):
+        self.camera = camera
+        self.frame = frame
+        self.frame_buffer = frame_buffer
+        self.fps = fps
+        self.priority = priority
+        self.clip_path = clip_path
+        self.track_id = track_id
+        self.confidence = confidence
+        self.detections = detections or []
+        self.clip_ready = clip_ready # threading.Event set once clip_path is filled in elsewhere
+
+        self.created_at = time.time()
+        self.detected_at = detected_at if detected_at is not None else self.created_at
+        self.enqueued_at = self.created_at
+        self.violation_id = None
+        self.alert_key = uuid.uuid4().hex # Idempotency key of the Django Alert
+        self.violation_data = None
+        self.timestamp = None
+        self.summary = None
+        self.keyframes = [] # (image, seconds into the pre-roll) picked for the VLM
+        self.enriched = False
+        self.degraded = False
+
+    def release_buffer(self):
+        """Unpin the pre-roll snapshot once the clip no longer needs it."""
+        if self.frame_buffer is not None:
+            self.frame_buffer.release()
+            self.frame_buffer = None
+
+class StageQueue:
+    """Bounded priority queue drained by a fixed pool of worker threads.
+
+    Higher job.priority is served first, FIFO among equals. put() never blocks unless
+    asked to; when the queue is full it hands back the displaced job (the new one, or
+    with evict_lowest the lowest-priority job overall) so the caller can apply its
+    overflow policy.
+    """
+    def __init__(self, name, handler, workers, maxsize, on_error=None):
+        self.name = name
+        self.handler = handler
+        self.maxsize = maxsize
+        self.on_error = on_error
+        self.heap = []
+        self.condition = threading.Condition()
+        self._order = itertools.count()
+        self.stats = {
+            'depth': 0,
+            'max_depth': 0,
+            'busy_workers': 0,
+            'workers': workers,
+            'queued': 0,
+            'processed': 0,
+            'overflowed': 0,
+            'failed': 0,
+            'avg_wait_ms': 0.0
+        }
+        for i in range(workers):
+            threading.Thread(target=self._worker, name=f"violation-{name}-{i}", daemon=True).start()
+
+    def _push(self, job):
+        job.enqueued_at = time.time()
+        heapq.heappush(self.heap, (-job.priority, next(self._order), job))
+        self.stats['queued'] += 1
+        self.stats['depth'] = len(self.heap)
+        self.stats['max_depth'] = max(self.stats['max_depth'], len(self.heap))
+        self.condition.notify_all()
+
+    def put(self, job, block=False, evict_lowest=False):
+        """Queue a job. Returns None, or the job that did not fit when the queue is full."""
+        with self.condition:
+            if block:
+                self.condition.wait_for(lambda: len(self.heap) < self.maxsize)
+            elif len(self.heap) >= self.maxsize:
+                self.stats['overflowed'] += 1
+                if not evict_lowest:
+                    return job
+                lowest = max(range(len(self.heap)), key=lambda i: self.heap[i][:2])
+                if self.heap[lowest][2].priority >= job.priority:
+                    return job
+                displaced = self.heap.pop(lowest)[2]
+                heapq.heapify(self.heap)
+                self._push(job)
+                return displaced
+            self._push(job)
+            return None
+
+    def _worker(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.heap)
+                _, _, job = heapq.heappop(self.heap)
+                self.stats['depth'] = len(self.heap)
+                self.stats['busy_workers'] += 1
+                wait_ms = (time.time() - job.enqueued_at) * 1000
+                self.stats['avg_wait_ms'] = round(self.stats['avg_wait_ms'] * 0.9 + wait_ms * 0.1, 1)
+                self.condition.notify_all()  # Wake producers blocked on a full queue
+
+            try:
+                self.handler(job)
+            except Exception as e:
+                self.stats['failed'] += 1
+                print(f"❌ Violation {self.name} stage failed: {e}")
+                if self.on_error:
+                    self.on_error(job, e)
+            finally:
+                with self.condition:
+                    self.stats['busy_workers'] -= 1
+                    self.stats['processed'] += 1
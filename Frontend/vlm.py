@@ -1,8 +1,13 @@
 import numpy as np
 import cv2
+import os
 from collections import deque
 import time
 import random
+import threading
+
+import config
+from caption_cache import CaptionCache, image_hash
 
 # Try to import optional dependencies
 try:
@@ -13,7 +18,7 @@ except ImportError:
     TORCH_AVAILABLE = False
 
 try:
-    from transformers import AutoProcessor, AutoModelForCausalLM
+    from transformers import AutoProcessor, AutoModelForCausalLM, StoppingCriteriaList
     from PIL import Image
     TRANSFORMERS_AVAILABLE = True
     print("✅ Transformers available - SmolVLM2 enabled")
@@ -22,6 +27,59 @@ except ImportError:
     print("   Falling back to basic violation descriptions...")
     TRANSFORMERS_AVAILABLE = False
 
+class CaptionStreamer:
+    """generate() streamer that reports every row's partial caption as on_progress(index, text).
+
+    Unlike transformers' TextIteratorStreamer it handles batched generation, and it runs
+    on the generating thread, so no extra thread is needed. row_ids maps batch rows to
+    the caller's item indexes; updates are throttled to one per min_interval.
+    """
+    def __init__(self, tokenizer, on_progress, row_ids, min_interval=config.VLM_STREAM_MIN_INTERVAL_SECONDS):
+        self.tokenizer = tokenizer
+        self.on_progress = on_progress
+        self.row_ids = list(row_ids)
+        self.min_interval = min_interval
+        self.tokens = [[] for _ in self.row_ids]
+        self.texts = [''] * len(self.row_ids)
+        self.prompt_seen = False
+        self.last_flush = 0.0
+    
+    def put(self, value):
+        if not self.prompt_seen:
+            # generate() first passes the prompt ids
+            self.prompt_seen = True
+            return
+        for row, ids in enumerate(value.reshape(len(self.row_ids), -1).tolist()):
+            self.tokens[row].extend(ids)
+        now = time.time()
+        if now - self.last_flush >= self.min_interval:
+            self.last_flush = now
+            self._flush()
+    
+    def end(self):
+        self._flush()
+    
+    def _flush(self):
+        for row, ids in enumerate(self.tokens):
+            text = self.tokenizer.decode(ids, skip_special_tokens=True).strip()
+            if text and text != self.texts[row]:
+                self.texts[row] = text
+                try:
+                    self.on_progress(self.row_ids[row], text)
+                except Exception as e:
+                    print(f"⚠️ Caption progress callback failed: {e}")
+
+class DeadlineCriteria:
+    """Stopping criterion that ends generate() for every row once a wall-clock deadline has passed."""
+    def __init__(self, deadline):
+        self.deadline = deadline
+        self.triggered = False
+    
+    def __call__(self, input_ids, scores, **kwargs):
+        if time.time() >= self.deadline:
+            self.triggered = True
+        return torch.full((input_ids.shape[0],), self.triggered, dtype=torch.bool, device=input_ids.device)
+
 class SmolVLM2Manager:
     _instance = None
     _initialized = False
@@ -39,27 +97,55 @@ class SmolVLM2Manager:
             self.enabled = TRANSFORMERS_AVAILABLE
             self.recent_captions = deque(maxlen=10)
             self.violation_counter = 0
+            self.load_lock = threading.Lock()
+            self.cpu_profile = config.VLM_CPU_PROFILE
+            self.caption_cache = CaptionCache() if config.VLM_CACHE_ENABLED else None
+            self.stats = {
+                'status': 'not_loaded' if self.enabled else 'disabled',
+                'model': None,
+                'device': self.device,
+                'cpu_profile': None,
+                'cpu_threads': None,
+                'load_seconds': None,
+                'warmup_seconds': None,
+                'captions': 0,
+                'generate_calls': 0,
+                'last_caption_ms': None,
+                'avg_caption_ms': None,
+                'deadline_hits': 0,
+                'deadline_fallback_captions': 0,
+                'caption_cache': self.caption_cache.stats if self.caption_cache is not None else None
+            }
             SmolVLM2Manager._initialized = True
     
     def load_models(self):
-        """Load models only when needed and if transformers is available."""
+        """Load models on first use (or from preload()) and if transformers is available."""
         if not self.enabled:
             print("⚠️ SmolVLM2 not available. Using fallback descriptions.")
             return False
+        
+        with self.load_lock:
+            if self.processor is not None and self.model is not None:
+                return True
+            if not self.enabled:
+                return False
             
-        if self.processor is None or self.model is None:
             print("🤖 Loading SmolVLM2 models...")
+            self.stats['status'] = 'loading'
+            start = time.time()
             try:
                 model_options = [
                     "HuggingFaceTB/SmolVLM-500M-Instruct",
                     "HuggingFaceTB/SmolVLM-1.7B-Instruct"
                 ]
                 
+                # The first processor that loads is kept, so each model is resolved only once
                 model_name = None
                 for model_option in model_options:
                     try:
                         print(f"   Trying model: {model_option}")
-                        test_processor = AutoProcessor.from_pretrained(model_option, trust_remote_code=True)
+                        self.processor = AutoProcessor.from_pretrained(model_option, trust_remote_code=True,
+                                                                       **self._processor_kwargs())
                         model_name = model_option
                         print(f"   ✅ Found working model: {model_name}")
                         break
@@ -70,10 +156,9 @@ class SmolVLM2Manager:
                 if model_name is None:
                     print("❌ No SmolVLM model found")
                     self.enabled = False
+                    self.stats['status'] = 'disabled'
                     return False
                 
-                self.processor = AutoProcessor.from_pretrained(model_name, trust_remote_code=True)
-                
                 if self.device == "cuda" and torch.cuda.is_available():
                     self.model = AutoModelForCausalLM.from_pretrained(
                         model_name,
@@ -82,42 +167,150 @@ class SmolVLM2Manager:
                         trust_remote_code=True
                     )
                 else:
-                    self.model = AutoModelForCausalLM.from_pretrained(
-                        model_name,
-                        torch_dtype=torch.float32,
-                        trust_remote_code=True
-                    ).to(self.device)
+                    self.model = self._load_cpu_model(model_name)
                 
                 self._model_name = model_name
-                print(f"✅ SmolVLM loaded successfully on {self.device}")
+                self.stats['model'] = model_name
+                self.stats['load_seconds'] = round(time.time() - start, 2)
+                self.stats['status'] = 'loaded'
+                print(f"✅ SmolVLM loaded successfully on {self.device} in {self.stats['load_seconds']}s")
             except Exception as e:
                 print(f"❌ Error loading SmolVLM2: {e}")
                 print("   Falling back to basic descriptions...")
+                self.processor = None
+                self.model = None
                 self.enabled = False
+                self.stats['status'] = 'failed'
                 return False
         return True
     
-    def generate_caption(self, image, prompt="Describe this security situation in detail, focusing on people and any weapons visible:"):
-        """Generate caption for a single image using SmolVLM."""
+    def _processor_kwargs(self):
+        """On CPU, cap the image size the processor feeds the vision encoder (VLM_CPU_IMAGE_LONGEST_EDGE)."""
+        if self.device == "cuda" or not config.VLM_CPU_IMAGE_LONGEST_EDGE:
+            return {}
+        # SmolVLM tiles images in 384 px patches; one tile and no splitting is the cheapest input
+        return {
+            'size': {'longest_edge': config.VLM_CPU_IMAGE_LONGEST_EDGE},
+            'do_image_splitting': False
+        }
+    
+    def _load_cpu_model(self, model_name):
+        """Load the model with the CPU profile (self.cpu_profile): 'fp32', 'bf16' or 'int8'."""
+        threads = config.VLM_CPU_THREADS
+        if threads is None and config.PIPELINE_MODE == 'process':
+            threads = max(1, (os.cpu_count() or 2) // 2)
+        if threads:
+            # Process-wide: in 'threaded' mode YOLO shares this process, so only an explicit setting applies
+            torch.set_num_threads(threads)
+        self.stats['cpu_threads'] = torch.get_num_threads()
+        
+        profile = self.cpu_profile
+        if profile == "bf16":
+            try:
+                model = AutoModelForCausalLM.from_pretrained(
+                    model_name,
+                    torch_dtype=torch.bfloat16,
+                    trust_remote_code=True
+                )
+                # Not every CPU/PyTorch build has bf16 kernels; fail here rather than on the first incident
+                torch.ones(8, 8, dtype=torch.bfloat16) @ torch.ones(8, 8, dtype=torch.bfloat16)
+                self.stats['cpu_profile'] = profile
+                return model
+            except Exception as e:
+                print(f"⚠️ bfloat16 not supported on this CPU ({e}), using float32")
+                profile = "fp32"
+        
+        model = AutoModelForCausalLM.from_pretrained(
+            model_name,
+            torch_dtype=torch.float32,
+            trust_remote_code=True
+        )
+        if profile == "int8":
+            # Dynamic quantization: Linear weights stored as int8, activations quantized on the fly
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        self.stats['cpu_profile'] = profile
+        return model
+    
+    def warm_up(self):
+        """Run one throwaway generation so the first real incident does not pay for lazy kernel/cache setup."""
+        if not self.load_models():
+            return False
+        print("🔥 Warming up SmolVLM2...")
+        self.stats['status'] = 'warming_up'
+        start = time.time()
+        dummy = np.full((384, 384, 3), 127, dtype=np.uint8)
+        prompt = "Describe this image:"
+        items = [(dummy, prompt)] * max(1, config.VLM_KEYFRAMES)
+        # Bypass the cache: a cached dummy would skip the model and fill the cache with a throwaway caption
+        self.generate_captions(items, mode=config.VLM_CAPTION_MODE, max_new_tokens=4, record=False, use_cache=False)
+        self.stats['warmup_seconds'] = round(time.time() - start, 2)
+        self.stats['status'] = 'ready'
+        print(f"✅ SmolVLM2 warmed up in {self.stats['warmup_seconds']}s")
+        return True
+    
+    def preload(self):
+        """Load and warm up the model in a background thread (config.VLM_PRELOAD), e.g. while the cameras start."""
+        if not self.enabled:
+            self.stats['status'] = 'disabled'
+            return None
+        thread = threading.Thread(target=self.warm_up if config.VLM_WARMUP else self.load_models,
+                                  name="vlm-preload", daemon=True)
+        thread.start()
+        return thread
+    
+    def _record_caption_time(self, seconds, captions=1):
+        per_caption_ms = seconds * 1000 / max(1, captions)
+        self.stats['captions'] += captions
+        self.stats['generate_calls'] += 1
+        self.stats['last_caption_ms'] = round(per_caption_ms, 1)
+        previous = self.stats['avg_caption_ms']
+        self.stats['avg_caption_ms'] = round(per_caption_ms if previous is None else previous * 0.8 + per_caption_ms * 0.2, 1)
+    
+    def generate_caption(self, image, prompt="Describe this security situation in detail, focusing on people and any weapons visible:",
+                         max_new_tokens=50, record=True, on_progress=None, deadline=None, use_cache=True, outcome=None):
+        """Generate caption for a single image using SmolVLM; on_progress(0, text) receives the partial caption while it is generated.
+        
+        With a deadline (time.time() value) generation stops once it passes and a basic caption is returned instead.
+        outcome, if given, is a dict of counters updated as in generate_captions().
+        """
+        outcome = {} if outcome is None else outcome
         if not self.enabled or not self.load_models():
             return self._generate_basic_caption()
         
+        key = self._cache_key([image], prompt, use_cache)
+        cached = self._cached(key)
+        if cached is not None:
+            self._count(outcome, 'cached')
+            if on_progress:
+                on_progress(0, cached)
+            return cached
+        
+        if deadline is not None and time.time() >= deadline:
+            return self._deadline_fallback(1, outcome)[0]
+        
         try:
-            if isinstance(image, np.ndarray):
-                if len(image.shape) == 3 and image.shape[2] == 3:
-                    image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-                image = Image.fromarray(image)
+            start = time.time()
+            image = self._to_pil(image)
             
             inputs = self.processor(images=image, text=prompt, return_tensors="pt").to(self.device)
+            criteria = DeadlineCriteria(deadline) if deadline is not None else None
             
             with torch.no_grad():
                 generated_ids = self.model.generate(
                     **inputs,
-                    max_new_tokens=50,
+                    max_new_tokens=max_new_tokens,
                     temperature=0.7,
                     do_sample=True,
-                    pad_token_id=self.processor.tokenizer.eos_token_id
+                    pad_token_id=self.processor.tokenizer.eos_token_id,
+                    streamer=CaptionStreamer(self.processor.tokenizer, on_progress, [0]) if on_progress else None,
+                    stopping_criteria=StoppingCriteriaList([criteria]) if criteria else None
                 )
+            if record:
+                self._record_caption_time(time.time() - start)
+            
+            new_tokens = generated_ids[:, inputs['input_ids'].shape[1]:]
+            if not self._finished_rows(new_tokens, criteria, max_new_tokens)[0]:
+                return self._deadline_fallback(1, outcome, cut=True)[0]
             
             generated_text = self.processor.decode(generated_ids[0], skip_special_tokens=True)
             
@@ -126,12 +319,176 @@ class SmolVLM2Manager:
             else:
                 caption = generated_text.strip()
             
+            self._remember(key, caption)
             return caption if caption else "Security monitoring detected potential threat."
             
         except Exception as e:
             print(f"❌ Error generating caption with SmolVLM: {e}")
             return self._generate_basic_caption()
     
+    def _to_pil(self, image):
+        if isinstance(image, np.ndarray):
+            if len(image.shape) == 3 and image.shape[2] == 3:
+                image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+            image = Image.fromarray(image)
+        return image
+    
+    def _chat_prompt(self, prompt, image_count):
+        """Prompt text with one image placeholder per image, via the processor's chat template when it has one."""
+        if getattr(self.processor, 'chat_template', None):
+            messages = [{
+                'role': 'user',
+                'content': [{'type': 'image'}] * image_count + [{'type': 'text', 'text': prompt}]
+            }]
+            return self.processor.apply_chat_template(messages, add_generation_prompt=True)
+        return prompt
+    
+    def _cache_key(self, images, prompt, use_cache=True):
+        if self.caption_cache is None or not use_cache:
+            return None
+        return (prompt, tuple(image_hash(image) for image in images))
+    
+    def _cached(self, key):
+        return self.caption_cache.get(*key) if key is not None else None
+    
+    def _remember(self, key, caption):
+        if key is not None and caption:
+            self.caption_cache.put(key[0], key[1], caption)
+    
+    def _finished_rows(self, new_tokens, criteria, max_new_tokens):
+        """Which rows finished on their own (end-of-sequence or token limit) rather than being cut by the deadline."""
+        if criteria is None or not criteria.triggered:
+            return [True] * new_tokens.shape[0]
+        if new_tokens.shape[1] >= max_new_tokens:
+            # Rows without EOS are never padded, so every row still running reached the limit
+            return [True] * new_tokens.shape[0]
+        eos = self.model.generation_config.eos_token_id
+        eos_ids = set(eos if isinstance(eos, (list, tuple)) else [eos])
+        eos_ids.add(self.processor.tokenizer.eos_token_id)
+        return [bool(eos_ids & set(row.tolist())) for row in new_tokens]
+    
+    def _deadline_fallback(self, count, outcome, cut=False):
+        """Basic captions for items the deadline left unfinished; a hit is counted once per outcome."""
+        if not outcome.get('deadline_cut'):
+            self.stats['deadline_hits'] += 1
+        self._count(outcome, 'deadline_cut', count)
+        self.stats['deadline_fallback_captions'] += count
+        if cut:
+            print(f"⏱️ VLM deadline reached mid-generation, {count} caption(s) fall back to basic descriptions")
+        return [self._generate_basic_caption() for _ in range(count)]
+    
+    def _generate_batch(self, items, mode, max_new_tokens, record, on_progress=None, row_ids=None, deadline=None):
+        """One processor + generate() call over items; returns the raw captions, None where the deadline cut a row off."""
+        start = time.time()
+        if mode == "multi_image":
+            images = [[self._to_pil(image) for image, _ in items]]
+            texts = [self._chat_prompt(items[0][1], len(items))]
+        else:
+            images = [[self._to_pil(image)] for image, _ in items]
+            texts = [self._chat_prompt(prompt, 1) for _, prompt in items]
+        
+        # Decoder-only generation needs the padding on the left so every row ends at its prompt
+        self.processor.tokenizer.padding_side = "left"
+        inputs = self.processor(images=images, text=texts, padding=True, return_tensors="pt").to(self.device)
+        
+        streamer = None
+        if on_progress:
+            streamer = CaptionStreamer(self.processor.tokenizer, on_progress, row_ids or range(len(texts)))
+        criteria = DeadlineCriteria(deadline) if deadline is not None else None
+        
+        with torch.no_grad():
+            generated_ids = self.model.generate(
+                **inputs,
+                max_new_tokens=max_new_tokens,
+                temperature=0.7,
+                do_sample=True,
+                pad_token_id=self.processor.tokenizer.eos_token_id,
+                streamer=streamer,
+                stopping_criteria=StoppingCriteriaList([criteria]) if criteria else None
+            )
+        
+        if record:
+            self._record_caption_time(time.time() - start, len(items))
+        
+        new_tokens = generated_ids[:, inputs['input_ids'].shape[1]:]
+        captions = [text.strip() for text in self.processor.batch_decode(new_tokens, skip_special_tokens=True)]
+        return [caption if finished else None
+                for caption, finished in zip(captions, self._finished_rows(new_tokens, criteria, max_new_tokens))]
+    
+    def generate_captions(self, items, mode="batch", max_new_tokens=50, record=True, on_progress=None, deadline=None,
+                          use_cache=True, outcome=None):
+        """Caption several (image, prompt) pairs with a single generate() call.
+        
+        mode="batch": the pairs are padded into one batch and one caption per pair is returned.
+        mode="multi_image": all images go into one conversation with the first prompt and a
+        single caption (as a one-element list) is returned.
+        mode="sequential": one generate_caption() per pair, as before.
+        Pairs found in the caption cache are not sent to the model (use_cache=False skips the cache both ways).
+        on_progress(index, text) is called with partial captions while they are generated.
+        With a deadline (time.time() value) generation stops once it passes; finished captions
+        are kept and only the unfinished ones fall back to basic descriptions.
+        outcome, if given, is a dict whose counters are increased: 'cached' for captions served
+        from the cache, 'deadline_cut' for captions the deadline cut off or skipped.
+        """
+        outcome = {} if outcome is None else outcome
+        if not items:
+            return []
+        if not self.enabled or not self.load_models():
+            return [self._generate_basic_caption() for _ in (items[:1] if mode == "multi_image" else items)]
+        if mode == "sequential":
+            return [self.generate_caption(image, prompt, max_new_tokens, record, self._row_progress(on_progress, i), deadline,
+                                        use_cache, outcome)
+                    for i, (image, prompt) in enumerate(items)]
+        
+        if mode == "multi_image":
+            keys = [self._cache_key([image for image, _ in items], items[0][1], use_cache)]
+        else:
+            keys = [self._cache_key([image], prompt, use_cache) for image, prompt in items]
+        captions = [self._cached(key) for key in keys]
+        missing = [i for i, caption in enumerate(captions) if caption is None]
+        self._count(outcome, 'cached', len(captions) - len(missing))
+        if on_progress:
+            for i, caption in enumerate(captions):
+                if caption is not None:
+                    on_progress(i, caption)
+        if not missing:
+            return captions
+        if deadline is not None and time.time() >= deadline:
+            for i, caption in zip(missing, self._deadline_fallback(len(missing), outcome)):
+                captions[i] = caption
+            return captions
+        
+        try:
+            pending = items if mode == "multi_image" else [items[i] for i in missing]
+            generated = self._generate_batch(pending, mode, max_new_tokens, record, on_progress, missing, deadline)
+            unfinished = [i for i, caption in zip(missing, generated) if caption is None]
+            fallbacks = iter(self._deadline_fallback(len(unfinished), outcome, cut=True) if unfinished else [])
+            for i, caption in zip(missing, generated):
+                if caption is None:
+                    captions[i] = next(fallbacks)
+                    continue
+                self._remember(keys[i], caption)
+                captions[i] = caption if caption else "Security monitoring detected potential threat."
+            return captions
+            
+        except Exception as e:
+            print(f"❌ Error generating batched captions with SmolVLM: {e}")
+            return [self.generate_caption(image, prompt, max_new_tokens, record, self._row_progress(on_progress, i), deadline,
+                                        use_cache, outcome)
+                    for i, (image, prompt) in enumerate(items)]
+    
+    @staticmethod
+    def _count(outcome, name, amount=1):
+        if amount:
+            outcome[name] = outcome.get(name, 0) + amount
+    
+    @staticmethod
+    def _row_progress(on_progress, index):
+        """Adapt a per-item progress callback to generate_caption's single row."""
+        if on_progress is None:
+            return None
+        return lambda _, text: on_progress(index, text)
+    
     def _generate_basic_caption(self):
         """Fallback method for diverse basic violation descriptions."""
         timestamp = int(time.time())